@@ -0,0 +1,99 @@
+"""Benchmark: end-to-end card generation against the local stand-in server
+
+Runs the streamed, batched generation on a stand-in OpenAI server and prints,
+for each scenario, the time to the first card, the total time, cards per second,
+accepted cards per API call and top-ups. Also times the per-card duplicate check
+against a class of the deck.
+
+    python benchmarks/generation.py [deck.json]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.openai_standin import StandInOptions, StandInServer  # noqa: E402
+from src.services import ai_service  # noqa: E402
+from src.services.ai_service import AICardGenerator, GenerationStats  # noqa: E402
+from src.services.card_similarity import CardSimilarityIndex  # noqa: E402
+from src.services.response_cache import get_response_cache  # noqa: E402
+from src.utils import FLASHCARD_FILE  # noqa: E402
+
+NUM_CARDS = 100
+
+# name -> (stand-in options, concurrency)
+SCENARIOS = {
+    "sequential": (dict(latency=0.3, chunk_delay=0.002), 1),
+    "concurrent": (dict(latency=0.3, chunk_delay=0.002), 5),
+    "faulty": (dict(latency=0.3, chunk_delay=0.002, error_rate=0.1, short_rate=0.2, malformed_rate=0.05), 5),
+}
+
+
+def run_scenario(name: str, options: dict, concurrency: int) -> None:
+    server = StandInServer(StandInOptions(seed=1, **options)).start()
+    ai_service.configure_client(base_url=server.base_url, api_key="standin", max_retries=0)
+    stats = GenerationStats()
+    first_card = []
+
+    def on_cards(cards):
+        if not first_card:
+            first_card.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    try:
+        cards, _ = asyncio.run(AICardGenerator.generate_batches(
+            "Benchmarks", NUM_CARDS, "mixed", None, concurrency, on_cards, force_refresh=True, stats=stats
+        ))
+    finally:
+        server.stop()
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<11} {len(cards):>4} cards  first {first_card[0] if first_card else float('nan'):.2f}s  "
+          f"total {elapsed:.2f}s  {len(cards) / elapsed:.1f} cards/s  "
+          f"{stats.cards_per_call():.1f} per call  {stats.retries} top-ups  {server.requests_served} requests")
+
+
+def run_dedup(deck_path: str) -> None:
+    """Cost of indexing the largest class of the deck, then of checking streamed cards one by one against it"""
+    with open(deck_path, 'r', encoding='utf-8') as f:
+        deck = json.load(f)
+    classes = {}
+    for card in deck:
+        classes.setdefault(card.get('class_name', ''), []).append(card)
+    class_cards = max(classes.values(), key=len)
+    new_cards = [
+        {"question": f"{card['question']} (variant {i})", "answer": card['answer']}
+        for i, card in enumerate(deck[:NUM_CARDS])
+    ]
+
+    start = time.perf_counter()
+    index = CardSimilarityIndex(class_cards)
+    built = time.perf_counter() - start
+
+    accepted = 0
+    start = time.perf_counter()
+    for card in new_cards:
+        unique, _ = AICardGenerator.filter_similar_cards([card], index)
+        for unique_card in unique:
+            index.add(unique_card)
+        accepted += len(unique)
+    elapsed = time.perf_counter() - start
+    print(f"dedup       {len(new_cards)} cards against {len(class_cards)}: index built in {built:.2f}s, "
+          f"{elapsed * 1000 / len(new_cards):.1f} ms per card, {accepted} kept")
+
+
+def run(deck_path: str) -> None:
+    # Keep the benchmark's responses out of the app's cache
+    get_response_cache().directory = tempfile.mkdtemp(prefix="standin_cache_")
+    print(f"{NUM_CARDS} cards per scenario")
+    for name, (options, concurrency) in SCENARIOS.items():
+        run_scenario(name, options, concurrency)
+    run_dedup(deck_path)
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else FLASHCARD_FILE)
@@ -0,0 +1,217 @@
+"""Local stand-in for the OpenAI chat-completions API, for tests and benchmarks
+
+Answers POST /v1/chat/completions with made-up flashcards, as one completion or
+as a server-sent event stream, with configurable latency, error rate, short
+responses and malformed JSON. Point the app at it with
+
+    python benchmarks/openai_standin.py --port 8765 --latency 0.5 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=standin python FlashCard.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+WORDS = (
+    "index query table join schema tuple relation key normal form graph tree node edge path "
+    "vector matrix gradient model layer neuron weight bias loss sample batch epoch cache page "
+    "thread process lock queue stack heap memory pointer signal kernel socket packet route "
+    "protein enzyme cell membrane gene allele market price demand supply capital interest"
+).split()
+
+_COUNT = re.compile(r'EXACTLY (\d+)')
+_TOPIC = re.compile(r'flashcards about (.+?)\.\s', re.S)
+
+
+class StandInOptions:
+    def __init__(self, latency: float = 0.0, chunk_delay: float = 0.0, chunk_size: int = 24,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, short_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency  # Seconds before the first byte
+        self.chunk_delay = chunk_delay  # Seconds between streamed chunks
+        self.chunk_size = chunk_size  # Characters per streamed chunk
+        self.error_rate = error_rate  # Share of requests failing with a 500
+        self.rate_limit_rate = rate_limit_rate  # Share of requests refused with a 429 and Retry-After
+        self.short_rate = short_rate  # Share of responses with fewer cards than asked
+        self.malformed_rate = malformed_rate  # Share of cards whose JSON is broken
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.random.random() < rate
+
+    def words(self, count: int) -> str:
+        with self.lock:
+            return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+
+def make_cards(options: StandInOptions, prompt: str) -> str:
+    """Completion text for a card generation prompt"""
+    count_match = _COUNT.search(prompt)
+    topic_match = _TOPIC.search(prompt)
+    count = int(count_match.group(1)) if count_match else 5
+    topic = topic_match.group(1).strip() if topic_match else "General"
+    if options.roll(options.short_rate):
+        with options.lock:
+            count = max(0, count - 1 - int(options.random.random() * count / 2))
+
+    cards = []
+    for i in range(count):
+        card = json.dumps({
+            "question": f"What links {options.words(4)} ({uuid.uuid4().hex[:6]})?",
+            "answer": f"The {options.words(6)}.",
+            "class_name": topic,
+            "difficulty": "mixed"
+        }, indent=4)
+        if options.roll(options.malformed_rate):
+            card = card.replace('",', '"', 1)  # Missing comma
+        cards.append(card)
+    return "[\n" + ",\n".join(cards) + "\n]"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = StandInOptions()
+    requests_served = 0
+
+    def log_message(self, format, *args) -> None:
+        pass  # Keep benchmark output readable
+
+    def send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        options = self.options
+        with options.lock:
+            type(self).requests_served += 1
+        time.sleep(options.latency)
+
+        if options.roll(options.rate_limit_rate):
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                           {"Retry-After": "1"})
+            return
+        if options.roll(options.error_rate):
+            self.send_json(500, {"error": {"message": "Stand-in server error", "type": "server_error"}})
+            return
+
+        prompt = " ".join(message.get("content", "") for message in request.get("messages", []))
+        content = make_cards(options, prompt)
+        model = request.get("model", "standin")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                 "total_tokens": (len(prompt) + len(content)) // 4}
+
+        if not request.get("stream"):
+            self.send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [content[i:i + options.chunk_size] for i in range(0, len(content), options.chunk_size)]
+        try:
+            for index, piece in enumerate(pieces + [None]):
+                delta = {"content": piece} if piece is not None else {}
+                if index == 0:
+                    delta["role"] = "assistant"
+                self.write_event({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None if piece is not None else "stop"}]
+                })
+                if piece is not None and options.chunk_delay:
+                    time.sleep(options.chunk_delay)
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client stopped reading, e.g. a cancelled generation
+
+    def write_event(self, payload: Dict) -> None:
+        self.write_chunk(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+
+    def write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StandInServer:
+    """Stand-in server on a background thread, port 0 picks a free port"""
+
+    def __init__(self, options: Optional[StandInOptions] = None, host: str = "127.0.0.1", port: int = 0):
+        handler = type("Handler", (StandInHandler,), {"options": options or StandInOptions()})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.handler = handler
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests_served(self) -> int:
+        return self.handler.requests_served
+
+    def start(self) -> 'StandInServer':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in that generates flashcards")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before the first byte")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests failing with a 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share of requests refused with a 429")
+    parser.add_argument('--short-rate', type=float, default=0.0, help="Share of responses missing cards")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Share of cards with broken JSON")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    options = StandInOptions(args.latency, args.chunk_delay, error_rate=args.error_rate,
+                             rate_limit_rate=args.rate_limit_rate, short_rate=args.short_rate,
+                             malformed_rate=args.malformed_rate, seed=args.seed)
+    server = StandInServer(options, args.host, args.port)
+    print(f"Stand-in OpenAI server on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Micro-benchmark: full combined_similarity against the similarity_above cascade
+
+Compares every pair of questions and every pair of answers of a deck at a few
+thresholds, checks that both give the same decisions and prints the timings.
+
+    python benchmarks/similarity_cascade.py [deck.json]
+"""
+import json
+import os
+import sys
+import time
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.normalized_text import normalize_text  # noqa: E402
+from src.services.similarity_index import combined_similarity, similarity_above  # noqa: E402
+from src.utils import FLASHCARD_FILE  # noqa: E402
+
+THRESHOLDS = (0.6, 0.7, 0.8)
+
+
+def run(deck_path: str) -> None:
+    with open(deck_path, 'r', encoding='utf-8') as f:
+        cards = json.load(f)
+
+    texts = [normalize_text(card[field]) for field in ('question', 'answer') for card in cards]
+    half = len(cards)
+    pairs = [
+        (texts[i], texts[j])
+        for offset in (0, half)
+        for i, j in combinations(range(offset, offset + half), 2)
+    ]
+    print(f"{len(cards)} cards, {len(pairs)} text pairs")
+
+    start = time.perf_counter()
+    scores = [combined_similarity(a.folded, b.folded, a.tokens, b.tokens) for a, b in pairs]
+    full_time = time.perf_counter() - start
+    print(f"full ratio:  {full_time:.2f}s")
+
+    for threshold in THRESHOLDS:
+        start = time.perf_counter()
+        passed = [similarity_above(a.folded, b.folded, a.tokens, b.tokens, threshold) for a, b in pairs]
+        cascade_time = time.perf_counter() - start
+
+        expected = [score if score > threshold else None for score in scores]
+        status = "same decisions" if passed == expected else "MISMATCH"
+        print(f"cascade > {threshold}: {cascade_time:.2f}s ({full_time / cascade_time:.1f}x), "
+              f"{sum(score is not None for score in passed)} pairs above, {status}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else FLASHCARD_FILE)
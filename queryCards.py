@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from src.services.card_query import QueryEngine, parse_query
+from src.services.search_index import SearchIndex
+
+
+def load_deck(path: str) -> List[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        cards = json.load(f)
+    if not isinstance(cards, list):
+        raise ValueError(f"{path} is not a JSON array of cards")
+    return cards
+
+
+def print_plan(engine: QueryEngine, query: str, cards: List[dict]) -> None:
+    """Show the order in which the clauses narrow the deck down"""
+    parsed = parse_query(query)
+    engine.field_index.sync(cards)
+    print(f"Plan over {len(cards)} cards:", file=sys.stderr)
+    for clause, count in engine.plan(parsed):
+        print(f"  {clause!r}: {count} cards", file=sys.stderr)
+    if parsed.text():
+        print(f"  text: {parsed.text()!r}", file=sys.stderr)
+    for phrase in parsed.phrases:
+        print(f"  phrase check: {' '.join(phrase)!r}", file=sys.stderr)
+
+
+def query_cards(path: str, query: str, limit: Optional[int], as_json: bool, explain: bool) -> int:
+    """Print the cards of a deck matching query, return how many matched"""
+    cards = load_deck(path)
+    engine = QueryEngine(SearchIndex())
+    if explain:
+        print_plan(engine, query, cards)
+
+    positions = engine.search(query, cards, limit)
+    if as_json:
+        json.dump([cards[position] for position in positions], sys.stdout, indent=4, ensure_ascii=False)
+        print()
+    else:
+        for position in positions:
+            card = cards[position]
+            print(f"{position}\t[{card.get('class_name', '')}] {card.get('question', '')}")
+    return len(positions)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Find flashcards with a query, e.g. "
+                    "class:\"Advanced databases\" difficulty:hard level<2 due:today \"normal form\""
+    )
+    parser.add_argument('query', help="Fields (class:, difficulty:, level<n, due:today|overdue|week|date), "
+                                      "words and \"quoted phrases\", all of which must match")
+    parser.add_argument('-f', '--file', default='flashcards.json', help="Deck file (JSON array of cards)")
+    parser.add_argument('-n', '--limit', type=int, help="Only print the first matches")
+    parser.add_argument('--json', action='store_true', help="Print the matching cards as a JSON array")
+    parser.add_argument('--explain', action='store_true', help="Print the query plan to stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        query_cards(args.file, args.query, args.limit, args.json, args.explain)
+    except (OSError, ValueError) as e:
+        # QueryError is a ValueError
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
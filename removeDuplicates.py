@@ -1,51 +1,373 @@
+import argparse
+import hashlib
 import json
-from collections import defaultdict
-
-
-def clean_flashcards():
-    # Load the flashcards
-    with open('flashcards.json', 'r', encoding='utf-8') as f:
-        cards = json.load(f)
-
-    # Create a dictionary to store unique cards
-    unique_cards = defaultdict(list)
-    duplicates = []
-
-    # Group cards by question (case-insensitive)
-    for card in cards:
-        question_key = card['question'].lower().strip()
-        unique_cards[question_key].append(card)
-
-    # Find and print duplicates
-    print("\nChecking for duplicates...")
-    duplicate_count = 0
-    cleaned_cards = []
-
-    for question, card_list in unique_cards.items():
-        if len(card_list) > 1:
-            duplicate_count += 1
-            print(f"\nDuplicate found ({len(card_list)} occurrences):")
-            print(f"Question: {card_list[0]['question']}")
-            print("Classes:", [card['class_name'] for card in card_list])
-            duplicates.extend(card_list[1:])
-        # Keep only the first occurrence
-        cleaned_cards.append(card_list[0])
-
-    # Save cleaned cards
-    if duplicate_count > 0:
-        print(f"\nFound {duplicate_count} duplicate questions")
-        print(f"Original card count: {len(cards)}")
-        print(f"Cleaned card count: {len(cleaned_cards)}")
-
-        # Save cleaned cards
-        with open('flashcards_cleaned.json', 'w', encoding='utf-8') as f:
-            json.dump(cleaned_cards, f, indent=2)
-
-        print("\nCleaned cards saved to 'flashcards_cleaned.json'")
-        print("Please review the cleaned file and replace the original if satisfied.")
+import os
+import sqlite3
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.services.duplicate_index import MinHashLSH
+from src.services.normalized_text import NormalizedText, cleaned_words
+from src.services.similarity_index import similarity_above
+
+MODES = ("exact", "normalized", "fuzzy")
+
+# Ordering of the cards of a group, the first one is kept
+KEEP_POLICIES = {
+    "first": "id ASC",
+    "last": "id DESC",
+    "longest-answer": "answer_length DESC, id ASC",
+    "highest-level": "level DESC, id ASC",
+}
+
+READ_CHUNK_SIZE = 1 << 20  # Characters read from a deck file at a time
+BATCH_SIZE = 5000  # Cards or pairs handed to the database or to a worker at once
+FUZZY_THRESHOLD = 0.9
+
+
+def iter_deck(path: str) -> Iterator[Dict]:
+    """Stream the cards of a JSON array file one at a time"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(READ_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} is not a JSON array of cards")
+        buffer = buffer[1:]
+        eof = False
+        position = 0
+
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                card, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # The next card is cut by the end of the chunk
+                if eof:
+                    raise
+                more = f.read(READ_CHUNK_SIZE)
+                eof = not more
+                buffer += more
+                continue
+            if not isinstance(card, dict):
+                raise ValueError(f"{path}: card {position} is not a JSON object")
+            yield card
+            position += 1
+            buffer = buffer[end:]
+            if len(buffer) < READ_CHUNK_SIZE // 2 and not eof:
+                more = f.read(READ_CHUNK_SIZE)
+                eof = not more
+                buffer += more
+
+
+def question_key(question: str, mode: str) -> str:
+    """Grouping key of a question: verbatim for exact, case and punctuation folded otherwise"""
+    if mode == "exact":
+        text = question
     else:
-        print("No duplicates found!")
+        # Each question is keyed once, caching it would only evict the app's own entries
+        text = " ".join(cleaned_words(question))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def band_hashes(batch: List[Tuple[int, str, str]]) -> List[Tuple[str, int, int, int]]:
+    """Compute (scope, band, bucket hash, card id) rows for (card id, scope, question) tuples (runs in workers)"""
+    lsh = MinHashLSH()
+    rows = []
+    for card_id, scope, question in batch:
+        signature = lsh.signature(NormalizedText(question).tokens)
+        if not signature:
+            continue
+        for band, values in lsh.band_keys(signature):
+            digest = hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+            rows.append((scope, band, int.from_bytes(digest, 'big', signed=True), card_id))
+    return rows
+
+
+def score_questions(batch: List[Tuple[int, int, str, str]], threshold: float) -> List[Tuple[int, int, float]]:
+    """Return (id1, id2, similarity) for question pairs above the threshold (runs in workers)"""
+    found = []
+    for id1, id2, question1, question2 in batch:
+        folded1 = NormalizedText(question1).folded
+        folded2 = NormalizedText(question2).folded
+        similarity = similarity_above(folded1, folded2, set(folded1.split()), set(folded2.split()), threshold)
+        if similarity is not None:
+            found.append((id1, id2, similarity))
+    return found
+
+
+def parallel_map(executor: Optional[ProcessPoolExecutor], jobs: int, function, batches: Iterator, *args) -> Iterator:
+    """Map function over batches, in worker processes when an executor is given"""
+    if executor is None:
+        for batch in batches:
+            yield function(batch, *args)
+        return
+
+    # Keep a bounded number of batches in flight
+    pending = []
+    for batch in batches:
+        pending.append(executor.submit(function, batch, *args))
+        if len(pending) >= 2 * jobs:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+def batched(rows: Iterator, size: int = BATCH_SIZE) -> Iterator[List]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DeckDeduplicator:
+    """Deduplicate deck files through a temporary SQLite database, so memory stays bounded"""
+
+    def __init__(self, mode: str = "normalized", keep: str = "first", per_class: bool = False,
+                 threshold: float = FUZZY_THRESHOLD, jobs: int = 1):
+        self.mode = mode
+        self.keep = keep
+        self.per_class = per_class
+        self.threshold = threshold
+        self.jobs = jobs
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = sqlite3.connect(os.path.join(self.temp_dir.name, "dedup.db"))
+        self.db.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE cards (
+                id INTEGER PRIMARY KEY, file TEXT, position INTEGER, scope TEXT, key TEXT,
+                class_name TEXT, question TEXT, answer_length INTEGER, level INTEGER, data TEXT
+            );
+            -- One row per distinct (scope, key), rep is the group the key belongs to
+            CREATE TABLE keys (scope TEXT, key TEXT, rep INTEGER, PRIMARY KEY (scope, key));
+            CREATE TABLE buckets (scope TEXT, band INTEGER, hash INTEGER, card_id INTEGER);
+        """)
+        self.files = []
+        self.card_count = 0
+
+    def close(self) -> None:
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def load(self, path: str) -> None:
+        """Stream a deck file into the database"""
+        self.files.append(path)
+        for batch in batched(enumerate(iter_deck(path))):
+            rows = []
+            for position, card in batch:
+                self.card_count += 1
+                class_name = card.get('class_name', '')
+                question = card.get('question', '')
+                rows.append((
+                    self.card_count, path, position, class_name if self.per_class else '',
+                    question_key(question, self.mode), class_name, question,
+                    len(card.get('answer', '').strip()), card.get('level', 0),
+                    json.dumps(card)
+                ))
+            self.db.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.executemany(
+                "INSERT OR IGNORE INTO keys VALUES (?, ?, ?)",
+                ((row[3], row[4], row[0]) for row in rows)
+            )
+        self.db.commit()
+
+    def merge_fuzzy(self) -> None:
+        """Merge groups whose questions are near duplicates, using LSH buckets to find candidates"""
+        executor = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        try:
+            # Only the first card of each exact group is compared, its group follows it
+            representatives = self.db.execute(
+                "SELECT cards.id, cards.scope, cards.question FROM keys JOIN cards ON cards.id = keys.rep"
+            )
+            for rows in parallel_map(executor, self.jobs, band_hashes, batched(representatives)):
+                self.db.executemany("INSERT INTO buckets VALUES (?, ?, ?, ?)", rows)
+            self.db.execute("CREATE INDEX buckets_lookup ON buckets (scope, band, hash)")
+
+            candidates = self.db.execute("""
+                SELECT DISTINCT a.card_id, b.card_id FROM buckets a
+                JOIN buckets b ON a.scope = b.scope AND a.band = b.band AND a.hash = b.hash
+                WHERE a.card_id < b.card_id
+            """)
+            parents = {}
+            for found in parallel_map(executor, self.jobs, score_questions, self.pair_batches(candidates), self.threshold):
+                for id1, id2, _ in found:
+                    root1, root2 = find_root(parents, id1), find_root(parents, id2)
+                    if root1 != root2:
+                        parents[max(root1, root2)] = min(root1, root2)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self.db.executemany(
+            "UPDATE keys SET rep = ? WHERE rep = ?",
+            ((find_root(parents, rep), rep) for rep in list(parents))
+        )
+        self.db.commit()
+
+    def pair_batches(self, candidates) -> Iterator[List[Tuple[int, int, str, str]]]:
+        lookup = self.db.cursor()
+        for batch in batched(candidates):
+            ids = {card_id for pair in batch for card_id in pair}
+            questions = {}
+            for chunk in batched(iter(ids), 500):
+                questions.update(lookup.execute(
+                    f"SELECT id, question FROM cards WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ))
+            yield [(id1, id2, questions[id1], questions[id2]) for id1, id2 in batch]
+
+    def rank(self) -> None:
+        """Rank the cards of every group by the keep policy, rank 1 is kept"""
+        self.db.execute(f"""
+            CREATE TABLE ranked AS
+            SELECT cards.id AS id, keys.rep AS cluster,
+                   ROW_NUMBER() OVER (PARTITION BY keys.rep ORDER BY {KEEP_POLICIES[self.keep]}) AS rank,
+                   COUNT(*) OVER (PARTITION BY keys.rep) AS size
+            FROM cards JOIN keys ON keys.scope = cards.scope AND keys.key = cards.key
+        """)
+        self.db.execute("CREATE INDEX ranked_id ON ranked (id)")
+
+    def run(self, paths: List[str]) -> None:
+        for path in paths:
+            self.load(path)
+        if self.mode == "fuzzy":
+            self.merge_fuzzy()
+        self.rank()
+
+    def write_cards(self, path: str) -> int:
+        """Write the kept cards, in input order, as a JSON array"""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for (data,) in self.db.execute(
+                    "SELECT data FROM cards JOIN ranked USING (id) WHERE rank = 1 ORDER BY id"):
+                text = json.dumps(json.loads(data), indent=2)
+                f.write(("\n  " if count == 0 else ",\n  ") + text.replace("\n", "\n  "))
+                count += 1
+            f.write("\n]" if count else "]")
+        return count
+
+    def duplicate_groups(self) -> Iterator[Dict]:
+        """Yield every group with more than one card, its kept card first"""
+        rows = self.db.execute("""
+            SELECT ranked.cluster, cards.file, cards.position, cards.class_name, cards.question
+            FROM ranked JOIN cards USING (id) WHERE ranked.size > 1
+            ORDER BY ranked.cluster, ranked.rank
+        """)
+        group = None
+        for cluster, file, position, class_name, question in rows:
+            card = {'file': file, 'position': position, 'class_name': class_name, 'question': question}
+            if group is None or group['cluster'] != cluster:
+                if group is not None:
+                    yield {'kept': group['kept'], 'removed': group['removed']}
+                group = {'cluster': cluster, 'kept': card, 'removed': []}
+            else:
+                group['removed'].append(card)
+        if group is not None:
+            yield {'kept': group['kept'], 'removed': group['removed']}
+
+    def write_report(self, path: str, output_count: int) -> None:
+        """Write a JSON report of the run and of every duplicate group"""
+        summary = {
+            'mode': self.mode,
+            'keep': self.keep,
+            'per_class': self.per_class,
+            'threshold': self.threshold if self.mode == "fuzzy" else None,
+            'files': self.files,
+            'input_cards': self.card_count,
+            'output_cards': output_count,
+            'removed_cards': self.card_count - output_count,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(summary, indent=2)[:-2] + ',\n  "groups": [')
+            for i, group in enumerate(self.duplicate_groups()):
+                f.write(("\n    " if i == 0 else ",\n    ") + json.dumps(group))
+            f.write("\n  ]\n}\n")
+
+    def print_summary(self, output_count: int, limit: int = 20) -> None:
+        group_count = 0
+        for group in self.duplicate_groups():
+            group_count += 1
+            if group_count <= limit:
+                print(f"\nDuplicate found ({len(group['removed']) + 1} occurrences):")
+                print(f"Question: {group['kept']['question']}")
+                print("Classes:", [group['kept']['class_name']] + [card['class_name'] for card in group['removed']])
+        if group_count > limit:
+            print(f"\n... and {group_count - limit} more groups")
+
+        if group_count:
+            print(f"\nFound {group_count} duplicate questions")
+        else:
+            print("No duplicates found!")
+        print(f"Original card count: {self.card_count}")
+        print(f"Cleaned card count: {output_count}")
+
+
+def find_root(parents: Dict[int, int], node: int) -> int:
+    root = node
+    while root in parents:
+        root = parents[root]
+    # Path compression
+    while node != root:
+        parents[node], node = root, parents[node]
+    return root
+
+
+def clean_flashcards(paths: List[str], output: str = 'flashcards_cleaned.json', report: Optional[str] = None,
+                     mode: str = "normalized", keep: str = "first", per_class: bool = False,
+                     threshold: float = FUZZY_THRESHOLD, jobs: int = 1, quiet: bool = False) -> int:
+    """Deduplicate deck files into output, returns the number of cards kept"""
+    dedup = DeckDeduplicator(mode, keep, per_class, threshold, jobs)
+    try:
+        if not quiet:
+            print("\nChecking for duplicates...")
+        dedup.run(paths)
+        output_count = dedup.write_cards(output)
+        if report:
+            dedup.write_report(report, output_count)
+        if not quiet:
+            dedup.print_summary(output_count)
+            print(f"\nCleaned cards saved to '{output}'")
+            print("Please review the cleaned file and replace the original if satisfied.")
+        return output_count
+    finally:
+        dedup.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Remove duplicate flashcards from one or more deck files")
+    parser.add_argument('files', nargs='*', default=['flashcards.json'],
+                        help="Deck files (JSON arrays of cards), merged in order")
+    parser.add_argument('-o', '--output', default='flashcards_cleaned.json', help="Cleaned deck file")
+    parser.add_argument('--mode', choices=MODES, default="normalized",
+                        help="exact: identical questions; normalized: ignoring case, punctuation "
+                             "and spacing; fuzzy: near-identical questions")
+    parser.add_argument('--keep', choices=sorted(KEEP_POLICIES), default="first",
+                        help="Card kept from each group of duplicates")
+    parser.add_argument('--per-class', action='store_true', help="Only treat cards of the same class as duplicates")
+    parser.add_argument('--threshold', type=float, default=FUZZY_THRESHOLD,
+                        help="Question similarity above which cards are duplicates in fuzzy mode")
+    parser.add_argument('--report', help="Write a JSON report of every duplicate group to this file")
+    parser.add_argument('--jobs', type=int, default=1, help="Worker processes for fuzzy mode")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only print errors")
+    args = parser.parse_args(argv)
+
+    try:
+        clean_flashcards(args.files, args.output, args.report, args.mode, args.keep,
+                         args.per_class, args.threshold, max(1, args.jobs), args.quiet)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    clean_flashcards()
+    sys.exit(main())
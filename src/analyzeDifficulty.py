@@ -15,15 +15,18 @@ def analyze_question_difficulty(question: str, answer: str) -> str:
     question_words = len(question.split())
     answer_words = len(answer.split())
 
+    # Fold case once for all keyword checks
+    question_folded = question.lower()
+
     # Check for complexity indicators
-    has_hard_keywords = any(kw in question.lower() for kw in hard_keywords)
-    has_medium_keywords = any(kw in question.lower() for kw in medium_keywords)
+    has_hard_keywords = any(kw in question_folded for kw in hard_keywords)
+    has_medium_keywords = any(kw in question_folded for kw in medium_keywords)
 
     # Decision logic
     if (has_hard_keywords or
             answer_words > 40 or
-            'compare' in question.lower() or
-            'difference' in question.lower()):
+            'compare' in question_folded or
+            'difference' in question_folded):
         return 'hard'
     elif (has_medium_keywords or
           answer_words > 25 or
@@ -121,3 +121,37 @@ SOUND_EFFECTS = {
 # Animation settings
 ENABLE_ANIMATIONS = True
 ANIMATION_DURATION = 300  # milliseconds
+
+# Duplicate review settings
+DUPLICATES_WINDOW_SIZE = "1000x700"
+DUPLICATES_PER_PAGE = 10  # Pair widgets are created once and reused for every page
+
+# Card manager search settings
+SEARCH_DEBOUNCE_MS = 250  # Pause in typing before the search runs
+QUERY_HINT = 'Filters: class:"Name"  difficulty:hard  level<2  due:today|overdue|week  "exact phrase"'
+
+# AI generation settings
+AI_MODEL = "gpt-4o"
+AI_TEMPERATURE = 0.7
+AI_BATCH_SIZE = 20  # Cards asked for in a single request
+AI_MAX_CONCURRENCY = 5  # Requests in flight at once
+MAX_GENERATED_CARDS = 200  # Largest request from the generate window
+AI_CACHE_MAX_BYTES = 50 * 1024 * 1024  # Cached responses beyond this are evicted, least recently used first
+AI_CACHE_TTL_SECONDS = 7 * 24 * 3600
+AI_MAX_ATTEMPTS = 4  # Requests per batch, the first one and its top-ups
+AI_RETRY_BUDGET = 10  # Top-up requests shared by all the batches of one generation
+AI_BACKOFF_SECONDS = 1.0  # Wait before the first top-up, doubled for each further one
+
+# AI rate limits, shared by every generation
+AI_REQUESTS_PER_MINUTE = 500
+AI_TOKENS_PER_MINUTE = 30000
+AI_MAX_IN_FLIGHT = 10  # Requests in flight across all generations
+AI_TOKENS_PER_CARD = 60  # Completion tokens expected per generated card
+AI_LIMITER_POLL_SECONDS = 0.05  # How often a queued caller checks whether it is its turn
+
+# Background generation queue settings
+QUEUE_WINDOW_SIZE = "900x650"
+QUEUE_WORKERS = 3  # Jobs generating at once
+QUEUE_FLUSH_CARDS = 50  # Buffered cards that trigger a write to the deck
+QUEUE_FLUSH_MS = 5000  # Longest time accepted cards wait before being written
+QUEUE_POLL_MS = 500
@@ -1,7 +1,11 @@
+import bisect
+import os
+import re
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Iterable, List, Tuple
 from .config import DEFAULT_FONT_SIZE, DEFAULT_CARDS_PER_SESSION, DEFAULT_SHOW_PROGRESS
-from .utils import save_json, safe_json_load, SETTINGS_FILE, STATS_FILE
+from .services.normalized_text import invalidate_card
+from .utils import save_json, safe_json_load, SETTINGS_FILE, STATS_FILE, FLASHCARD_FILE
 
 
 class Card:
@@ -48,6 +52,156 @@ class Card:
         }
 
 
+_DIGITS = re.compile(r'(\d+)')
+
+
+def natural_sort_key(text: str) -> Tuple:
+    """Case-folded sort key ordering embedded numbers by value ("Lecture 2" before "Lecture 10")"""
+    parts = _DIGITS.split(str(text).casefold())
+    # Text at even indices, numbers at odd ones, so tuples always compare like with like
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(parts))
+
+
+class ColumnSortIndex:
+    """Card positions sorted by the natural sort key of one field, updated incrementally"""
+
+    def __init__(self, field: str, cards: List[Dict]):
+        self.field = field
+        self.keys = [natural_sort_key(card.get(field, "")) for card in cards]  # By position
+        self.order = sorted(range(len(cards)), key=lambda i: (self.keys[i], i))
+        self.sorted_keys = [(self.keys[i], i) for i in self.order]
+
+    def insert(self, position: int) -> None:
+        entry = (self.keys[position], position)
+        index = bisect.bisect_left(self.sorted_keys, entry)
+        self.sorted_keys.insert(index, entry)
+        self.order.insert(index, position)
+
+    def remove(self, position: int) -> None:
+        index = bisect.bisect_left(self.sorted_keys, (self.keys[position], position))
+        del self.sorted_keys[index]
+        del self.order[index]
+
+    def add_cards(self, cards: List[Dict], start: int) -> None:
+        """Index the cards appended at positions start and after"""
+        for position in range(start, len(cards)):
+            self.keys.append(natural_sort_key(cards[position].get(self.field, "")))
+            self.insert(position)
+
+    def update_cards(self, cards: List[Dict], positions: Iterable[int]) -> None:
+        for position in positions:
+            key = natural_sort_key(cards[position].get(self.field, ""))
+            if key != self.keys[position]:
+                self.remove(position)
+                self.keys[position] = key
+                self.insert(position)
+
+    def delete_cards(self, removed: Iterable[int]) -> None:
+        """Drop removed positions and shift the ones after them"""
+        removed_set = set(removed)
+        removed = sorted(removed_set)
+        self.keys = [key for i, key in enumerate(self.keys) if i not in removed_set]
+        self.order = [
+            position - bisect.bisect_left(removed, position)
+            for position in self.order if position not in removed_set
+        ]
+        self.sorted_keys = [(self.keys[position], position) for position in self.order]
+
+
+class CardRepository:
+    """Single access point for the cards in flashcards.json
+
+    Every write goes through here and is saved in one file write. Listeners are
+    called with the new card list after each successful save, so indexes over the
+    deck can update incrementally.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CardRepository, cls).__new__(cls)
+            cls._instance.cards = []
+            cls._instance.loaded_mtime = None
+            cls._instance.listeners = []
+            cls._instance.sort_indexes = {}
+        return cls._instance
+
+    def get_cards(self) -> List[Dict]:
+        """Get all cards, reloading if the file was changed outside the app"""
+        try:
+            mtime = os.path.getmtime(FLASHCARD_FILE)
+        except OSError:
+            mtime = None
+        if mtime != self.loaded_mtime or mtime is None:
+            self.cards = safe_json_load(FLASHCARD_FILE, [])
+            self.loaded_mtime = mtime
+            self.sort_indexes = {}
+        return self.cards
+
+    def sorted_positions(self, field: str) -> List[int]:
+        """Positions of all cards ordered by the natural sort key of a field (do not modify)"""
+        cards = self.get_cards()
+        index = self.sort_indexes.get(field)
+        if index is None:
+            index = self.sort_indexes[field] = ColumnSortIndex(field, cards)
+        return index.order
+
+    def add_listener(self, listener: Callable[[List[Dict]], None]) -> None:
+        """Call listener(cards) after every successful write"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def add_cards(self, new_cards: Iterable[Dict]) -> bool:
+        """Append cards"""
+        cards = self.get_cards()
+        start = len(cards)
+        if not self.commit(cards + list(new_cards), keep_sort_indexes=True):
+            return False
+        for index in self.sort_indexes.values():
+            index.add_cards(self.cards, start)
+        return True
+
+    def update_cards(self, changes: Dict[int, Dict]) -> bool:
+        """Update fields of cards, given as {index: fields}"""
+        cards = list(self.get_cards())
+        for index, fields in changes.items():
+            invalidate_card(cards[index])
+            cards[index] = {**cards[index], **fields}
+        if not self.commit(cards, keep_sort_indexes=True):
+            return False
+        for index in self.sort_indexes.values():
+            index.update_cards(self.cards, changes)
+        return True
+
+    def delete_cards(self, indices: Iterable[int]) -> bool:
+        """Delete cards by index"""
+        removed = set(indices)
+        cards = self.get_cards()
+        for index in removed:
+            invalidate_card(cards[index])
+        if not self.commit([card for i, card in enumerate(cards) if i not in removed], keep_sort_indexes=True):
+            return False
+        for index in self.sort_indexes.values():
+            index.delete_cards(removed)
+        return True
+
+    def commit(self, cards: List[Dict], keep_sort_indexes: bool = False) -> bool:
+        """Save a new card list and notify listeners"""
+        if not save_json(FLASHCARD_FILE, cards):
+            return False
+
+        self.cards = cards
+        self.loaded_mtime = os.path.getmtime(FLASHCARD_FILE)
+        if not keep_sort_indexes:
+            self.sort_indexes = {}
+        for listener in self.listeners:
+            try:
+                listener(cards)
+            except Exception as e:
+                print(f"Error updating card index: {e}")
+        return True
+
+
 def save_settings(new_settings: Dict[str, Any]) -> bool:
     return save_json(SETTINGS_FILE, new_settings)
 
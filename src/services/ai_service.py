@@ -1,15 +1,227 @@
-import json
+import asyncio
 import os
-import re
-from difflib import SequenceMatcher
-from typing import List, Dict
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AbstractSet, Awaitable, Callable, List, Dict, Optional, Tuple
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError
+
+from ..config import (AI_BACKOFF_SECONDS, AI_BATCH_SIZE, AI_LIMITER_POLL_SECONDS, AI_MAX_ATTEMPTS,
+                      AI_MAX_CONCURRENCY, AI_MAX_IN_FLIGHT, AI_MODEL, AI_REQUESTS_PER_MINUTE, AI_RETRY_BUDGET,
+                      AI_TEMPERATURE, AI_TOKENS_PER_CARD, AI_TOKENS_PER_MINUTE)
+
+from .card_similarity import (CardSimilarityIndex, DeckSimilarityIndex, cleaned_similarity,
+                              cleaned_similarity_above)
+from .json_stream import JsonArrayStream
+from .normalized_text import NormalizedText
+from .response_cache import get_response_cache, request_key
+from .similarity_index import combined_similarity
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Rate-limited requests are retried by the shared limiter, not by the SDK
+_client_options = {'api_key': os.getenv('OPENAI_API_KEY'), 'max_retries': 0}
+
+
+def configure_client(**options) -> None:
+    """Send every generation to another OpenAI-compatible server
+
+    options are passed to the OpenAI clients, e.g. base_url="http://127.0.0.1:8765/v1"
+    for the local stand-in server, api_key or max_retries.
+    """
+    global _client_options
+    _client_options = {'api_key': os.getenv('OPENAI_API_KEY'), 'max_retries': 0, **options}
+
+
+def new_async_client() -> AsyncOpenAI:
+    """Async client for one event loop, closed by the generation that made it"""
+    return AsyncOpenAI(**_client_options)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+def tokens_in(messages: List[Dict]) -> int:
+    return sum(estimate_tokens(message['content']) for message in messages)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds a rate-limited response asks to wait, None if it does not say"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+class Reservation:
+    """Budget taken from the rate limiter for one request"""
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.released = False
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared by every generation
+
+    Each bucket holds up to one minute of budget and refills continuously, so
+    requests flow at the configured rate after an initial burst. Callers are
+    served in arrival order: only the oldest waiting caller may take budget, so
+    a large request is not starved by a stream of small ones. A 429's retry-after
+    pauses every caller, and at most max_in_flight requests run at once.
+    """
+
+    def __init__(self, requests_per_minute: float = AI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = AI_TOKENS_PER_MINUTE,
+                 max_in_flight: int = AI_MAX_IN_FLIGHT, clock: Callable[[], float] = time.monotonic):
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.max_in_flight = max_in_flight
+        self.clock = clock
+        self.request_level = self.request_capacity
+        self.token_level = self.token_capacity
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.waiting = deque()  # Tickets of waiting callers, oldest first
+        self.next_ticket = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.updated = now
+        self.request_level = min(self.request_capacity, self.request_level + elapsed * self.request_capacity / 60)
+        self.token_level = min(self.token_capacity, self.token_level + elapsed * self.token_capacity / 60)
+
+    def enqueue(self) -> int:
+        with self.lock:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            self.waiting.append(ticket)
+            return ticket
+
+    def leave(self, ticket: int) -> None:
+        """Give up a place in the queue, e.g. when the waiting caller is cancelled"""
+        with self.lock:
+            if ticket in self.waiting:
+                self.waiting.remove(ticket)
+
+    def try_reserve(self, ticket: int, tokens: int) -> float:
+        """Take the budget for a request if it is ticket's turn, else return the seconds to wait"""
+        with self.lock:
+            now = self.clock()
+            self.refill(now)
+            if self.waiting[0] != ticket:
+                return AI_LIMITER_POLL_SECONDS
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= self.max_in_flight:
+                return AI_LIMITER_POLL_SECONDS
+
+            # A request larger than the bucket waits for a full bucket
+            tokens = min(tokens, self.token_capacity)
+            wait = max(
+                (1 - self.request_level) * 60 / self.request_capacity,
+                (tokens - self.token_level) * 60 / self.token_capacity,
+            )
+            if wait > 0:
+                return wait
+
+            self.request_level -= 1
+            self.token_level -= tokens
+            self.in_flight += 1
+            self.waiting.popleft()
+            return 0.0
+
+    async def acquire_async(self, tokens: int) -> Reservation:
+        """Wait until a request of about tokens tokens may be sent, other tasks run meanwhile"""
+        ticket = self.enqueue()
+        try:
+            while True:
+                wait = self.try_reserve(ticket, tokens)
+                if not wait:
+                    return Reservation(tokens)
+                await asyncio.sleep(wait)
+        finally:
+            self.leave(ticket)
+
+    def release(self, reservation: Reservation, used_tokens: Optional[int] = None) -> None:
+        """End a request, correcting the token bucket with the tokens it really used"""
+        with self.lock:
+            if reservation.released:
+                return
+            reservation.released = True
+            self.in_flight -= 1
+            if used_tokens is not None:
+                # Unused tokens go back, overruns are owed by the next requests
+                self.token_level = min(self.token_capacity, self.token_level + reservation.tokens - used_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for seconds, after the API refused a request"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.request_level = min(self.request_level, 0.0)
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limiter shared by every request to the API, whichever thread or event loop sends it"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+def rate_limit_delay(error: Exception, attempt: int) -> float:
+    """Pause after a 429: what the API asked for, else an exponential backoff"""
+    delay = retry_after(error)
+    return delay if delay is not None else AI_BACKOFF_SECONDS * 2 ** attempt
+
+
+def batch_sizes(num_cards: int, batch_size: int) -> List[int]:
+    """Split a request for num_cards cards into batches of at most batch_size"""
+    full, rest = divmod(num_cards, batch_size)
+    return [batch_size] * full + ([rest] if rest else [])
+
+
+class GenerationStats:
+    """Counters of one generation run: API calls made and cards they produced"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.api_calls = 0
+        self.failed_calls = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.accepted = 0
+        self.duplicates = 0
+
+    def cards_per_call(self) -> float:
+        """Accepted cards per API call, cached responses are free"""
+        return self.accepted / self.api_calls if self.api_calls else float(self.accepted)
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (f"{self.accepted} cards accepted from {self.api_calls} API calls "
+                f"({self.cards_per_call():.1f} per call, {self.failed_calls} failed, "
+                f"{self.retries} top-ups, {self.rate_limited} rate limited, {self.cache_hits} cached) "
+                f"in {elapsed:.1f}s")
 
 
 class AICardGenerator:
@@ -20,107 +232,171 @@ class AICardGenerator:
         text1 = text1.lower().strip()
         text2 = text2.lower().strip()
 
-        # Get word sets
-        words1 = set(text1.split())
-        words2 = set(text2.split())
+        return AICardGenerator.combined_similarity(text1, text2, set(text1.split()), set(text2.split()))
 
-        # Calculate Jaccard similarity for word overlap
-        jaccard = len(words1.intersection(words2)) / len(words1.union(words2)) if words1 or words2 else 0
+    @staticmethod
+    def combined_similarity(text1: str, text2: str, words1: AbstractSet[str], words2: AbstractSet[str]) -> float:
+        """Similarity of two already cleaned texts and their word sets"""
+        return combined_similarity(text1, text2, words1, words2)
+
+    @staticmethod
+    def text_similarity(text1: NormalizedText, text2: NormalizedText) -> float:
+        """check_similarity on normalized texts, without re-normalizing"""
+        return AICardGenerator.combined_similarity(text1.folded, text2.folded, text1.tokens, text2.tokens)
 
-        # Calculate sequence similarity
-        sequence = SequenceMatcher(None, text1, text2).ratio()
+    @staticmethod
+    def cleaned_similarity(text1: NormalizedText, text2: NormalizedText) -> float:
+        """check_similarity on normalized texts with punctuation removed"""
+        return cleaned_similarity(text1, text2)
 
-        # Return weighted average
-        return (jaccard * 0.5 + sequence * 0.5)
+    @staticmethod
+    def cleaned_similarity_above(text1: NormalizedText, text2: NormalizedText, threshold: float) -> Optional[float]:
+        """cleaned_similarity if it is above threshold, else None (rejected by cheap bounds when possible)"""
+        return cleaned_similarity_above(text1, text2, threshold)
 
     @staticmethod
-    def filter_similar_cards(new_cards: List[Dict], existing_cards: List[Dict],
-                             similarity_threshold: float = 0.8) -> tuple[List[Dict], List[Dict]]:
-        """Filter out cards that are too similar to existing ones"""
+    def filter_similar_cards(new_cards: List[Dict],
+                             existing: CardSimilarityIndex) -> tuple[List[Dict], List[Dict]]:
+        """Filter out cards that are too similar to the indexed ones (lexically or in meaning)
+
+        Only queries the index, e.g. a class of get_deck_similarity_index(), which is
+        kept up to date as cards are written.
+        """
         unique_cards = []
         duplicates = []
 
         for new_card in new_cards:
-            is_duplicate = False
-            new_q = new_card['question'].lower().strip()
-            new_a = new_card['answer'].lower().strip()
-
-            # Remove punctuation and normalize spaces
-            new_q = re.sub(r'[^\w\s]', '', new_q)
-            new_a = re.sub(r'[^\w\s]', '', new_a)
-
-            for existing_card in existing_cards:
-                existing_q = existing_card['question'].lower().strip()
-                existing_a = existing_card['answer'].lower().strip()
-
-                # Clean existing card text
-                existing_q = re.sub(r'[^\w\s]', '', existing_q)
-                existing_a = re.sub(r'[^\w\s]', '', existing_a)
-
-                # Check question similarity
-                question_similarity = AICardGenerator.check_similarity(new_q, existing_q)
-
-                # Check answer similarity
-                answer_similarity = AICardGenerator.check_similarity(new_a, existing_a)
-
-                # Consider it a duplicate if either question or answer is too similar
-                if question_similarity > similarity_threshold or answer_similarity > similarity_threshold:
-                    is_duplicate = True
-                    duplicates.append({
-                        'new_card': new_card,
-                        'existing_card': existing_card,
-                        'question_similarity': question_similarity,
-                        'answer_similarity': answer_similarity
-                    })
-                    print(f"\nPotential duplicate found:")
-                    print(f"New Q: {new_card['question']}")
-                    print(f"Existing Q: {existing_card['question']}")
-                    print(f"Question similarity: {question_similarity:.2f}")
-                    print(f"Answer similarity: {answer_similarity:.2f}")
-                    break
-
-            if not is_duplicate:
+            duplicate = existing.find_duplicate(new_card)
+            if duplicate is None:
                 unique_cards.append(new_card)
+                continue
+
+            duplicates.append(duplicate)
+            if 'semantic_similarity' in duplicate:
+                print(f"\nPotential paraphrase found:")
+                print(f"New Q: {new_card['question']}")
+                print(f"Existing Q: {duplicate['existing_card']['question']}")
+                print(f"Meaning similarity: {duplicate['semantic_similarity']:.2f}")
+            else:
+                print(f"\nPotential duplicate found:")
+                print(f"New Q: {new_card['question']}")
+                print(f"Existing Q: {duplicate['existing_card']['question']}")
+                print(f"Question similarity: {duplicate['question_similarity']:.2f}")
+                print(f"Answer similarity: {duplicate['answer_similarity']:.2f}")
 
         return unique_cards, duplicates
 
     @staticmethod
-    def generate_unique_cards(topic: str, num_cards: int, difficulty: str = "mixed",
-                              existing_cards: List[Dict] = None) -> tuple[List[Dict], int]:
-        """Generate cards and filter out duplicates"""
-        # First, generate the requested number of cards
-        new_cards = AICardGenerator.generate_cards(topic, num_cards, difficulty)
-
-        if not new_cards:
-            return [], 0
-
-        if existing_cards:
-            # Filter existing cards for the same class
-            class_cards = [card for card in existing_cards
-                           if card.get('class_name') == topic]
-
-            # Filter out similar cards
-            unique_cards, duplicates = AICardGenerator.filter_similar_cards(
-                new_cards, class_cards
-            )
-
-            duplicate_count = len(duplicates)
+    async def generate_batches(topic: str, num_cards: int, difficulty: str,
+                               existing: Optional[CardSimilarityIndex] = None,
+                               concurrency: int = AI_MAX_CONCURRENCY,
+                               on_cards: Optional[Callable[[List[Dict]], None]] = None,
+                               force_refresh: bool = False,
+                               stats: Optional['GenerationStats'] = None,
+                               async_client: Optional[AsyncOpenAI] = None) -> tuple[List[Dict], int]:
+        """Generate num_cards cards in concurrent streamed batches, each card deduplicated as it arrives
+
+        Cards are checked against existing, e.g. the class in get_deck_similarity_index(),
+        which is only read, and against the cards accepted so far. A batch that comes
+        back short keeps its cards and only asks again for the missing ones, after an
+        exponential backoff, while the retry budget of the whole generation lasts.
+        Requests go through async_client when given, else through a client made for
+        this run.
+        """
+        sizes = batch_sizes(num_cards, AI_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        stats = stats or GenerationStats()
+        retry_budget = [max(AI_RETRY_BUDGET, len(sizes))]
+        accepted = []
+        # Accepted cards on top of the existing ones, built up card by card
+        index = CardSimilarityIndex(base=existing)
+        # Checks run off the event loop one at a time, each sees the cards accepted before it
+        check_executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+
+        def check(card: Dict) -> Tuple[List[Dict], List[Dict]]:
+            unique_cards, duplicates = AICardGenerator.filter_similar_cards([card], index)
+            for unique_card in unique_cards:
+                index.add(unique_card)
+            return unique_cards, duplicates
+
+        owned_client = async_client is None
+        if owned_client:
+            async_client = new_async_client()
+        try:
+            async def accept(card: Dict) -> bool:
+                """Keep a streamed card unless it is similar to the class or an accepted card"""
+                unique_cards, duplicates = await loop.run_in_executor(check_executor, check, card)
+                stats.duplicates += len(duplicates)
 
-            # Print duplicate information
-            if duplicate_count > 0:
-                print(f"\nFound {duplicate_count} similar cards:")
+                # Print duplicate information
                 for dup in duplicates:
                     print(f"\nNew question: {dup['new_card']['question']}")
                     print(f"Similar to existing: {dup['existing_card']['question']}")
-                    print(f"Similarity: {dup['similarity']:.2f}")
-
-            return unique_cards, duplicate_count
+                    print(f"Similarity: {max(dup['question_similarity'], dup['answer_similarity']):.2f}")
+
+                accepted.extend(unique_cards)
+                stats.accepted += len(unique_cards)
+                if on_cards and unique_cards:
+                    on_cards(unique_cards)
+                return bool(unique_cards)
+
+            async def run_batch(part: int, size: int) -> None:
+                batch_cards = []
+
+                async def accept_batch_card(card: Dict) -> None:
+                    if await accept(card):
+                        batch_cards.append(card)
+
+                attempt = 0
+                while True:
+                    missing = size - len(batch_cards)
+                    async with semaphore:
+                        await AICardGenerator.generate_cards_async(
+                            async_client, topic, missing, difficulty, (part + 1, len(sizes)), accept_batch_card,
+                            force_refresh or attempt > 0, stats, [card['question'] for card in batch_cards]
+                        )
+                    if len(batch_cards) >= size:
+                        return
+                    if attempt + 1 >= AI_MAX_ATTEMPTS or retry_budget[0] <= 0:
+                        print(f"Batch {part + 1}/{len(sizes)} gave up {size - len(batch_cards)} cards short")
+                        return
+
+                    # Top up the shortfall after backing off
+                    retry_budget[0] -= 1
+                    stats.retries += 1
+                    delay = AI_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+                    attempt += 1
+                    print(f"Batch {part + 1}/{len(sizes)} is {size - len(batch_cards)} cards short, "
+                          f"retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+            await asyncio.gather(*(run_batch(part, size) for part, size in enumerate(sizes)))
+        finally:
+            # A check still running when cancelled finishes before its cards are released,
+            # waited for off the loop so other generations on it carry on
+            await loop.run_in_executor(None, check_executor.shutdown)
+            index.clear()
+            if owned_client:
+                await async_client.close()
+
+        if stats.duplicates > 0:
+            print(f"\nFound {stats.duplicates} similar cards")
+        print(stats.summary())
+        return accepted, stats.duplicates
 
-        return new_cards, 0
+    @staticmethod
+    def request_tokens(messages: List[Dict], num_cards: int) -> int:
+        """Tokens a request is expected to use: its prompt and the cards it asks for"""
+        return tokens_in(messages) + num_cards * AI_TOKENS_PER_CARD
 
     @staticmethod
-    def generate_cards(topic: str, num_cards: int, difficulty: str = "mixed") -> List[Dict]:
-        """Generate flashcards using OpenAI API"""
+    def build_prompt(topic: str, num_cards: int, difficulty: str, part: Optional[Tuple[int, int]] = None,
+                     avoid: Optional[List[str]] = None) -> str:
+        """Prompt asking for num_cards cards, part (n, total) when the request is one of several batches
+
+        avoid lists questions already generated, when topping up a short batch.
+        """
         prompt = f"""Generate EXACTLY {num_cards} flashcards about {topic}.
         
         IMPORTANT FORMAT RULES:
@@ -145,83 +421,230 @@ class AICardGenerator:
 
         Return the array starting with [ and ending with ], no other text.
         """
+        if part is not None and part[1] > 1:
+            prompt += f"""
+        This is batch {part[0]} of {part[1]} requested at the same time for this topic:
+        focus on aspects of the topic the other batches are unlikely to cover.
+        """
+        if avoid:
+            questions = "\n".join(f"        - {question}" for question in avoid)
+            prompt += f"""
+        These questions were already generated, do not repeat them:
+{questions}
+        """
+        return prompt
 
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a JSON generator that creates flashcards in strict JSON format. Always validate your JSON before responding."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
+    @staticmethod
+    def chat_messages(prompt: str) -> List[Dict]:
+        return [
+            {
+                "role": "system",
+                "content": "You are a JSON generator that creates flashcards in strict JSON format. Always validate your JSON before responding."
+            },
+            {"role": "user", "content": prompt}
+        ]
 
-            content = response.choices[0].message.content.strip()
+    @staticmethod
+    def validate_card(card, i: int, topic: str, difficulty: str, seen_questions: set) -> Optional[Dict]:
+        """The card with its class and difficulty forced, None if it is unusable or repeats a question"""
+        # Check required fields
+        required_fields = ["question", "answer", "class_name", "difficulty"]
+        if not isinstance(card, dict) or not all(key in card for key in required_fields):
+            print(f"Card {i} missing required fields: {card}")
+            return None
+
+        # Check for empty fields
+        if any(not str(card[key]).strip() for key in required_fields):
+            print(f"Card {i} has empty fields: {card}")
+            return None
+
+        # Check for duplicate questions
+        question = card["question"].strip().lower()
+        if question in seen_questions:
+            print(f"Card {i} has duplicate question: {question}")
+            return None
+
+        seen_questions.add(question)
+
+        # Force correct class_name and difficulty
+        card["class_name"] = topic
+        card["difficulty"] = difficulty
+        return card
 
-            # Debug logging
-            print("Received content from API:")
-            print(content)
+    @staticmethod
+    async def generate_cards_async(async_client: AsyncOpenAI, topic: str, num_cards: int, difficulty: str = "mixed",
+                                   part: Optional[Tuple[int, int]] = None,
+                                   on_card: Optional[Callable[[Dict], Awaitable[None]]] = None,
+                                   force_refresh: bool = False,
+                                   stats: Optional['GenerationStats'] = None,
+                                   avoid: Optional[List[str]] = None) -> List[Dict]:
+        """Stream a generation, on_card(card) is awaited with each valid card as soon as its JSON closes
+
+        part is (n, total) for one batch of several. Cards are validated one by
+        one, so a short or partly invalid completion still yields its good cards.
+        A complete response is cached and replayed for the same request unless
+        force_refresh is set. avoid lists questions the cards must not repeat.
+        """
+        label = f" (batch {part[0]}/{part[1]})" if part else ""
+        messages = AICardGenerator.chat_messages(
+            AICardGenerator.build_prompt(topic, num_cards, difficulty, part, avoid)
+        )
+        cache = get_response_cache()
+        key = request_key(AI_MODEL, AI_TEMPERATURE, messages)
+
+        cards = []
+        parser = JsonArrayStream()
+        seen_questions = set()
+
+        async def receive(text: str) -> None:
+            for card in parser.feed(text):
+                card = AICardGenerator.validate_card(card, len(cards), topic, difficulty, seen_questions)
+                if card is None:
+                    continue
+                cards.append(card)
+                if on_card:
+                    await on_card(card)
+
+        content = None if force_refresh else cache.get(key)
+        if content is not None:
+            print(f"Using cached response{label}")
+            if stats:
+                stats.cache_hits += 1
+            await receive(content)
+            return cards
+
+        limiter = get_rate_limiter()
+        tokens = AICardGenerator.request_tokens(messages, num_cards)
+        received = []
+        try:
+            for attempt in range(AI_MAX_ATTEMPTS):
+                reservation = await limiter.acquire_async(tokens)
+                if stats:
+                    stats.api_calls += 1
+                try:
+                    stream = await async_client.chat.completions.create(
+                        model=AI_MODEL,
+                        messages=messages,
+                        temperature=AI_TEMPERATURE,
+                        stream=True
+                    )
+
+                    async for chunk in stream:
+                        if not chunk.choices or not chunk.choices[0].delta.content:
+                            continue
+                        received.append(chunk.choices[0].delta.content)
+                        await receive(received[-1])
+                        if len(cards) >= num_cards:
+                            break
+                except RateLimitError as e:
+                    # Refused before anything was generated, every caller waits then this one retries
+                    limiter.release(reservation, 0)
+                    if stats:
+                        stats.rate_limited += 1
+                    delay = rate_limit_delay(e, attempt)
+                    print(f"Rate limited{label}, waiting {delay:.1f}s")
+                    limiter.pause(delay)
+                    if attempt + 1 == AI_MAX_ATTEMPTS:
+                        raise
+                    continue
+                finally:
+                    limiter.release(reservation, estimate_tokens(''.join(received)) + tokens_in(messages))
+                break
+
+            if parser.errors:
+                print(f"JSON parsing error{label}: {parser.errors} malformed cards skipped")
+            if len(cards) != num_cards:
+                print(f"Validation error{label}: Only {len(cards)} valid cards out of {num_cards} requested")
+            else:
+                print(f"Successfully validated all {len(cards)} cards{label}")
+                cache.put(key, ''.join(received))
+            return cards
 
+        except Exception as e:
+            print(f"API or other error{label}: {e}")
+            if stats:
+                stats.failed_calls += 1
+            return cards
+
+
+class GenerationJob:
+    """Card generation running on its own thread and asyncio loop
+
+    Unique cards are put on a queue as they arrive, so a window can poll for
+    them with after() and stay responsive. cancel() cancels the generation
+    task, which aborts the requests in flight.
+    """
+
+    def __init__(self, topic: str, num_cards: int, difficulty: str = "mixed",
+                 deck_index: Optional[DeckSimilarityIndex] = None, class_name: Optional[str] = None,
+                 concurrency: int = AI_MAX_CONCURRENCY, force_refresh: bool = False):
+        self.topic = topic
+        self.num_cards = num_cards
+        self.difficulty = difficulty
+        self.deck_index = deck_index  # Cards of class_name in it are not generated again
+        self.class_name = class_name if class_name is not None else topic  # Class the cards are saved to
+        self.concurrency = concurrency
+        self.force_refresh = force_refresh
+
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.error = None
+        self.duplicate_count = 0
+        self.stats = GenerationStats()
+        self.loop = None
+        self.task = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        """Start generating in a background thread"""
+        self.thread.start()
+
+    def cancel(self) -> None:
+        """Stop generating, requests in flight are aborted"""
+        self.cancelled.set()
+        loop, task = self.loop, self.task
+        if loop is not None and task is not None and not self.finished.is_set():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # The loop closed in the meantime
+
+    def is_done(self) -> bool:
+        """Whether the job has ended and every card was drained"""
+        return self.finished.is_set() and self.results.empty()
+
+    def drain(self) -> List[Dict]:
+        """Return the unique cards generated since the last call, without blocking"""
+        cards = []
+        while True:
             try:
-                # Parse and validate JSON
-                cards = json.loads(content)
-
-                # Validate it's a list
-                if not isinstance(cards, list):
-                    raise ValueError("Response is not a JSON array")
-
-                # Validate card count
-                if len(cards) != num_cards:
-                    raise ValueError(f"Generated {len(cards)} cards instead of requested {num_cards}")
-
-                # Validate each card
-                valid_cards = []
-                seen_questions = set()  # To check for duplicates
-
-                for i, card in enumerate(cards):
-                    # Check required fields
-                    required_fields = ["question", "answer", "class_name", "difficulty"]
-                    if not all(key in card for key in required_fields):
-                        print(f"Card {i} missing required fields: {card}")
-                        continue
-
-                    # Check for empty fields
-                    if any(not str(card[key]).strip() for key in required_fields):
-                        print(f"Card {i} has empty fields: {card}")
-                        continue
-
-                    # Check for duplicate questions
-                    question = card["question"].strip().lower()
-                    if question in seen_questions:
-                        print(f"Card {i} has duplicate question: {question}")
-                        continue
-
-                    seen_questions.add(question)
-
-                    # Force correct class_name and difficulty
-                    card["class_name"] = topic
-                    card["difficulty"] = difficulty
-
-                    valid_cards.append(card)
-
-                # Final count validation
-                if len(valid_cards) != num_cards:
-                    raise ValueError(f"Only {len(valid_cards)} valid cards out of {num_cards} requested")
-
-                print(f"Successfully validated all {len(valid_cards)} cards")
-                return valid_cards
-
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                print("Invalid JSON content received:", content)
-                return []
-            except ValueError as e:
-                print(f"Validation error: {e}")
-                return []
+                cards.extend(self.results.get_nowait())
+            except queue.Empty:
+                return cards
 
+    def run(self) -> None:
+        try:
+            asyncio.run(self.generate())
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
-            print(f"API or other error: {e}")
-            return []
+            print(f"Generation error: {e}")
+            self.error = str(e)
+        finally:
+            self.finished.set()
+
+    async def generate(self) -> None:
+        # The task is published before the flag is checked, so a cancel() is never missed
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        if self.cancelled.is_set():
+            return
+        existing = None
+        if self.deck_index is not None:
+            # Waits for the deck index to catch up with the last card write
+            existing = await self.loop.run_in_executor(None, self.deck_index.class_index, self.class_name)
+        _, self.duplicate_count = await AICardGenerator.generate_batches(
+            self.topic, self.num_cards, self.difficulty, existing,
+            self.concurrency, self.results.put, self.force_refresh, self.stats
+        )
@@ -0,0 +1,306 @@
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .search_index import SearchIndex, search_words
+
+# Field names accepted in queries -> indexed field
+FIELD_ALIASES = {
+    'class': 'class_name', 'class_name': 'class_name',
+    'difficulty': 'difficulty', 'diff': 'difficulty',
+    'level': 'level',
+    'due': 'due',
+}
+DUE_BUCKETS = ('overdue', 'today', 'week')
+DEFAULT_DIFFICULTY = 'medium'
+NEVER = np.inf  # Review time of cards that cannot be parsed as due
+
+_TOKEN = re.compile(r'''
+    (?P<field>[A-Za-z_]+)(?P<op><=|>=|<|>|=|:)(?:"(?P<quoted>[^"]*)"?|(?P<value>\S*))
+  | "(?P<phrase>[^"]*)"?
+  | (?P<word>\S+)
+''', re.VERBOSE)
+
+
+class QueryError(ValueError):
+    """A query that cannot be parsed"""
+
+
+class Clause:
+    """One field condition of a query: field op value"""
+
+    def __init__(self, field: str, op: str, value):
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"{self.field}{self.op}{self.value!r}"
+
+
+class CardQuery:
+    """Parsed query: field clauses, free words and quoted phrases, all of which must match"""
+
+    def __init__(self, clauses: List[Clause], words: List[str], phrases: List[List[str]]):
+        self.clauses = clauses
+        self.words = words
+        self.phrases = phrases  # Each phrase as its search terms
+
+    def text(self) -> str:
+        """Words for the text index, phrase words included"""
+        return " ".join(self.words + [term for phrase in self.phrases for term in phrase])
+
+    def is_plain_text(self) -> bool:
+        return not self.clauses and not self.phrases
+
+
+def parse_query(query: str, now: Optional[datetime] = None) -> CardQuery:
+    """Parse a query such as: class:"Advanced databases" difficulty:hard level<2 due:today "normal form" """
+    now = now or datetime.now()
+    clauses, words, phrases = [], [], []
+
+    for match in _TOKEN.finditer(query):
+        if match.group('phrase') is not None:
+            terms = search_words(match.group('phrase'))
+            if terms:
+                phrases.append(terms)
+        elif match.group('word') is not None:
+            words.append(match.group('word'))
+        elif match.group('field').lower() not in FIELD_ALIASES:
+            # Not a field, e.g. "note:" in a question, search it as text
+            words.append(match.group(0))
+        else:
+            value = match.group('quoted') if match.group('quoted') is not None else match.group('value')
+            clauses.append(parse_clause(match.group('field'), match.group('op'), value, now))
+
+    return CardQuery(clauses, words, phrases)
+
+
+def parse_clause(name: str, op: str, value: str, now: datetime) -> Clause:
+    field = FIELD_ALIASES[name.lower()]
+    value = value.strip()
+    if not value:
+        raise QueryError(f"Missing value after {name}{op}")
+
+    if field == 'level':
+        try:
+            return Clause(field, '=' if op == ':' else op, int(value))
+        except ValueError:
+            raise QueryError(f"Level must be a whole number, not {value!r}")
+
+    if op not in (':', '='):
+        raise QueryError(f"{name} can only be compared with ':'")
+
+    if field == 'due':
+        # Due cards are those reviewed before a cut-off time
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        bucket = value.lower()
+        if bucket == 'overdue':
+            cutoff = today
+        elif bucket == 'today':
+            cutoff = today + timedelta(days=1)
+        elif bucket == 'week':
+            cutoff = today + timedelta(days=7)
+        else:
+            try:
+                cutoff = datetime.fromisoformat(value) + timedelta(days=1)
+            except ValueError:
+                raise QueryError(f"{name} must be one of {', '.join(DUE_BUCKETS)} or a date, not {value!r}")
+        return Clause(field, '<', cutoff.timestamp())
+
+    return Clause(field, '=', value.casefold())
+
+
+def review_time(card: Dict) -> float:
+    """Timestamp of the next review, cards never reviewed are due now"""
+    next_review = card.get('next_review')
+    if not next_review:
+        return -np.inf
+    try:
+        return datetime.fromisoformat(next_review).timestamp()
+    except (TypeError, ValueError):
+        return NEVER
+
+
+def card_level(card: Dict) -> int:
+    try:
+        return int(card.get('level') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class FieldIndex:
+    """Per-field indexes of a card list: postings for the class and difficulty,
+    sorted columns for the level and review time
+
+    Any clause can give its matching positions directly, and the per-position
+    columns let the other clauses filter a candidate set without reading cards.
+    """
+
+    def __init__(self):
+        self.postings = {}  # field -> {folded value: sorted positions}
+        self.codes = {}  # field -> per-position value code
+        self.values = {}  # field -> {folded value: code}
+        self.columns = {}  # field -> per-position number
+        self.sorted_columns = {}  # field -> (sorted numbers, positions in that order)
+        self.size = 0
+        self.synced_cards = None
+        self.lock = threading.RLock()
+
+    def sync(self, cards: List[Dict]) -> None:
+        """Rebuild the indexes when the card list changed"""
+        with self.lock:
+            if cards is self.synced_cards:
+                return
+
+            self.size = len(cards)
+            for field, default in (('class_name', ''), ('difficulty', DEFAULT_DIFFICULTY)):
+                values = {}
+                codes = np.fromiter(
+                    (values.setdefault(str(card.get(field) or default).casefold(), len(values)) for card in cards),
+                    dtype=np.int64, count=len(cards)
+                )
+                order = np.argsort(codes, kind='stable')
+                bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+                self.values[field] = values
+                self.codes[field] = codes
+                self.postings[field] = {
+                    value: order[bounds[code]:bounds[code + 1]] for value, code in values.items()
+                }
+
+            for field, value_of, dtype in (('level', card_level, np.int64), ('due', review_time, np.float64)):
+                column = np.fromiter((value_of(card) for card in cards), dtype=dtype, count=len(cards))
+                order = np.argsort(column, kind='stable')
+                self.columns[field] = column
+                self.sorted_columns[field] = (column[order], order)
+
+            self.synced_cards = cards
+
+    def range_bounds(self, clause: Clause) -> Tuple[int, int]:
+        """Slice of the sorted column matching a comparison"""
+        column, _ = self.sorted_columns[clause.field]
+        value = clause.value
+        if clause.op == '<':
+            return 0, np.searchsorted(column, value, 'left')
+        if clause.op == '<=':
+            return 0, np.searchsorted(column, value, 'right')
+        if clause.op == '>':
+            return np.searchsorted(column, value, 'right'), len(column)
+        if clause.op == '>=':
+            return np.searchsorted(column, value, 'left'), len(column)
+        return np.searchsorted(column, value, 'left'), np.searchsorted(column, value, 'right')
+
+    def estimate(self, clause: Clause) -> int:
+        """Number of cards matching a clause, without building the match"""
+        if clause.field in self.postings:
+            return len(self.postings[clause.field].get(clause.value, ()))
+        start, end = self.range_bounds(clause)
+        return end - start
+
+    def lookup(self, clause: Clause) -> np.ndarray:
+        """Sorted positions matching a clause"""
+        if clause.field in self.postings:
+            return self.postings[clause.field].get(clause.value, np.zeros(0, dtype=np.int64))
+        start, end = self.range_bounds(clause)
+        return np.sort(self.sorted_columns[clause.field][1][start:end])
+
+    def keep(self, clause: Clause, positions: np.ndarray) -> np.ndarray:
+        """Positions that also match a clause, read from the per-position columns"""
+        if clause.field in self.codes:
+            code = self.values[clause.field].get(clause.value)
+            if code is None:
+                return positions[:0]
+            return positions[self.codes[clause.field][positions] == code]
+
+        column = self.columns[clause.field][positions]
+        value = clause.value
+        if clause.op == '<':
+            mask = column < value
+        elif clause.op == '<=':
+            mask = column <= value
+        elif clause.op == '>':
+            mask = column > value
+        elif clause.op == '>=':
+            mask = column >= value
+        else:
+            mask = column == value
+        return positions[mask]
+
+
+class QueryEngine:
+    """Runs parsed queries: the most selective clause gives the candidates, the
+    other clauses narrow them down, then the text index ranks them
+
+    Card bodies are only read to check quoted phrases, on the final candidates.
+    """
+
+    def __init__(self, search_index: SearchIndex):
+        self.search_index = search_index
+        self.field_index = FieldIndex()
+
+    def plan(self, query: CardQuery) -> List[Tuple[Clause, int]]:
+        """Clauses with their match counts, most selective first"""
+        return sorted(((clause, self.field_index.estimate(clause)) for clause in query.clauses),
+                      key=lambda planned: planned[1])
+
+    def search(self, query: str, cards: List[Dict], limit: Optional[int] = None,
+               class_name: Optional[str] = None) -> List[int]:
+        """Positions of the cards matching query, best text match first, else in deck order
+
+        class_name, when given, restricts the results to one class like a class: clause.
+        """
+        parsed = parse_query(query)
+        if class_name is not None:
+            parsed.clauses.append(Clause('class_name', '=', class_name.casefold()))
+        if parsed.is_plain_text():
+            return self.search_index.search(query, cards, limit)
+        return self.run(parsed, cards, limit)
+
+    def run(self, query: CardQuery, cards: List[Dict], limit: Optional[int] = None) -> List[int]:
+        with self.field_index.lock:
+            self.field_index.sync(cards)
+
+            candidates = None
+            for clause, count in self.plan(query):
+                if count == 0:
+                    return []
+                if candidates is None:
+                    candidates = self.field_index.lookup(clause)
+                else:
+                    candidates = self.field_index.keep(clause, candidates)
+                if not len(candidates):
+                    return []
+
+        text = query.text()
+        if text:
+            ranked = np.asarray(self.search_index.search(text, cards), dtype=np.int64)
+            if candidates is not None:
+                ranked = ranked[np.isin(ranked, candidates, assume_unique=True)]
+            positions = ranked.tolist()
+        else:
+            positions = candidates.tolist()
+
+        if query.phrases:
+            positions = [position for position in positions if self.has_phrases(cards[position], query.phrases)]
+        return positions[:limit]
+
+    @staticmethod
+    def has_phrases(card: Dict, phrases: List[List[str]]) -> bool:
+        text = " | ".join(" ".join(search_words(card.get(field, ''))) for field in ('question', 'answer', 'class_name'))
+        text = f" {text} "
+        return all(f" {' '.join(phrase)} " in text for phrase in phrases)
+
+
+_query_engine = None
+
+
+def get_query_engine() -> QueryEngine:
+    """Shared query engine over the shared search index"""
+    global _query_engine
+    if _query_engine is None:
+        from .search_index import get_search_index
+        _query_engine = QueryEngine(get_search_index())
+    return _query_engine
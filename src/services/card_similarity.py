@@ -0,0 +1,277 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .index_worker import IndexWorker
+from .normalized_text import NormalizedText, card_keys, content_hash
+from .similarity_index import TokenSimilarityIndex, combined_similarity, similarity_above
+from .tfidf import SEMANTIC_THRESHOLD, card_text, get_engine
+
+SIMILARITY_THRESHOLD = 0.8  # Question or answer similarity above which a new card repeats an existing one
+MATRIX_REBUILD_SHARE = 0.1  # Share of cards changed since the TF-IDF matrix was built that triggers a rebuild
+MIN_MATRIX_REBUILD = 256
+
+
+def cleaned_similarity(text1: NormalizedText, text2: NormalizedText) -> float:
+    """Similarity of two normalized texts with punctuation removed"""
+    return combined_similarity(text1.cleaned, text2.cleaned, text1.cleaned_tokens, text2.cleaned_tokens)
+
+
+def cleaned_similarity_above(text1: NormalizedText, text2: NormalizedText, threshold: float) -> Optional[float]:
+    """cleaned_similarity if it is above threshold, else None (rejected by cheap bounds when possible)"""
+    return similarity_above(text1.cleaned, text2.cleaned, text1.cleaned_tokens, text2.cleaned_tokens, threshold)
+
+
+class CardSimilarityIndex:
+    """Cards that new cards must not repeat, indexed for duplicate lookups and updated card by card
+
+    Questions and answers are indexed by word set, so a new card is only compared
+    with the cards that can reach the similarity threshold, and every card is kept
+    in the shared TF-IDF engine to catch paraphrases. Their TF-IDF matrix is kept
+    between lookups: cards added since it was built are scored in a small matrix of
+    their own and removed ones are masked out, until enough cards changed to build it
+    again. A base index, e.g. the deck's cards of a class, is checked too without
+    being copied.
+    """
+
+    def __init__(self, cards: Iterable[Dict] = (), base: Optional['CardSimilarityIndex'] = None,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 semantic_threshold: float = SEMANTIC_THRESHOLD):
+        self.base = base
+        self.similarity_threshold = similarity_threshold
+        self.semantic_threshold = semantic_threshold
+
+        # A score above the threshold needs a word Jaccard above 2 * threshold - 1
+        min_jaccard = 2 * similarity_threshold - 1
+        self.questions = TokenSimilarityIndex([], min_jaccard)
+        self.answers = TokenSimilarityIndex([], min_jaccard)
+        self.cards = []  # Row -> card, None once removed
+        self.texts = []  # Row -> normalized (question, answer)
+        self.engine_keys = []  # Row -> key of the card in the TF-IDF engine
+        self.rows = {}  # Card key -> row
+        self.lock = threading.RLock()
+
+        self.matrix = None  # TF-IDF matrix of matrix_rows
+        self.matrix_rows = np.zeros(0, dtype=np.int64)
+        self.matrix_mask = np.zeros(0, dtype=bool)  # False for rows removed since the build
+        self.matrix_positions = {}  # Row -> position in the matrix
+        self.recent_rows = []  # Rows added since the build
+        self.recent_matrix = None
+        self.changes = 0
+
+        for card in cards:
+            self.add(card)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, card: Dict, key: Optional[str] = None) -> None:
+        """Index a card, key identifies it for remove() (a new one when None)"""
+        # Not cached: the index keeps its own normalized texts
+        question = NormalizedText(card['question'])
+        answer = NormalizedText(card['answer'])
+        engine_key = content_hash(card.get('class_name', ''), card['question'], card['answer'])
+        get_engine().add(engine_key, card_text(card))
+
+        with self.lock:
+            row = self.questions.add(question.cleaned_tokens)
+            self.answers.add(answer.cleaned_tokens)
+            self.cards.append(card)
+            self.texts.append((question, answer))
+            self.engine_keys.append(engine_key)
+            self.rows[key if key is not None else f"row:{row}"] = row
+            self.recent_rows.append(row)
+            self.recent_matrix = None
+            self.changes += 1
+
+    def remove(self, key: str) -> None:
+        """Forget the card added under key"""
+        with self.lock:
+            row = self.rows.pop(key, None)
+            if row is None:
+                return
+            self.questions.remove(row)
+            self.answers.remove(row)
+            self.cards[row] = None
+            self.texts[row] = None
+            get_engine().remove(self.engine_keys[row])
+
+            position = self.matrix_positions.pop(row, None)
+            if position is not None:
+                self.matrix_mask[position] = False
+            else:
+                self.recent_rows.remove(row)
+                self.recent_matrix = None
+            self.changes += 1
+
+    def clear(self) -> None:
+        """Remove every card, releasing their TF-IDF documents"""
+        with self.lock:
+            for key in list(self.rows):
+                self.remove(key)
+
+    def lexical_match(self, question: NormalizedText, answer: NormalizedText) -> Optional[Dict]:
+        """First card, in the order added, whose question or answer is too similar"""
+        with self.lock:
+            # Only cards that can pass the threshold
+            candidates = sorted(
+                self.questions.candidates(question.cleaned_tokens) |
+                self.answers.candidates(answer.cleaned_tokens)
+            )
+
+            for row in candidates:
+                existing_q, existing_a = self.texts[row]
+
+                # Check question similarity, then answer similarity, None if below the threshold
+                question_similarity = cleaned_similarity_above(question, existing_q, self.similarity_threshold)
+                answer_similarity = None
+                if question_similarity is None:
+                    answer_similarity = cleaned_similarity_above(answer, existing_a, self.similarity_threshold)
+
+                # Either question or answer is too similar
+                if question_similarity is not None or answer_similarity is not None:
+                    # Full scores of the pair for the report
+                    if question_similarity is None:
+                        question_similarity = cleaned_similarity(question, existing_q)
+                    if answer_similarity is None:
+                        answer_similarity = cleaned_similarity(answer, existing_a)
+                    return {
+                        'existing_card': self.cards[row],
+                        'question_similarity': question_similarity,
+                        'answer_similarity': answer_similarity
+                    }
+        return None
+
+    def semantic_match(self, text: str) -> Optional[Tuple[float, Dict]]:
+        """(cosine, card) of the card closest in meaning to text, None if the index is empty"""
+        engine = get_engine()
+        with self.lock:
+            if not self.rows:
+                return None
+            if self.matrix is None or self.changes > max(MIN_MATRIX_REBUILD, MATRIX_REBUILD_SHARE * len(self.rows)):
+                self.build_matrix()
+
+            best = None
+            if self.matrix_mask.any():
+                scores = engine.query_scores([text], self.matrix)[0]
+                scores[~self.matrix_mask] = -1
+                position = int(scores.argmax())
+                best = (float(scores[position]), int(self.matrix_rows[position]))
+            if self.recent_rows:
+                if self.recent_matrix is None:
+                    self.recent_matrix = engine.matrix([self.engine_keys[row] for row in self.recent_rows])
+                scores = engine.query_scores([text], self.recent_matrix)[0]
+                position = int(scores.argmax())
+                # Ties go to the card added first, as in the matrix
+                if best is None or scores[position] > best[0]:
+                    best = (float(scores[position]), self.recent_rows[position])
+            return best[0], self.cards[best[1]]
+
+    def build_matrix(self) -> None:
+        """TF-IDF matrix of every current card, for the lookups until enough cards change"""
+        rows = sorted(self.rows.values())
+        self.matrix = get_engine().matrix([self.engine_keys[row] for row in rows])
+        self.matrix_rows = np.array(rows, dtype=np.int64)
+        self.matrix_mask = np.ones(len(rows), dtype=bool)
+        self.matrix_positions = {row: position for position, row in enumerate(rows)}
+        self.recent_rows = []
+        self.recent_matrix = None
+        self.changes = 0
+
+    def find_duplicate(self, card: Dict) -> Optional[Dict]:
+        """Describe the indexed card that card repeats, lexically or in meaning, None if it is new"""
+        question = NormalizedText(card['question'])
+        answer = NormalizedText(card['answer'])
+
+        chain = []
+        index = self
+        while index is not None:
+            chain.append(index)
+            index = index.base
+
+        for index in chain:
+            found = index.lexical_match(question, answer)
+            if found is not None:
+                return {'new_card': card, **found}
+
+        # Paraphrases that the lexical check misses
+        matches = [match for match in (index.semantic_match(card_text(card)) for index in chain) if match]
+        if matches:
+            score, existing_card = max(matches, key=lambda match: match[0])
+            if score >= self.semantic_threshold:
+                existing_q = NormalizedText(existing_card['question'])
+                existing_a = NormalizedText(existing_card['answer'])
+                return {
+                    'new_card': card,
+                    'existing_card': existing_card,
+                    'question_similarity': cleaned_similarity(question, existing_q),
+                    'answer_similarity': cleaned_similarity(answer, existing_a),
+                    'semantic_similarity': score
+                }
+        return None
+
+
+class DeckSimilarityIndex:
+    """A CardSimilarityIndex per class of the deck, following the card list incrementally
+
+    sync() only indexes added or edited cards and drops removed ones. The shared
+    index is synced by a background worker, class_index() waits for it.
+    """
+
+    def __init__(self):
+        self.classes = {}  # Class name -> CardSimilarityIndex
+        self.card_classes = {}  # Card key -> class name
+        self.synced_cards = None
+        self.worker = None
+        self.lock = threading.RLock()
+
+    def sync(self, cards: List[Dict]) -> None:
+        """Bring the index up to date with a card list"""
+        with self.lock:
+            if cards is self.synced_cards:
+                return
+
+            keys = card_keys(cards)
+            current = set(keys)
+            for key in [key for key in self.card_classes if key not in current]:
+                self.classes[self.card_classes.pop(key)].remove(key)
+
+            for key, card in zip(keys, cards):
+                if key not in self.card_classes:
+                    class_name = card.get('class_name')
+                    self.get_class(class_name).add(card, key)
+                    self.card_classes[key] = class_name
+            self.synced_cards = cards
+
+    def get_class(self, class_name: str) -> CardSimilarityIndex:
+        with self.lock:
+            index = self.classes.get(class_name)
+            if index is None:
+                index = self.classes[class_name] = CardSimilarityIndex()
+            return index
+
+    def class_index(self, class_name: str) -> CardSimilarityIndex:
+        """Index of a class's cards, once every card list handed to the worker is synced"""
+        if self.worker is not None:
+            self.worker.wait()
+        return self.get_class(class_name)
+
+
+_deck_index = None
+
+
+def get_deck_similarity_index() -> DeckSimilarityIndex:
+    """Shared per-class index of the deck, kept up to date by every repository write
+
+    Create it on the Tk thread: it takes the current card list from the repository.
+    """
+    global _deck_index
+    if _deck_index is None:
+        from ..models import CardRepository
+        repository = CardRepository()
+        _deck_index = DeckSimilarityIndex()
+        _deck_index.worker = IndexWorker(_deck_index.sync)
+        repository.add_listener(_deck_index.worker.submit)
+        _deck_index.worker.submit(repository.get_cards())
+    return _deck_index
@@ -0,0 +1,545 @@
+import os
+import queue
+import random
+import threading
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .index_worker import IndexWorker
+from .normalized_text import card_keys, normalize_card, normalize_text
+from .similarity_index import combined_similarity, similarity_above, word_jaccard
+from .tfidf import SEMANTIC_THRESHOLD, card_text, get_engine
+from ..utils import DUPLICATE_INDEX_FILE, safe_json_load, save_json
+
+DUPLICATE_THRESHOLD = 0.7
+SCAN_CHUNK_SIZE = 200  # Candidate pairs per worker task
+SAVE_DELAY_SECONDS = 5.0  # Quiet time after the last card write before the index file is saved
+
+# 32 bands of 2 rows: a pair whose word sets have Jaccard >= 0.4 shares a bucket
+# with probability ~99.6%. check_similarity weighs word Jaccard and sequence ratio
+# 50/50, so a score above 0.7 implies a word Jaccard above 0.4.
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 32
+
+_PRIME = (1 << 31) - 1
+
+
+class MinHashLSH:
+    """MinHash signatures bucketed into LSH bands for near-duplicate candidate lookup"""
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, bands: int = LSH_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = random.Random(seed)
+        self.a = np.array([rng.randint(1, _PRIME - 1) for _ in range(num_perm)], dtype=np.uint64)
+        self.b = np.array([rng.randint(0, _PRIME - 1) for _ in range(num_perm)], dtype=np.uint64)
+
+        self.buckets = defaultdict(list)
+
+    def signature(self, shingles: Iterable[str]) -> Tuple[int, ...]:
+        """Compute the MinHash signature of a set of shingles"""
+        hashes = np.array(
+            [zlib.crc32(shingle.encode('utf-8')) & _PRIME for shingle in set(shingles)],
+            dtype=np.uint64
+        )
+        if not hashes.size:
+            return ()
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _PRIME
+        return tuple(int(value) for value in permuted.min(axis=1))
+
+    def band_keys(self, signature: Tuple[int, ...]) -> List[Tuple]:
+        """Split a signature into its per-band bucket keys"""
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def insert(self, key, signature: Tuple[int, ...]) -> None:
+        """Add a signature to the LSH buckets (empty signatures are never candidates)"""
+        if not signature:
+            return
+        for band_key in self.band_keys(signature):
+            self.buckets[band_key].append(key)
+
+    def candidate_pairs(self) -> Set[Tuple]:
+        """Return all key pairs sharing at least one bucket"""
+        pairs = set()
+        for keys in self.buckets.values():
+            if len(keys) > 1:
+                for key1, key2 in combinations(sorted(keys), 2):
+                    pairs.add((key1, key2))
+        return pairs
+
+
+def candidate_pairs(cards: List[Dict], threshold: float = DUPLICATE_THRESHOLD,
+                    semantic_threshold: float = SEMANTIC_THRESHOLD) -> Iterator[Tuple[int, int, Optional[float]]]:
+    """Yield (idx1, idx2, semantic similarity) for same-class cards that may be duplicates
+
+    The semantic similarity is the TF-IDF cosine of pairs reaching semantic_threshold,
+    None for pairs that are only lexical candidates.
+    """
+    class_cards = defaultdict(list)
+    for i, card in enumerate(cards):
+        class_cards[card.get('class_name', 'Unknown')].append(i)
+
+    # A score above the threshold needs a word Jaccard above 2 * threshold - 1
+    min_jaccard = 2 * threshold - 1
+    engine = get_engine()
+
+    for indices in class_cards.values():
+        if len(indices) < 2:
+            continue
+
+        # Separate indexes for questions and answers, a pair is a candidate if either collides
+        question_lsh = MinHashLSH()
+        answer_lsh = MinHashLSH()
+        texts = {}
+        keys = []
+        for idx in indices:
+            question = normalize_text(cards[idx]['question'])
+            answer = normalize_text(cards[idx]['answer'])
+            texts[idx] = (question, answer)
+            # Word shingles, matching the word sets compared by check_similarity
+            question_lsh.insert(idx, question_lsh.signature(question.tokens))
+            answer_lsh.insert(idx, answer_lsh.signature(answer.tokens))
+
+            key = normalize_card(cards[idx]).content_hash
+            engine.add(key, card_text(cards[idx]))
+            keys.append(key)
+
+        # Paraphrases found in one batch over the class's TF-IDF vectors
+        semantic = {
+            (indices[i], indices[j]): score
+            for i, j, score in engine.similar_pairs(keys, semantic_threshold)
+        }
+        for key in keys:
+            engine.remove(key)
+
+        candidates = question_lsh.candidate_pairs() | answer_lsh.candidate_pairs() | semantic.keys()
+
+        # Same order as a full pairwise scan
+        for idx1, idx2 in sorted(candidates):
+            if (idx1, idx2) in semantic:
+                yield idx1, idx2, semantic[(idx1, idx2)]
+                continue
+
+            (question1, answer1), (question2, answer2) = texts[idx1], texts[idx2]
+            if (word_jaccard(question1.tokens, question2.tokens) > min_jaccard or
+                    word_jaccard(answer1.tokens, answer2.tokens) > min_jaccard):
+                yield idx1, idx2, None
+
+
+def score_pairs(pairs: List[Tuple], threshold: float) -> List[Tuple]:
+    """Score (idx1, idx2, semantic, question1, question2, answer1, answer2) tuples of case-folded text
+
+    Runs in worker processes, so it only takes plain data and returns the duplicate
+    pairs as (idx1, idx2, question_similarity, answer_similarity, semantic). Pairs
+    with a semantic similarity are duplicates whatever their lexical scores.
+    """
+    found = []
+    for idx1, idx2, semantic, question1, question2, answer1, answer2 in pairs:
+        question_words1, question_words2 = set(question1.split()), set(question2.split())
+        answer_words1, answer_words2 = set(answer1.split()), set(answer2.split())
+
+        # Cheap bounds reject most pairs before any full sequence comparison
+        if semantic is None:
+            passed = similarity_above(question1, question2, question_words1, question_words2, threshold)
+            if passed is None:
+                passed = similarity_above(answer1, answer2, answer_words1, answer_words2, threshold)
+            if passed is None:
+                continue
+
+        question_similarity = combined_similarity(question1, question2, question_words1, question_words2)
+        answer_similarity = combined_similarity(answer1, answer2, answer_words1, answer_words2)
+        found.append((idx1, idx2, question_similarity, answer_similarity, semantic))
+    return found
+
+
+def pair_payload(cards: List[Dict], idx1: int, idx2: int, semantic: Optional[float]) -> Tuple:
+    """Build the plain-data tuple score_pairs expects for a pair of cards"""
+    card1, card2 = cards[idx1], cards[idx2]
+    return (
+        idx1, idx2, semantic,
+        normalize_text(card1['question']).folded, normalize_text(card2['question']).folded,
+        normalize_text(card1['answer']).folded, normalize_text(card2['answer']).folded
+    )
+
+
+def make_duplicate(cards: List[Dict], idx1: int, idx2: int, question_similarity: float,
+                   answer_similarity: float, semantic: Optional[float] = None,
+                   keys: Optional[List[str]] = None) -> Dict:
+    """Build the duplicate pair record shown by the duplicates checker"""
+    return {
+        'class': cards[idx1].get('class_name', 'Unknown'),
+        'card1': {'index': idx1, 'card': cards[idx1], 'key': keys[idx1] if keys else None},
+        'card2': {'index': idx2, 'card': cards[idx2], 'key': keys[idx2] if keys else None},
+        'q_sim': question_similarity,
+        'a_sim': answer_similarity,
+        'semantic': semantic
+    }
+
+
+def pair_key(key1: str, key2: str) -> str:
+    return "|".join(sorted((key1, key2)))
+
+
+def engine_key(key: str) -> str:
+    """TF-IDF engine key of a card key: its content hash, shared by identical cards"""
+    return key.rsplit(":", 1)[0]
+
+
+class DuplicateIndex:
+    """Persistent duplicate index, updated incrementally as cards change
+
+    Stores each card's MinHash signatures, the scores of pairs found to be duplicates
+    and the pairs dismissed with "Keep Both". sync() only looks for candidates
+    involving cards that are new since the last sync, so pairs scored once are never
+    scored again and dismissed pairs never come back.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str = DUPLICATE_INDEX_FILE, threshold: float = DUPLICATE_THRESHOLD,
+                 semantic_threshold: float = SEMANTIC_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.semantic_threshold = semantic_threshold
+        self.lsh = MinHashLSH()
+        self.lock = threading.RLock()
+        self.save_lock = threading.Lock()
+
+        self.signatures = {}  # card key -> (class name, question signature, answer signature)
+        self.buckets = defaultdict(set)  # (class name, field, band, band values) -> card keys
+        self.pairs = {}  # pair key -> (question similarity, answer similarity, semantic)
+        self.unscored = {}  # pair key -> semantic similarity, candidates waiting to be scored
+        self.dismissed = set()
+        self.engine_cards = set()  # Card keys this index added to the TF-IDF engine
+        self.worker = None  # Follows repository writes, see get_duplicate_index()
+        self.load()
+
+    def settings(self) -> Dict:
+        return {
+            'version': self.VERSION,
+            'threshold': self.threshold,
+            'semantic_threshold': self.semantic_threshold,
+            'permutations': MINHASH_PERMUTATIONS,
+            'bands': LSH_BANDS
+        }
+
+    def load(self) -> None:
+        """Load the index file, signatures and scores are dropped if they were built differently"""
+        data = safe_json_load(self.path, {}) if self.path and os.path.exists(self.path) else {}
+        self.dismissed = set(data.get('dismissed', []))
+        if data.get('settings') != self.settings():
+            return
+
+        for key, (class_name, question_hex, answer_hex) in data.get('cards', {}).items():
+            self.add_signatures(key, class_name, self.decode(question_hex), self.decode(answer_hex))
+        self.pairs = {key: tuple(scores) for key, scores in data.get('pairs', {}).items()}
+        self.unscored = dict(data.get('unscored', {}))
+
+    def save(self) -> bool:
+        """Write the index file"""
+        if not self.path:
+            return True
+        # One writer at a time, each with the index as it is: the index worker, scans and the
+        # duplicates window all save
+        with self.save_lock:
+            with self.lock:
+                data = {
+                    'settings': self.settings(),
+                    'cards': {
+                        key: [class_name, self.encode(question_sig), self.encode(answer_sig)]
+                        for key, (class_name, question_sig, answer_sig) in self.signatures.items()
+                    },
+                    'pairs': dict(self.pairs),
+                    'unscored': dict(self.unscored),
+                    'dismissed': sorted(self.dismissed)
+                }
+            return save_json(self.path, data)
+
+    @staticmethod
+    def encode(signature: Tuple[int, ...]) -> str:
+        return "".join(f"{value:08x}" for value in signature)
+
+    @staticmethod
+    def decode(encoded: str) -> Tuple[int, ...]:
+        return tuple(int(encoded[i:i + 8], 16) for i in range(0, len(encoded), 8))
+
+    def add_signatures(self, key: str, class_name: str, question_sig: Tuple, answer_sig: Tuple) -> None:
+        self.signatures[key] = (class_name, question_sig, answer_sig)
+        for field, signature in (('q', question_sig), ('a', answer_sig)):
+            if signature:
+                for band, values in self.lsh.band_keys(signature):
+                    self.buckets[(class_name, field, band, values)].add(key)
+
+    def remove_card(self, key: str) -> None:
+        """Forget a card that was edited or deleted, along with its pairs and TF-IDF document"""
+        class_name, question_sig, answer_sig = self.signatures.pop(key)
+        if key in self.engine_cards:
+            self.engine_cards.discard(key)
+            get_engine().remove(engine_key(key))
+        for field, signature in (('q', question_sig), ('a', answer_sig)):
+            if signature:
+                for band, values in self.lsh.band_keys(signature):
+                    bucket = self.buckets[(class_name, field, band, values)]
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.buckets[(class_name, field, band, values)]
+
+        for pairs in (self.pairs, self.unscored):
+            for pair in [pair for pair in pairs if key in pair.split("|")]:
+                del pairs[pair]
+
+    def neighbours(self, key: str) -> Set[str]:
+        """Cards sharing an LSH bucket with a card"""
+        class_name, question_sig, answer_sig = self.signatures[key]
+        found = set()
+        for field, signature in (('q', question_sig), ('a', answer_sig)):
+            if signature:
+                for band, values in self.lsh.band_keys(signature):
+                    found |= self.buckets.get((class_name, field, band, values), set())
+        found.discard(key)
+        return found
+
+    def sync(self, cards: List[Dict]) -> List[Tuple[int, int, Optional[float]]]:
+        """Bring the index up to date with cards and return the candidate pairs still to be scored
+
+        Candidates are returned as (idx1, idx2, semantic similarity) positions in cards.
+        """
+        keys = card_keys(cards)
+        position = {key: i for i, key in enumerate(keys)}
+
+        with self.lock:
+            for key in [key for key in self.signatures if key not in position]:
+                self.remove_card(key)
+
+            new_positions = [i for i, key in enumerate(keys) if key not in self.signatures]
+            for i in new_positions:
+                card = cards[i]
+                self.add_signatures(
+                    keys[i],
+                    card.get('class_name', 'Unknown'),
+                    self.lsh.signature(normalize_text(card['question']).tokens),
+                    self.lsh.signature(normalize_text(card['answer']).tokens)
+                )
+
+            # Lexical candidates: new cards sharing a bucket, that can reach the threshold
+            min_jaccard = 2 * self.threshold - 1
+            for i in new_positions:
+                question1 = normalize_text(cards[i]['question'])
+                answer1 = normalize_text(cards[i]['answer'])
+                for other in self.neighbours(keys[i]):
+                    pair = pair_key(keys[i], other)
+                    if pair in self.pairs or pair in self.unscored or pair in self.dismissed:
+                        continue
+                    question2 = normalize_text(cards[position[other]]['question'])
+                    answer2 = normalize_text(cards[position[other]]['answer'])
+                    if (word_jaccard(question1.tokens, question2.tokens) > min_jaccard or
+                            word_jaccard(answer1.tokens, answer2.tokens) > min_jaccard):
+                        self.unscored[pair] = None
+
+            # Semantic candidates: new cards against their whole class in one batch per class
+            self.add_semantic_candidates(cards, keys, new_positions)
+
+            return sorted(
+                tuple(sorted((position[key1], position[key2]))) + (semantic,)
+                for key1, key2, semantic in (
+                    pair.split("|") + [semantic] for pair, semantic in self.unscored.items()
+                )
+            )
+
+    def add_semantic_candidates(self, cards: List[Dict], keys: List[str], new_positions: List[int]) -> None:
+        if not new_positions:
+            return
+
+        engine = get_engine()
+        class_positions = defaultdict(list)
+        for i, card in enumerate(cards):
+            class_positions[card.get('class_name', 'Unknown')].append(i)
+
+        new_by_class = defaultdict(list)
+        for i in new_positions:
+            new_by_class[cards[i].get('class_name', 'Unknown')].append(i)
+
+        for class_name, new_in_class in new_by_class.items():
+            members = class_positions[class_name]
+            for i in members:
+                if keys[i] not in self.engine_cards:
+                    engine.add(engine_key(keys[i]), card_text(cards[i]))
+                    self.engine_cards.add(keys[i])
+            engine_keys = [engine_key(keys[i]) for i in members]
+
+            texts = [card_text(cards[i]) for i in new_in_class]
+            for row, column, score in engine.similar_texts(texts, engine_keys, self.semantic_threshold):
+                i, j = new_in_class[row], members[column]
+                if i == j:
+                    continue
+                pair = pair_key(keys[i], keys[j])
+                if pair not in self.pairs and pair not in self.dismissed:
+                    self.unscored[pair] = score
+
+    def record(self, key1: str, key2: str, scores: Optional[Tuple[float, float, Optional[float]]]) -> None:
+        """Store the outcome of scoring a candidate pair, None if it is not a duplicate"""
+        pair = pair_key(key1, key2)
+        with self.lock:
+            self.unscored.pop(pair, None)
+            if scores is not None and pair not in self.dismissed:
+                self.pairs[pair] = scores
+
+    def dismiss(self, key1: str, key2: str) -> None:
+        """Remember that both cards of a pair are kept"""
+        pair = pair_key(key1, key2)
+        with self.lock:
+            self.pairs.pop(pair, None)
+            self.unscored.pop(pair, None)
+            self.dismissed.add(pair)
+
+    def pending(self, cards: List[Dict]) -> List[Dict]:
+        """Duplicate pairs already known for cards, without scanning"""
+        keys = card_keys(cards)
+        position = {key: i for i, key in enumerate(keys)}
+        found = []
+        with self.lock:
+            for pair, scores in self.pairs.items():
+                key1, key2 = pair.split("|")
+                if key1 in position and key2 in position:
+                    idx1, idx2 = sorted((position[key1], position[key2]))
+                    found.append(make_duplicate(cards, idx1, idx2, *scores, keys=keys))
+        return sorted(found, key=lambda dup: (dup['card1']['index'], dup['card2']['index']))
+
+    def update(self, cards: List[Dict]) -> None:
+        """Sync and score the candidates of a card write (run by the index worker, which saves later)
+
+        A write bringing many candidates, e.g. the first build of the index or an
+        import, is scored across a DuplicateScan's process pool.
+        """
+        candidates = self.sync(cards)
+        if len(candidates) > SCAN_CHUNK_SIZE:
+            DuplicateScan(cards, index=self).run()
+            return
+
+        keys = card_keys(cards)
+        payload = [pair_payload(cards, *pair) for pair in candidates]
+        duplicates = {(found[0], found[1]): found[2:] for found in score_pairs(payload, self.threshold)}
+        for idx1, idx2, _ in candidates:
+            self.record(keys[idx1], keys[idx2], duplicates.get((idx1, idx2)))
+
+
+_duplicate_index = None
+
+
+def get_duplicate_index() -> DuplicateIndex:
+    """Shared duplicate index, kept up to date by every repository write on a background thread
+
+    Create it on the Tk thread: it starts with the current card list from the
+    repository. The index file is saved once writes have paused.
+    """
+    global _duplicate_index
+    if _duplicate_index is None:
+        from ..models import CardRepository
+        repository = CardRepository()
+        _duplicate_index = DuplicateIndex()
+        _duplicate_index.worker = IndexWorker(_duplicate_index.update, _duplicate_index.save, SAVE_DELAY_SECONDS)
+        repository.add_listener(_duplicate_index.worker.submit)
+        _duplicate_index.worker.submit(repository.get_cards())
+    return _duplicate_index
+
+
+class DuplicateScan:
+    """Background duplicate detection
+
+    Candidate pairs are scored in chunks across a process pool. Duplicates are put on
+    a queue as each chunk completes, so a window can poll and show them while the
+    scan is still running.
+    """
+
+    def __init__(self, cards: List[Dict], threshold: float = DUPLICATE_THRESHOLD,
+                 workers: Optional[int] = None, chunk_size: int = SCAN_CHUNK_SIZE,
+                 index: Optional[DuplicateIndex] = None):
+        self.cards = cards
+        self.threshold = index.threshold if index else threshold
+        self.index = index
+        self.keys = card_keys(cards) if index else None
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        """Start scanning in a background thread"""
+        self.thread.start()
+
+    def cancel(self) -> None:
+        """Stop the scan, pending chunks are dropped"""
+        self.cancelled.set()
+
+    def is_done(self) -> bool:
+        """Whether the scan has ended and every result was drained"""
+        return self.finished.is_set() and self.results.empty()
+
+    def drain(self) -> List[Dict]:
+        """Return the duplicates found since the last call, without blocking"""
+        found = []
+        while True:
+            try:
+                found.append(self.results.get_nowait())
+            except queue.Empty:
+                return found
+
+    def chunks(self) -> Iterator[List[Tuple]]:
+        # With an index only the candidates it has not scored yet are checked
+        if self.index:
+            candidates = self.index.sync(self.cards)
+        else:
+            candidates = candidate_pairs(self.cards, self.threshold)
+
+        chunk = []
+        for pair in candidates:
+            chunk.append(pair_payload(self.cards, *pair))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def run(self) -> None:
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {}
+            for chunk in self.chunks():
+                if self.cancelled.is_set():
+                    return
+                futures[executor.submit(score_pairs, chunk, self.threshold)] = chunk
+
+            for future in as_completed(futures):
+                if self.cancelled.is_set():
+                    return
+                duplicates = {(found[0], found[1]): found[2:] for found in future.result()}
+                for idx1, idx2, *_ in futures[future]:
+                    scores = duplicates.get((idx1, idx2))
+                    if self.index:
+                        self.index.record(self.keys[idx1], self.keys[idx2], scores)
+                    if scores is not None:
+                        self.results.put(make_duplicate(self.cards, idx1, idx2, *scores, keys=self.keys))
+        except Exception as e:
+            self.error = e
+            print(f"Duplicate scan error: {e}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self.index:
+                # Pairs not scored before a cancel stay in the index for the next scan
+                self.index.save()
+            self.finished.set()
@@ -0,0 +1,283 @@
+import asyncio
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from ..config import QUEUE_FLUSH_CARDS, QUEUE_FLUSH_MS, QUEUE_POLL_MS, QUEUE_WORKERS
+from ..utils import GENERATION_QUEUE_FILE, safe_json_load, save_json
+from .ai_service import AICardGenerator, GenerationStats
+from .card_similarity import get_deck_similarity_index
+
+QUEUED, RUNNING, DONE, PARTIAL, FAILED, CANCELLED = "queued", "running", "done", "partial", "failed", "cancelled"
+FINISHED = (DONE, PARTIAL, FAILED, CANCELLED)
+RETRYABLE = (PARTIAL, FAILED, CANCELLED)  # Finished jobs that can be queued again for their missing cards
+
+
+class GenerationQueue:
+    """Persistent queue of card generation jobs, worked through in the background
+
+    Jobs are saved to disk on every change, so queued and interrupted jobs resume
+    after a restart, asking only for the cards not saved yet. Up to QUEUE_WORKERS
+    jobs run at once on a background event loop, never two of the same class, and
+    a class only starts once its buffered cards are saved, so each job is
+    deduplicated against everything saved for its class, as kept by the deck
+    similarity index. Accepted cards are buffered and written to the deck in
+    batches by flush(), which attach() runs periodically on the Tk thread. A job
+    that ends short of its cards is marked partial and can be retried.
+    """
+
+    def __init__(self, path: str = GENERATION_QUEUE_FILE, workers: int = QUEUE_WORKERS):
+        self.path = path
+        self.workers = workers
+        self.lock = threading.RLock()
+        self.jobs = []  # Job dicts, in queue order
+        self.pending_cards = []  # (job id, card) accepted but not saved yet
+        self.tasks = {}  # Job id -> running asyncio task
+        self.loop = None
+        self.thread = None
+        self.wakeup = None
+        self.attached = False
+        self.deck_index = None  # Set by attach(), on the Tk thread
+        self.load()
+
+    def load(self) -> None:
+        data = safe_json_load(self.path, {'jobs': []})
+        with self.lock:
+            self.jobs = data.get('jobs', [])
+            for job in self.jobs:
+                # Interrupted by a restart, resumed from the cards already saved
+                if job['status'] == RUNNING:
+                    job['status'] = QUEUED
+
+    def save(self) -> None:
+        with self.lock:
+            save_json(self.path, {'jobs': self.jobs})
+
+    def snapshot(self) -> List[Dict]:
+        """Copies of the jobs, for display"""
+        with self.lock:
+            return [dict(job) for job in self.jobs]
+
+    def find(self, job_id: str) -> Optional[Dict]:
+        return next((job for job in self.jobs if job['id'] == job_id), None)
+
+    def update(self, job: Dict, **fields) -> None:
+        with self.lock:
+            job.update(fields, updated=time.time())
+            self.save()
+
+    def add(self, topics: List[Dict], num_cards: int, difficulty: str = "mixed") -> List[Dict]:
+        """Queue a job per {'topic', 'class_name'} and start working on them"""
+        now = time.time()
+        with self.lock:
+            added = [
+                {
+                    'id': uuid.uuid4().hex,
+                    'topic': topic['topic'],
+                    'class_name': topic.get('class_name') or topic['topic'],
+                    'num_cards': num_cards,
+                    'difficulty': difficulty,
+                    'status': QUEUED,
+                    'saved': 0,
+                    'duplicates': 0,
+                    'error': None,
+                    'created': now,
+                    'updated': now,
+                }
+                for topic in topics
+            ]
+            self.jobs.extend(added)
+            self.save()
+        self.start()
+        return added
+
+    def cancel(self, job_id: str) -> None:
+        """Cancel a queued or running job, cards it already generated are still saved"""
+        with self.lock:
+            job = self.find(job_id)
+            if job is None or job['status'] in FINISHED:
+                return
+            self.update(job, status=CANCELLED)
+            task = self.tasks.get(job_id)
+        if task is not None:
+            self.loop.call_soon_threadsafe(task.cancel)
+
+    def retry(self, job_id: str) -> None:
+        """Queue a partial, failed or cancelled job again, for the cards it is still missing"""
+        with self.lock:
+            job = self.find(job_id)
+            if job is None or job['status'] not in RETRYABLE:
+                return
+            self.update(job, status=QUEUED, error=None)
+        self.start()
+
+    def clear_finished(self) -> None:
+        """Forget finished jobs whose cards are all saved and whose task has ended"""
+        with self.lock:
+            # A cancelled job's task can still be shutting down
+            kept = {job_id for job_id, _ in self.pending_cards} | set(self.tasks)
+            self.jobs = [job for job in self.jobs if job['status'] not in FINISHED or job['id'] in kept]
+            self.save()
+
+    def start(self) -> None:
+        """Start the background loop if there is work for it"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                self.loop.call_soon_threadsafe(self.wakeup.set)
+                return
+            if not any(job['status'] == QUEUED for job in self.jobs):
+                return
+            ready = threading.Event()
+            self.thread = threading.Thread(target=self.run, args=(ready,), daemon=True)
+            self.thread.start()
+        ready.wait()
+
+    def run(self, ready: threading.Event) -> None:
+        try:
+            asyncio.run(self.dispatch(ready))
+        except Exception as e:
+            print(f"Generation queue error: {e}")
+            with self.lock:
+                self.thread = None
+
+    async def dispatch(self, ready: threading.Event) -> None:
+        """Start queued jobs while workers are free, until the queue is empty"""
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        ready.set()
+
+        while True:
+            with self.lock:
+                for job in self.next_jobs():
+                    self.update(job, status=RUNNING)
+                    self.tasks[job['id']] = asyncio.ensure_future(self.work(job))
+                if not self.tasks and not any(job['status'] == QUEUED for job in self.jobs):
+                    self.thread = None
+                    return
+            self.wakeup.clear()
+            await self.wakeup.wait()
+
+    def next_jobs(self) -> List[Dict]:
+        """Queued jobs to start now: free workers, one job per class at a time, none of a class with unsaved cards"""
+        busy = {(self.find(job_id) or {}).get('class_name') for job_id in self.tasks}
+        busy |= {(self.find(job_id) or {}).get('class_name') for job_id, _ in self.pending_cards}
+        chosen = []
+        for job in self.jobs:
+            if len(self.tasks) + len(chosen) >= self.workers:
+                break
+            if job['status'] == QUEUED and job['class_name'] not in busy:
+                busy.add(job['class_name'])
+                chosen.append(job)
+        return chosen
+
+    async def work(self, job: Dict) -> None:
+        stats = GenerationStats()
+        try:
+            with self.lock:
+                missing = job['num_cards'] - job['saved'] - sum(
+                    1 for job_id, _ in self.pending_cards if job_id == job['id']
+                )
+
+            # Deduplicated against the class as saved, the deck is only read on the Tk thread
+            existing = None
+            if missing > 0 and self.deck_index is not None:
+                existing = await self.loop.run_in_executor(None, self.deck_index.class_index, job['class_name'])
+
+            def buffer(cards: List[Dict]) -> None:
+                with self.lock:
+                    self.pending_cards.extend((job['id'], card) for card in cards)
+
+            if missing > 0:
+                await AICardGenerator.generate_batches(
+                    job['topic'], missing, job['difficulty'], existing, on_cards=buffer, stats=stats
+                )
+            with self.lock:
+                # A job cancelled meanwhile keeps its status
+                if job['status'] == RUNNING:
+                    short = max(0, missing - stats.accepted)
+                    if not short:
+                        status, error = DONE, None
+                    elif stats.accepted:
+                        status, error = PARTIAL, f"{short} cards short"
+                    else:
+                        status, error = FAILED, "No cards were generated"
+                    self.update(job, status=status, error=error, duplicates=job['duplicates'] + stats.duplicates)
+        except asyncio.CancelledError:
+            pass  # Status already set by cancel()
+        except Exception as e:
+            print(f"Generation job error for {job['topic']}: {e}")
+            self.update(job, status=FAILED, error=str(e))
+        finally:
+            with self.lock:
+                self.tasks.pop(job['id'], None)
+            self.wakeup.set()
+
+    def flush(self) -> int:
+        """Write buffered cards to the deck in one save, return how many were written"""
+        from ..models import CardRepository
+
+        # The batch stays pending until it is saved, so its class does not start a job meanwhile
+        with self.lock:
+            if not self.pending_cards:
+                return 0
+            batch = list(self.pending_cards)
+
+        jobs = {}
+        with self.lock:
+            for job_id, _ in batch:
+                jobs.setdefault(job_id, self.find(job_id))
+        new_cards = [
+            {
+                "question": card["question"],
+                "answer": card["answer"],
+                "class_name": jobs[job_id]['class_name'] if jobs[job_id] else card["class_name"],
+                "difficulty": card["difficulty"]
+            }
+            for job_id, card in batch
+        ]
+
+        if not CardRepository().add_cards(new_cards):
+            return 0  # Kept for the next flush
+
+        with self.lock:
+            # Cards buffered meanwhile were appended after the batch
+            self.pending_cards = self.pending_cards[len(batch):]
+            for job_id, job in jobs.items():
+                if job is not None:
+                    job['saved'] += sum(1 for card_job_id, _ in batch if card_job_id == job_id)
+            self.save()
+        # Jobs waiting for these cards to be saved can start
+        self.start()
+        return len(new_cards)
+
+    def attach(self, widget) -> None:
+        """Flush buffered cards periodically on the Tk thread and resume saved jobs"""
+        if self.attached:
+            return
+        self.attached = True
+        root = widget.winfo_toplevel()
+        last_flush = [time.monotonic()]
+        self.deck_index = get_deck_similarity_index()
+
+        def poll():
+            # Batches of cards, or whatever arrived in the last QUEUE_FLUSH_MS, or the rest once idle
+            if self.pending_cards and (len(self.pending_cards) >= QUEUE_FLUSH_CARDS or not self.tasks or
+                                       (time.monotonic() - last_flush[0]) * 1000 >= QUEUE_FLUSH_MS):
+                self.flush()
+                last_flush[0] = time.monotonic()
+            root.after(QUEUE_POLL_MS, poll)
+
+        root.after(QUEUE_POLL_MS, poll)
+        self.start()
+
+
+_generation_queue = None
+
+
+def get_generation_queue() -> GenerationQueue:
+    """Shared generation queue"""
+    global _generation_queue
+    if _generation_queue is None:
+        _generation_queue = GenerationQueue()
+    return _generation_queue
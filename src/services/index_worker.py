@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class IndexWorker:
+    """Keeps an index in sync with the card list on a background thread
+
+    Repository listeners hand the new card list to submit() and return at once.
+    Only the latest list counts: one submitted while another is waiting replaces
+    it, as sync(cards) brings the index up to date with whole lists. on_idle(),
+    e.g. saving the index, runs once no list has come for idle_seconds after a
+    sync, so a burst of writes is followed by a single call.
+    """
+
+    def __init__(self, sync: Callable[[List[Dict]], None], on_idle: Optional[Callable[[], None]] = None,
+                 idle_seconds: float = 0.0):
+        self.sync = sync
+        self.on_idle = on_idle
+        self.idle_seconds = idle_seconds
+        self.condition = threading.Condition()
+        self.request = None
+        self.touched = False
+        self.busy = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, cards: List[Dict]) -> None:
+        """Queue a sync with cards"""
+        with self.condition:
+            self.request = cards
+            self.condition.notify_all()
+
+    def touch(self) -> None:
+        """Schedule on_idle() as after a sync, for changes made to the index outside sync()"""
+        if self.on_idle is None:
+            return
+        with self.condition:
+            self.touched = True
+            self.condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every card list submitted so far is synced, False on timeout"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.request is None and not self.busy, timeout)
+
+    def run(self) -> None:
+        idle_due = None  # When on_idle is due, None if it ran since the last change
+        while True:
+            with self.condition:
+                while self.request is None:
+                    if self.touched:
+                        self.touched = False
+                        idle_due = time.monotonic() + self.idle_seconds
+                    elif idle_due is None:
+                        self.condition.wait()
+                    elif time.monotonic() >= idle_due:
+                        break
+                    else:
+                        self.condition.wait(idle_due - time.monotonic())
+                cards = self.request
+                self.request = None
+                self.busy = True
+
+            try:
+                if cards is None:
+                    idle_due = None
+                    self.on_idle()
+                else:
+                    self.sync(cards)
+                    if self.on_idle is not None:
+                        idle_due = time.monotonic() + self.idle_seconds
+            except Exception as e:
+                print(f"Error updating card index: {e}")
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
@@ -0,0 +1,57 @@
+import json
+from typing import Any, List
+
+
+class JsonArrayStream:
+    """Pulls the objects of a JSON array out of its text as it arrives
+
+    feed() returns every object closed by the new text. Text before the opening
+    bracket (such as a code fence) is skipped, and an object that is not valid
+    JSON is counted in errors instead of stopping the stream.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.depth = 0  # Nesting depth inside the current object
+        self.in_string = False
+        self.escaped = False
+        self.current = []  # Text of the current object
+        self.errors = 0
+
+    def feed(self, text: str) -> List[Any]:
+        objects = []
+        for char in text:
+            if self.finished:
+                break
+            if not self.started:
+                self.started = char == '['
+                continue
+
+            if self.depth:
+                self.current.append(char)
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                if not self.depth:
+                    self.current = [char]
+                self.depth += 1
+            elif char == '}' and self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    try:
+                        objects.append(json.loads(''.join(self.current)))
+                    except json.JSONDecodeError:
+                        self.errors += 1
+                    self.current = []
+            elif char == ']' and not self.depth:
+                self.finished = True
+        return objects
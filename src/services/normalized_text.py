@@ -0,0 +1,121 @@
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, List
+
+MAX_CACHED_TEXTS = 200000
+SHINGLE_SIZE = 3
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+class NormalizedText:
+    """Normalized forms of a piece of card text, computed once"""
+
+    __slots__ = ('text', 'folded', 'cleaned', 'tokens', 'cleaned_tokens', '_shingles', '_content_hash')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.folded = text.lower().strip()  # Case-folded, as compared by check_similarity
+        self.cleaned = _PUNCTUATION.sub('', self.folded).strip()  # Punctuation removed
+        self.tokens = frozenset(self.folded.split())
+        self.cleaned_tokens = frozenset(self.cleaned.split())
+        self._shingles = None
+        self._content_hash = None
+
+    @property
+    def content_hash(self) -> str:
+        """Stable hash of the original text"""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha1(self.text.encode('utf-8')).hexdigest()
+        return self._content_hash
+
+    @property
+    def shingles(self) -> FrozenSet[str]:
+        """Character shingles of the cleaned text (built on first use)"""
+        if self._shingles is None:
+            padded = f" {self.cleaned} "
+            self._shingles = frozenset(
+                padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)
+            )
+        return self._shingles
+
+
+def content_hash(class_name: str, question: str, answer: str) -> str:
+    """Stable hash of a card's class name, question and answer"""
+    return hashlib.sha1("\0".join((class_name, question, answer)).encode('utf-8')).hexdigest()
+
+
+class NormalizedCard:
+    """Normalized class name, question and answer of a card"""
+
+    __slots__ = ('class_name', 'question', 'answer', 'content_hash')
+
+    def __init__(self, class_name: str, question: str, answer: str):
+        self.class_name = normalize_text(class_name)
+        self.question = normalize_text(question)
+        self.answer = normalize_text(answer)
+        self.content_hash = content_hash(class_name, question, answer)
+
+
+# Keyed by content: editing a card produces new keys, stale entries age out or are invalidated
+_text_cache = OrderedDict()
+_card_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached(cache: OrderedDict, key, factory):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            return value
+
+    value = factory()
+
+    with _cache_lock:
+        cache[key] = value
+        if len(cache) > MAX_CACHED_TEXTS:
+            cache.popitem(last=False)
+    return value
+
+
+def cleaned_words(text: str) -> List[str]:
+    """Words of NormalizedText.cleaned, computed without going through the cache (for bulk indexing)"""
+    return _PUNCTUATION.sub('', text.lower()).split()
+
+
+def normalize_text(text: str) -> NormalizedText:
+    """Get the cached normalized form of a text"""
+    return _cached(_text_cache, text, lambda: NormalizedText(text))
+
+
+def normalize_card(card: Dict) -> NormalizedCard:
+    """Get the cached normalized form of a card dict"""
+    key = (card.get('class_name', ''), card.get('question', ''), card.get('answer', ''))
+    return _cached(_card_cache, key, lambda: NormalizedCard(*key))
+
+
+def card_keys(cards: List[Dict]) -> List[str]:
+    """Stable identity of each card: its content hash plus its occurrence among identical cards"""
+    seen = Counter()
+    keys = []
+    for card in cards:
+        card_hash = content_hash(card.get('class_name', ''), card.get('question', ''), card.get('answer', ''))
+        keys.append(f"{card_hash}:{seen[card_hash]}")
+        seen[card_hash] += 1
+    return keys
+
+
+def invalidate_card(card: Dict) -> None:
+    """Drop cached normalizations of a card that is being edited or deleted"""
+    class_name = card.get('class_name', '')
+    question = card.get('question', '')
+    answer = card.get('answer', '')
+
+    with _cache_lock:
+        _card_cache.pop((class_name, question, answer), None)
+        # Class names are shared between many cards and stay cached
+        _text_cache.pop(question, None)
+        _text_cache.pop(answer, None)
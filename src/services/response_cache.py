@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..config import AI_CACHE_MAX_BYTES, AI_CACHE_TTL_SECONDS
+from ..utils import AI_CACHE_DIR
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def request_key(model: str, temperature: float, messages: List[Dict]) -> str:
+    """Content address of a chat request: the same prompt, model and temperature share a key
+
+    Prompts are compared with their whitespace collapsed, so indentation changes
+    in the prompt template do not invalidate the cache.
+    """
+    normalized = [
+        {'role': message['role'], 'content': _WHITESPACE.sub(' ', message['content']).strip()}
+        for message in messages
+    ]
+    payload = json.dumps({'model': model, 'temperature': temperature, 'messages': normalized}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Completions stored on disk, one file per request key
+
+    Entries older than ttl seconds are misses. When the files exceed max_bytes the
+    least recently used ones are deleted; a hit refreshes the file's modification
+    time, which is what recency is measured by.
+    """
+
+    def __init__(self, directory: str = AI_CACHE_DIR, max_bytes: int = AI_CACHE_MAX_BYTES,
+                 ttl: float = AI_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion text for a key, None if missing or expired"""
+        path = self.path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error reading cached response {key}: {e}")
+            self.discard(key)
+            return None
+
+        if time.time() - entry.get('created', 0) > self.ttl:
+            self.discard(key)
+            return None
+
+        try:
+            os.utime(path)  # Most recently used
+        except OSError:
+            pass
+        return entry.get('content')
+
+    def put(self, key: str, content: str) -> None:
+        """Store a completion, then evict the least recently used entries over the size limit"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Written then renamed, so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'created': time.time(), 'content': content}, f)
+            os.replace(temp_path, self.path(key))
+        except OSError as e:
+            print(f"Error caching response {key}: {e}")
+            return
+        self.evict()
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        with self.lock:
+            entries = []
+            try:
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith('.json'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError as e:
+                print(f"Error scanning response cache: {e}")
+                return
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        """Delete every cached response"""
+        with self.lock:
+            if not os.path.isdir(self.directory):
+                return
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(('.json', '.tmp')):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Shared on-disk response cache"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,316 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .index_worker import IndexWorker
+from .normalized_text import card_keys
+from .similarity_index import edit_distance
+
+# Matches in the question count more than in the class name, then the answer
+FIELD_WEIGHTS = {'question': 3.0, 'class_name': 2.0, 'answer': 1.0}
+
+FUZZY_CANDIDATES = 50  # Terms with the most trigrams in common, checked by edit distance
+MIN_FUZZY_LENGTH = 4  # Shorter query words are only matched by prefix
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def search_words(text: str) -> List[str]:
+    """Case-folded words of a text split at punctuation, as searched"""
+    return _PUNCTUATION.sub(' ', text.lower()).split()
+
+
+def search_terms(text: str) -> List[str]:
+    """Terms of a text as indexed: its search_words, plus each word joined by punctuation glued
+    back together, so "Boyce-Codd" is found by "boyce", "codd" and "boycecodd"
+    """
+    terms = []
+    for word in text.lower().split():
+        parts = _PUNCTUATION.sub(' ', word).split()
+        terms.extend(parts)
+        if len(parts) > 1:
+            terms.append("".join(parts))
+    return terms
+
+
+def trigrams(term: str) -> set:
+    """Character trigrams of a term, padded so short terms and word starts count"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(word: str) -> int:
+    """Typos tolerated in a query word of this length"""
+    return 1 if len(word) < 8 else 2
+
+
+class SearchIndex:
+    """In-memory inverted index over the class, question and answer of every card
+
+    Every query word matches indexed words starting with it, or, when none does,
+    indexed words within a couple of typos of it (candidates found by trigram
+    overlap, then checked by edit distance). Cards must match all query words and
+    are ranked by field-weighted term frequency times idf. The index
+    follows the card list incrementally: sync() only indexes added or edited cards
+    and drops removed ones.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {doc id: weighted count}
+        self.posting_arrays = {}  # term -> (doc ids, weights) arrays, rebuilt after the term changes
+        self.doc_ids = {}  # card key -> doc id
+        self.doc_terms = {}  # doc id -> terms, to remove the doc
+        self.positions = np.zeros(0, dtype=np.int64)  # doc id -> position in the synced card list
+        self.next_doc_id = 0
+        self.sorted_terms = []
+        self.terms_dirty = False
+        self.trigram_terms = defaultdict(set)  # trigram -> indexed terms containing it
+        self.synced_cards = None
+        self.lock = threading.RLock()
+
+    def sync(self, cards: List[Dict]) -> None:
+        """Bring the index up to date with a card list"""
+        with self.lock:
+            if cards is self.synced_cards:
+                return
+
+            keys = card_keys(cards)
+            current = set(keys)
+            for key in [key for key in self.doc_ids if key not in current]:
+                self.remove(self.doc_ids.pop(key))
+
+            doc_ids = []
+            for position, key in enumerate(keys):
+                doc_id = self.doc_ids.get(key)
+                if doc_id is None:
+                    doc_id = self.doc_ids[key] = self.add(cards[position])
+                doc_ids.append(doc_id)
+
+            self.positions = np.full(self.next_doc_id, -1, dtype=np.int64)
+            self.positions[doc_ids] = np.arange(len(doc_ids))
+            self.synced_cards = cards
+
+    def add(self, card: Dict) -> int:
+        doc_id = self.next_doc_id
+        self.next_doc_id += 1
+
+        weights = {}
+        for field, field_weight in FIELD_WEIGHTS.items():
+            for term in search_terms(card.get(field, '')):
+                weights[term] = weights.get(term, 0) + field_weight
+
+        postings = self.postings
+        for term, weight in weights.items():
+            docs = postings.get(term)
+            if docs is None:
+                docs = postings[term] = {}
+                self.terms_dirty = True
+                for trigram in trigrams(term):
+                    self.trigram_terms[trigram].add(term)
+            docs[doc_id] = weight
+        if self.posting_arrays:
+            for term in weights:
+                self.posting_arrays.pop(term, None)
+        self.doc_terms[doc_id] = list(weights)
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        for term in self.doc_terms.pop(doc_id):
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            self.posting_arrays.pop(term, None)
+            if not docs:
+                del self.postings[term]
+                self.terms_dirty = True
+                for trigram in trigrams(term):
+                    terms = self.trigram_terms[trigram]
+                    terms.discard(term)
+                    if not terms:
+                        del self.trigram_terms[trigram]
+
+    def expand(self, prefix: str) -> List[str]:
+        """Indexed terms starting with prefix"""
+        if self.terms_dirty:
+            self.sorted_terms = sorted(self.postings)
+            self.terms_dirty = False
+        start = bisect.bisect_left(self.sorted_terms, prefix)
+        end = bisect.bisect_left(self.sorted_terms, prefix + '\uffff')
+        return self.sorted_terms[start:end]
+
+    def fuzzy_expand(self, word: str) -> List[Tuple[str, float]]:
+        """Indexed terms, or term prefixes, within max_edits typos of word, weighted down with the distance"""
+        if len(word) < MIN_FUZZY_LENGTH:
+            return []
+
+        # Rank terms by trigram overlap, only the best few get an edit distance
+        word_trigrams = trigrams(word)
+        shared = defaultdict(int)
+        for trigram in word_trigrams:
+            for term in self.trigram_terms.get(trigram, ()):
+                shared[term] += 1
+        overlap = {
+            term: count / (len(word_trigrams) + len(term) + 1 - count)
+            for term, count in shared.items()
+        }
+        candidates = sorted(overlap, key=overlap.get, reverse=True)[:FUZZY_CANDIDATES]
+
+        limit = max_edits(word)
+        matches = []
+        for term in candidates:
+            # Typos in a word that is still being typed count against the term's prefix
+            distance = min(edit_distance(word, term, limit), edit_distance(word, term[:len(word)], limit))
+            if distance <= limit:
+                matches.append((term, 1 - distance / (limit + 1)))
+        return matches
+
+    def term_arrays(self, term: str):
+        arrays = self.posting_arrays.get(term)
+        if arrays is None:
+            docs = self.postings[term]
+            arrays = self.posting_arrays[term] = (
+                np.fromiter(docs.keys(), dtype=np.int64, count=len(docs)),
+                np.fromiter(docs.values(), dtype=np.float64, count=len(docs))
+            )
+        return arrays
+
+    def search(self, query: str, cards: Optional[List[Dict]] = None, limit: Optional[int] = None,
+               fuzzy: bool = True) -> List[int]:
+        """Return positions of the cards matching every word of query, best match first
+
+        An empty query matches every card, in deck order.
+        """
+        with self.lock:
+            if cards is not None:
+                self.sync(cards)
+
+            terms = search_words(query)
+            if not terms:
+                return sorted(self.positions[self.positions >= 0].tolist())[:limit]
+
+            total = np.zeros(self.next_doc_id)
+            matched = self.positions >= 0
+            for prefix in terms:
+                scores = self.prefix_scores(prefix, fuzzy)
+                matched &= scores > 0
+                total += scores
+
+            docs = np.nonzero(matched)[0]
+            order = np.lexsort((self.positions[docs], -total[docs]))
+            return self.positions[docs[order[:limit]]].tolist()
+
+    def prefix_scores(self, prefix: str, fuzzy: bool = True) -> np.ndarray:
+        """Summed weighted tf-idf of the terms matching a query word, per doc id"""
+        terms = [(term, 1.0) for term in self.expand(prefix)]
+        if not terms and fuzzy:
+            terms = self.fuzzy_expand(prefix)
+        if not terms:
+            return np.zeros(self.next_doc_id)
+
+        doc_count = len(self.doc_terms)
+        ids = []
+        weights = []
+        for term, match_weight in terms:
+            term_ids, term_weights = self.term_arrays(term)
+            ids.append(term_ids)
+            weights.append(term_weights * (match_weight * math.log(1 + doc_count / len(term_ids))))
+        return np.bincount(np.concatenate(ids), weights=np.concatenate(weights), minlength=self.next_doc_id)
+
+
+_search_index = None
+
+
+def get_search_index() -> SearchIndex:
+    """Shared search index, kept up to date by every repository write on a background thread
+
+    search() syncs with the card list it is given, so it is never behind the cards
+    it is asked about: the worker only does the work ahead of time.
+    """
+    global _search_index
+    if _search_index is None:
+        from ..models import CardRepository
+        _search_index = SearchIndex()
+        worker = IndexWorker(_search_index.sync)
+        CardRepository().add_listener(worker.submit)
+    return _search_index
+
+
+class SearchWorker:
+    """Runs searches on a background thread, only the most recent query counts
+
+    A query submitted while another is waiting replaces it, and results of a
+    query that was superseded while it ran are dropped instead of being returned.
+    """
+
+    def __init__(self, search: Callable[..., List[int]]):
+        self.search = search  # search(query, cards, class_name=...) -> positions
+        self.condition = threading.Condition()
+        self.request = None
+        self.generation = 0
+        self.delivered = 0
+        self.result = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, query: str, class_name: Optional[str], cards: List[Dict]) -> int:
+        """Queue a search of cards, class_name None for every class"""
+        with self.condition:
+            self.generation += 1
+            self.request = (self.generation, query, class_name, cards)
+            self.condition.notify()
+            return self.generation
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self.generation
+
+    def pending(self) -> bool:
+        """Whether the latest query has not been taken yet"""
+        return self.delivered != self.generation
+
+    def take_result(self) -> Optional[Tuple[List[Dict], List[int], Optional[str]]]:
+        """Return (cards, positions, error) of the latest query once it is done, else None"""
+        with self.condition:
+            if self.result is None or self.is_stale(self.result[0]):
+                return None
+            generation, cards, positions, error = self.result
+            self.result = None
+            self.delivered = generation
+            return cards, positions, error
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.request is None:
+                    self.condition.wait()
+                generation, query, class_name, cards = self.request
+                self.request = None
+
+            error = None
+            try:
+                positions = self.search(query, cards, class_name=class_name)
+            except ValueError as e:
+                # Malformed query, reported to the user
+                positions, error = [], str(e)
+            except Exception as e:
+                print(f"Search error: {e}")
+                positions = []
+
+            with self.condition:
+                if not self.is_stale(generation):
+                    self.result = (generation, cards, positions, error)
+
+
+_search_worker = None
+
+
+def get_search_worker() -> SearchWorker:
+    """Shared background worker running card queries"""
+    global _search_worker
+    if _search_worker is None:
+        from .card_query import get_query_engine
+        _search_worker = SearchWorker(get_query_engine().search)
+    return _search_worker
@@ -0,0 +1,164 @@
+import math
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import AbstractSet, Iterable, List, Optional, Set
+
+MIN_REBUILD_SETS = 64  # TokenSimilarityIndex sets added before the first rebuild of an empty index
+
+
+def combined_similarity(text1: str, text2: str, words1: AbstractSet[str], words2: AbstractSet[str]) -> float:
+    """Weighted word Jaccard and sequence similarity of two cleaned texts and their word sets"""
+    # Calculate Jaccard similarity for word overlap
+    jaccard = len(words1 & words2) / len(words1 | words2) if words1 or words2 else 0
+
+    # Calculate sequence similarity
+    sequence = SequenceMatcher(None, text1, text2).ratio()
+
+    # Return weighted average
+    return (jaccard * 0.5 + sequence * 0.5)
+
+
+def similarity_above(text1: str, text2: str, words1: AbstractSet[str], words2: AbstractSet[str],
+                     threshold: float) -> Optional[float]:
+    """combined_similarity if it is above threshold, else None
+
+    Runs from the cheapest to the most expensive check and stops as soon as an upper
+    bound of the weighted score cannot exceed the threshold: length bound (the same
+    value as real_quick_ratio), the exact word Jaccard, quick_ratio, then the full ratio.
+    """
+    # Jaccard is at most the smaller word set over the larger one
+    jaccard_bound = min(len(words1), len(words2)) / max(len(words1), len(words2)) if words1 or words2 else 0
+    length = len(text1) + len(text2)
+    sequence_bound = 2.0 * min(len(text1), len(text2)) / length if length else 1.0
+    if jaccard_bound * 0.5 + sequence_bound * 0.5 <= threshold:
+        return None
+
+    # Small word sets, far cheaper than building a SequenceMatcher
+    jaccard = len(words1 & words2) / len(words1 | words2) if words1 or words2 else 0
+    if jaccard * 0.5 + sequence_bound * 0.5 <= threshold:
+        return None
+
+    matcher = SequenceMatcher(None, text1, text2)
+    if jaccard * 0.5 + matcher.quick_ratio() * 0.5 <= threshold:
+        return None
+
+    score = jaccard * 0.5 + matcher.ratio() * 0.5
+    return score if score > threshold else None
+
+
+def edit_distance(text1: str, text2: str, max_distance: int) -> int:
+    """Edit distance counting insertions, deletions, substitutions and adjacent transpositions
+
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(text1) - len(text2)) > max_distance:
+        return max_distance + 1
+    if len(text1) > len(text2):
+        text1, text2 = text2, text1
+
+    before_previous = None
+    previous = list(range(len(text1) + 1))
+    for i, char2 in enumerate(text2, 1):
+        current = [i]
+        for j, char1 in enumerate(text1, 1):
+            distance = min(
+                previous[j] + 1,  # Deletion
+                current[j - 1] + 1,  # Insertion
+                previous[j - 1] + (char1 != char2)  # Substitution
+            )
+            if (before_previous is not None and j > 1 and char1 == text2[i - 2]
+                    and text1[j - 2] == char2):
+                distance = min(distance, before_previous[j - 2] + 1)  # Transposition
+            current.append(distance)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def word_jaccard(words1: AbstractSet[str], words2: AbstractSet[str]) -> float:
+    """Jaccard similarity of two word sets"""
+    union = len(words1 | words2)
+    return len(words1 & words2) / union if union else 0
+
+
+class TokenSimilarityIndex:
+    """Inverted token index returning only sets that can reach a minimum Jaccard similarity
+
+    Uses prefix filtering (tokens ordered rarest first, only the prefix of each set is
+    indexed) and size filtering (sets whose sizes alone bound the Jaccard below the
+    minimum are skipped). Sets can be added and removed: every set must be prefixed in
+    the same order, so token rarity is frozen between rebuilds, which happen whenever
+    the index has doubled in size.
+    """
+
+    def __init__(self, token_sets: Iterable[AbstractSet[str]], min_jaccard: float):
+        self.token_sets = list(token_sets)  # Set id -> tokens, None once removed
+        self.min_jaccard = min_jaccard
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Recount token rarity over the current sets and index their prefixes again"""
+        live = [tokens for tokens in self.token_sets if tokens is not None]
+        self.size = len(live)
+        self.frozen_size = self.size
+        self.frequency = Counter(token for tokens in live for token in tokens)
+        self.postings = defaultdict(set)
+
+        if self.min_jaccard <= 0:
+            return  # Nothing can be pruned, candidates() returns everything
+
+        for set_id, tokens in enumerate(self.token_sets):
+            if tokens is not None:
+                for token in self.prefix(tokens):
+                    self.postings[token].add(set_id)
+
+    def add(self, tokens: AbstractSet[str]) -> int:
+        """Index a set, return its id"""
+        set_id = len(self.token_sets)
+        self.token_sets.append(tokens)
+        self.size += 1
+        if self.size > 2 * self.frozen_size + MIN_REBUILD_SETS:
+            self.rebuild()
+        elif self.min_jaccard > 0:
+            # Tokens unseen at the last rebuild count as the rarest
+            for token in self.prefix(tokens):
+                self.postings[token].add(set_id)
+        return set_id
+
+    def remove(self, set_id: int) -> None:
+        """Forget a set, its id is not reused"""
+        tokens = self.token_sets[set_id]
+        if tokens is None:
+            return
+        self.token_sets[set_id] = None
+        self.size -= 1
+        if self.min_jaccard > 0:
+            for token in self.prefix(tokens):
+                postings = self.postings.get(token)
+                if postings is not None:
+                    postings.discard(set_id)
+                    if not postings:
+                        del self.postings[token]
+
+    def prefix(self, tokens: AbstractSet[str]) -> List[str]:
+        """Return the rarest tokens of a set, any set reaching min_jaccard shares one of them"""
+        ordered = sorted(tokens, key=lambda token: (self.frequency.get(token, 0), token))
+        prefix_length = len(ordered) - math.ceil(self.min_jaccard * len(ordered)) + 1
+        return ordered[:prefix_length]
+
+    def candidates(self, tokens: AbstractSet[str]) -> Set[int]:
+        """Return ids of indexed sets whose Jaccard with tokens may reach min_jaccard"""
+        if self.min_jaccard <= 0:
+            return {set_id for set_id, indexed in enumerate(self.token_sets) if indexed is not None}
+
+        size = len(tokens)
+        min_size = self.min_jaccard * size
+        max_size = size / self.min_jaccard
+
+        found = set()
+        for token in self.prefix(tokens):
+            for set_id in self.postings.get(token, ()):
+                if min_size <= len(self.token_sets[set_id]) <= max_size:
+                    found.add(set_id)
+        return found
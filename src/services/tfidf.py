@@ -0,0 +1,230 @@
+import threading
+from collections import Counter
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+from .normalized_text import cleaned_words
+
+SEMANTIC_THRESHOLD = 0.85  # Cosine similarity above which two cards are treated as paraphrases
+CHAR_NGRAM_SIZE = 4
+PAIR_BLOCK_SIZE = 32  # Rows compared at once by similar_pairs and similar_texts
+
+
+def text_features(text: str) -> Counter:
+    """Word and within-word character n-gram counts of a text"""
+    words = cleaned_words(text)
+    features = Counter(words)
+    for word in words:
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - CHAR_NGRAM_SIZE + 1)):
+            features["#" + padded[i:i + CHAR_NGRAM_SIZE]] += 1
+    return features
+
+
+class TfidfEngine:
+    """TF-IDF vector space over card texts with an incrementally growing vocabulary
+
+    Documents are stored as raw term counts; weights use the current IDF whenever
+    vectors are built, so adding cards updates the vocabulary and document
+    frequencies without recomputing anything else. Documents are reference
+    counted: every add() of a key is paired with a remove() by whoever added it,
+    and the document only leaves the engine with its last reference.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.document_frequency = np.zeros(1024, dtype=np.int32)
+        self.documents = {}  # key -> (term ids, term counts)
+        self.references = Counter()  # key -> add() calls not removed yet
+        self.lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.documents
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Add a document or a reference to it, new terms extend the vocabulary"""
+        with self.lock:
+            self.references[key] += 1
+            if key in self.documents:
+                return
+
+        features = text_features(text)
+        with self.lock:
+            if key in self.documents:
+                return
+            term_ids = []
+            for term in features:
+                term_id = self.vocabulary.get(term)
+                if term_id is None:
+                    term_id = self.vocabulary[term] = len(self.vocabulary)
+                term_ids.append(term_id)
+
+            if len(self.vocabulary) > len(self.document_frequency):
+                grown = np.zeros(2 * len(self.vocabulary), dtype=np.int32)
+                grown[:len(self.document_frequency)] = self.document_frequency
+                self.document_frequency = grown
+
+            ids = np.array(term_ids, dtype=np.int32)
+            self.document_frequency[ids] += 1
+            self.documents[key] = (ids, np.fromiter(features.values(), dtype=np.float32, count=len(ids)))
+
+    def remove(self, key: Hashable) -> None:
+        """Drop a reference to a document, the last one removes it and its document frequencies"""
+        with self.lock:
+            if self.references[key] > 1:
+                self.references[key] -= 1
+                return
+            self.references.pop(key, None)
+            document = self.documents.pop(key, None)
+            if document is not None:
+                self.document_frequency[document[0]] -= 1
+
+    def idf(self) -> np.ndarray:
+        """Smoothed inverse document frequency of every vocabulary term"""
+        document_count = len(self.documents)
+        frequency = self.document_frequency[:len(self.vocabulary)]
+        return (np.log((1 + document_count) / (1 + frequency)) + 1).astype(np.float32)
+
+    def matrix(self, keys: Sequence[Hashable]) -> 'DocumentMatrix':
+        """Build the normalized TF-IDF matrix of the documents in keys"""
+        with self.lock:
+            idf = self.idf()
+            rows = [self.documents[key] for key in keys]
+
+        lengths = np.fromiter((len(ids) for ids, _ in rows), dtype=np.int64, count=len(rows))
+        if not lengths.sum():
+            empty = np.zeros(0, dtype=np.int64)
+            return DocumentMatrix(len(rows), idf, empty, empty, np.zeros(0, dtype=np.float32))
+
+        term_ids = np.concatenate([ids for ids, _ in rows])
+        counts = np.concatenate([row_counts for _, row_counts in rows])
+        weights = (1 + np.log(counts)) * idf[term_ids]
+
+        # Row norms in one pass, then normalize every stored weight
+        row_ids = np.repeat(np.arange(len(rows)), lengths)
+        norms = np.sqrt(np.bincount(row_ids, weights=weights * weights, minlength=len(rows)))
+        norms[norms == 0] = 1
+        return DocumentMatrix(len(rows), idf, row_ids, term_ids, (weights / norms[row_ids]).astype(np.float32))
+
+    def query_terms(self, text: str, idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Term ids and normalized TF-IDF weights of a text over the current vocabulary"""
+        features = text_features(text)
+        known = [(self.vocabulary[term], count) for term, count in features.items()
+                 if self.vocabulary.get(term, len(idf)) < len(idf)]
+        if not known:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        term_ids = np.array([term_id for term_id, _ in known], dtype=np.int64)
+        counts = np.array([count for _, count in known], dtype=np.float32)
+        weights = (1 + np.log(counts)) * idf[term_ids]
+
+        # Terms outside the vocabulary still count towards the query norm, at the maximum idf
+        unseen_idf = np.log(1 + len(self.documents)) + 1
+        unknown = [(1 + np.log(count)) * unseen_idf for term, count in features.items()
+                   if self.vocabulary.get(term, len(idf)) >= len(idf)]
+        norm = np.sqrt(np.sum(weights * weights) + np.sum(np.square(unknown)))
+        return term_ids, (weights / norm).astype(np.float32)
+
+    def similarities(self, texts: Sequence[str], keys: Sequence[Hashable]) -> np.ndarray:
+        """Cosine similarity of each text against every document in keys, as a texts x keys array"""
+        return self.query_scores(texts, self.matrix(keys))
+
+    def query_scores(self, texts: Sequence[str], matrix: 'DocumentMatrix') -> np.ndarray:
+        """Cosine similarity of each text against every row of a matrix, as a texts x rows array
+
+        The matrix can be kept across calls, texts are weighted with its idf.
+        """
+        queries = [self.query_terms(text, matrix.idf) for text in texts]
+        query_ids = np.repeat(np.arange(len(queries)), [len(term_ids) for term_ids, _ in queries])
+        if not len(query_ids):
+            return np.zeros((len(texts), matrix.row_count), dtype=np.float32)
+        term_ids = np.concatenate([term_ids for term_ids, _ in queries])
+        weights = np.concatenate([weights for _, weights in queries])
+        return matrix.scores(query_ids, term_ids, weights, len(texts))
+
+    def similar_texts(self, texts: Sequence[str], keys: Sequence[Hashable],
+                      min_score: float = SEMANTIC_THRESHOLD) -> List[Tuple[int, int, float]]:
+        """Return (text index, key index, cosine) for every text and document of keys with cosine >= min_score
+
+        Texts are scored PAIR_BLOCK_SIZE at a time, so memory stays bounded however
+        many there are.
+        """
+        matrix = self.matrix(keys)
+        found = []
+        for start in range(0, len(texts), PAIR_BLOCK_SIZE):
+            scores = self.query_scores(texts[start:start + PAIR_BLOCK_SIZE], matrix)
+            for i, j in zip(*np.nonzero(scores >= min_score)):
+                found.append((start + int(i), int(j), float(scores[i, j])))
+        return found
+
+    def similar_pairs(self, keys: Sequence[Hashable], min_score: float = SEMANTIC_THRESHOLD) -> List[Tuple[int, int, float]]:
+        """Return (i, j, cosine) for every pair i < j of keys with cosine >= min_score"""
+        matrix = self.matrix(keys)
+        count = len(keys)
+        if count < 2 or not len(matrix.data):
+            return []
+
+        pairs = []
+        row_ends = np.searchsorted(matrix.row_ids, np.arange(count + 1))
+        for start in range(0, count, PAIR_BLOCK_SIZE):
+            stop = min(start + PAIR_BLOCK_SIZE, count)
+
+            # The matrix's own rows as a block of queries against the whole matrix
+            entries = slice(row_ends[start], row_ends[stop])
+            scores = matrix.scores(
+                matrix.row_ids[entries] - start, matrix.term_ids[entries], matrix.data[entries], stop - start
+            )
+
+            for i, j in zip(*np.nonzero(scores >= min_score)):
+                if start + i < j:
+                    pairs.append((start + int(i), int(j), float(scores[i, j])))
+        return pairs
+
+
+class DocumentMatrix:
+    """Sparse normalized TF-IDF matrix, stored by row and by term for fast products"""
+
+    def __init__(self, row_count: int, idf: np.ndarray, row_ids: np.ndarray,
+                 term_ids: np.ndarray, data: np.ndarray):
+        self.row_count = row_count
+        self.idf = idf
+        self.row_ids = row_ids  # Entries sorted by row
+        self.term_ids = term_ids
+        self.data = data
+
+        # Postings: entries grouped by term, with the offset of each term's run
+        order = np.argsort(term_ids, kind='stable')
+        self.posting_rows = row_ids[order]
+        self.posting_data = data[order]
+        self.term_offsets = np.zeros(len(idf) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(idf)), out=self.term_offsets[1:])
+
+    def scores(self, query_ids: np.ndarray, term_ids: np.ndarray, weights: np.ndarray,
+               query_count: int) -> np.ndarray:
+        """Dot products of sparse queries, given as (query, term, weight) entries, with every row"""
+        starts = self.term_offsets[term_ids]
+        lengths = self.term_offsets[term_ids + 1] - starts
+
+        # Gather every posting of every query term in one pass
+        total = int(lengths.sum())
+        run_starts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        postings = run_starts + np.arange(total)
+
+        products = self.posting_data[postings] * np.repeat(weights, lengths)
+        cells = np.repeat(query_ids, lengths) * self.row_count + self.posting_rows[postings]
+        flat = np.bincount(cells, weights=products, minlength=query_count * self.row_count)
+        return flat.reshape(query_count, self.row_count).astype(np.float32)
+
+
+_engine = TfidfEngine()
+
+
+def get_engine() -> TfidfEngine:
+    """Shared engine, so the vocabulary persists across duplicate checks"""
+    return _engine
+
+
+def card_text(card: Dict) -> str:
+    """Text of a card as indexed by the engine"""
+    return f"{card.get('question', '')} {card.get('answer', '')}"
@@ -6,6 +6,9 @@ from typing import Any, Dict, List, Optional
 FLASHCARD_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flashcards.json")
 SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "settings.json")
 STATS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "study_stats.json")
+DUPLICATE_INDEX_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "duplicate_index.json")
+AI_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ai_cache")
+GENERATION_QUEUE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "generation_queue.json")
 
 
 def safe_json_load(file_path: str, default_value: Any) -> Any:
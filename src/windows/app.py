@@ -13,6 +13,26 @@ class FlashcardApp(BaseWindow):
     def __init__(self, root: Optional[tk.Tk] = None):
         super().__init__(root, "Flashcard App", MAIN_WINDOW_SIZE)
         self.setup_main_screen()
+        # Load the duplicate and similarity indexes once idle, they then follow every card write
+        self.window.after_idle(self.load_duplicate_index)
+        self.window.after_idle(self.load_similarity_index)
+        # Resume queued generation jobs and save their cards as they arrive
+        self.window.after_idle(self.start_generation_queue)
+
+    def load_duplicate_index(self):
+        """Load the persistent duplicate index"""
+        from ..services.duplicate_index import get_duplicate_index
+        get_duplicate_index()
+
+    def load_similarity_index(self):
+        """Index the deck's classes, the cards new generations are checked against"""
+        from ..services.card_similarity import get_deck_similarity_index
+        get_deck_similarity_index()
+
+    def start_generation_queue(self):
+        """Attach the background generation queue to the main window"""
+        from ..services.generation_queue import get_generation_queue
+        get_generation_queue().attach(self.window)
 
     def setup_main_screen(self):
         """Set up the main menu screen"""
@@ -38,6 +58,7 @@ class FlashcardApp(BaseWindow):
             ("📖 Study Now", self.open_study_window),
             ("➕ Add Cards", self.open_add_cards),
             ("🤖 Generate Cards", self.open_generate_cards),
+            ("📋 Generation Queue", self.open_generation_queue),
             ("📝 Manage Cards", self.open_card_manager),
             ("📊 Statistics", self.open_statistics),
             ("📈 Visualizations", self.open_visualizations),
@@ -97,3 +118,8 @@ class FlashcardApp(BaseWindow):
             widget.destroy()
         from .generate_cards import GenerateCardsWindow
         GenerateCardsWindow(self.window)
+
+    def open_generation_queue(self) -> None:
+        """Open the generation queue panel, generation goes on in the background"""
+        from .jobs import GenerationQueueWindow
+        GenerationQueueWindow(self.window)
@@ -2,9 +2,10 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 
 from .base import BaseWindow
-from ..config import ADD_CARDS_WINDOW_SIZE
-from ..models import Card
-from ..utils import save_json, safe_json_load, FLASHCARD_FILE, get_available_classes
+from .virtual_list import VirtualCardList
+from ..config import ADD_CARDS_WINDOW_SIZE, SEARCH_DEBOUNCE_MS, QUERY_HINT
+from ..models import Card, CardRepository
+from ..utils import get_available_classes
 
 
 class AddCardsWindow(BaseWindow):
@@ -170,14 +171,8 @@ class AddCardsWindow(BaseWindow):
         # Create new card
         card = Card(question, answer, class_name)
 
-        # Load existing cards
-        cards = safe_json_load(FLASHCARD_FILE, [])
-
-        # Add new card
-        cards.append(card.to_dict())
-
-        # Save updated cards
-        if save_json(FLASHCARD_FILE, cards):
+        # Save the new card
+        if CardRepository().add_cards([card.to_dict()]):
             messagebox.showinfo(
                 "Success",
                 "✅ Flashcard added successfully!"
@@ -209,6 +204,10 @@ class CardManagerWindow(BaseWindow):
         self.search_entry = None
         self.class_filter = None
         self.class_var = tk.StringVar()
+        self.search_job = None
+        self.search_polling = False
+        self.search_status = None
+        self.sort_state = None  # (column, descending) of the last heading click
 
         self.setup_ui()
         self.load_cards()
@@ -256,6 +255,7 @@ class CardManagerWindow(BaseWindow):
             font=("Arial", 11)
         )
         self.class_filter.pack(side="left", padx=5)
+        self.class_filter.bind("<<ComboboxSelected>>", lambda e: self.schedule_search())
 
         # Search
         search_frame2 = ttk.Frame(search_frame)
@@ -273,6 +273,9 @@ class CardManagerWindow(BaseWindow):
             font=("Arial", 11)
         )
         self.search_entry.pack(side="left", padx=5)
+        # Filter live as the user types
+        self.search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
+        self.search_entry.bind("<Return>", lambda e: self.apply_filters())
 
         ttk.Button(
             search_frame2,
@@ -290,28 +293,26 @@ class CardManagerWindow(BaseWindow):
             width=15
         ).pack(side="left", padx=5)
 
+        # Query syntax, or the error of a malformed query
+        self.search_status = ttk.Label(
+            search_frame,
+            text=QUERY_HINT,
+            font=("Arial", 9)
+        )
+        self.search_status.pack(fill="x", padx=5)
+
     def setup_treeview(self, parent):
         """Set up the treeview for displaying cards"""
         tree_frame = ttk.Frame(parent)
         tree_frame.pack(expand=True, fill="both", padx=20, pady=10)
 
-        # Create treeview with scrollbars
-        self.tree = ttk.Treeview(
+        # Virtual list: only the visible rows exist in the treeview
+        self.card_list = VirtualCardList(
             tree_frame,
-            columns=("Class", "Question", "Answer"),
-            show="headings",
-            selectmode="browse"
+            {"Class": "class_name", "Question": "question", "Answer": "answer"},
+            on_heading=self.sort_column
         )
-
-        # Scrollbars
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-
-        # Column headings
-        self.tree.heading("Class", text="Class", command=lambda: self.sort_column("Class"))
-        self.tree.heading("Question", text="Question", command=lambda: self.sort_column("Question"))
-        self.tree.heading("Answer", text="Answer", command=lambda: self.sort_column("Answer"))
+        self.tree = self.card_list.tree
 
         # Column widths
         self.tree.column("Class", width=150, minwidth=100)
@@ -320,8 +321,8 @@ class CardManagerWindow(BaseWindow):
 
         # Grid layout
         self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
-        hsb.grid(row=1, column=0, sticky="ew")
+        self.card_list.vsb.grid(row=0, column=1, sticky="ns")
+        self.card_list.hsb.grid(row=1, column=0, sticky="ew")
 
         # Configure grid weights
         tree_frame.grid_rowconfigure(0, weight=1)
@@ -367,77 +368,76 @@ class CardManagerWindow(BaseWindow):
 
     def load_cards(self):
         """Load cards into the treeview"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Load cards
-        cards = safe_json_load(FLASHCARD_FILE, [])
-        
-        # Insert cards with new indices
-        for i, card in enumerate(cards):
-            self.tree.insert(
-                "",
-                "end",
-                values=(
-                    card.get("class_name", ""),
-                    card.get("question", ""),
-                    card.get("answer", "")
-                ),
-                iid=str(i)
-            )
+        cards = CardRepository().get_cards()
+        self.card_list.set_data(cards, range(len(cards)))
+        self.reset_sort()
 
         # Update class filter
-        self.update_class_filter()
+        self.update_class_filter(cards)
 
-    def update_class_filter(self):
+    def update_class_filter(self, cards):
         """Update class filter combobox values"""
         classes = {"All Classes"}
-        for item in self.tree.get_children():
-            class_name = self.tree.item(item)["values"][0]
+        for card in cards:
+            class_name = card.get("class_name", "")
             if class_name:
                 classes.add(class_name)
         self.class_filter["values"] = sorted(list(classes))
         self.class_filter.set("All Classes")
 
+    def schedule_search(self):
+        """Run the search once typing pauses"""
+        if self.search_job is not None:
+            self.window.after_cancel(self.search_job)
+        self.search_job = self.window.after(SEARCH_DEBOUNCE_MS, self.apply_filters)
+
     def apply_filters(self):
         """Apply class and search filters"""
+        if self.search_job is not None:
+            self.window.after_cancel(self.search_job)
+            self.search_job = None
+        if not self.tree.winfo_exists():
+            return
+
         selected_class = self.class_var.get()
-        search_term = self.search_entry.get().lower()
-
-        # First, clear the tree
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Load all cards
-        cards = safe_json_load(FLASHCARD_FILE, [])
-
-        # Insert only matching cards
-        for i, card in enumerate(cards):
-            # Check class match
-            class_match = (selected_class == "All Classes" or 
-                          card.get("class_name", "") == selected_class)
-            
-            # Check search match in all fields
-            search_match = (
-                not search_term or  # If no search term, consider it a match
-                search_term in card.get("class_name", "").lower() or
-                search_term in card.get("question", "").lower() or
-                search_term in card.get("answer", "").lower()
-            )
+        search_term = self.search_entry.get()
+
+        # Search on the worker thread, a newer query supersedes this one
+        from ..services.search_index import get_search_worker
+        worker = get_search_worker()
+        worker.submit(
+            search_term,
+            None if selected_class in ("", "All Classes") else selected_class,
+            CardRepository().get_cards()
+        )
+        if not self.search_polling:
+            self.search_polling = True
+            self.poll_search(worker)
+
+    def poll_search(self, worker):
+        """Show the results of the latest search once they are ready"""
+        if not self.tree.winfo_exists():
+            self.search_polling = False
+            return
 
-            # Insert if both conditions match
-            if class_match and search_match:
-                self.tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        card.get("class_name", ""),
-                        card.get("question", ""),
-                        card.get("answer", "")
-                    ),
-                    iid=str(i)
-                )
+        result = worker.take_result()
+        if result is None:
+            if worker.pending():
+                self.window.after(20, lambda: self.poll_search(worker))
+            else:
+                self.search_polling = False
+            return
+
+        self.search_polling = False
+        cards, positions, error = result
+        if error:
+            self.search_status.config(text=f"⚠️ {error}", foreground="#dc3545")
+            return
+        self.search_status.config(text=QUERY_HINT, foreground="")
+
+        # Matching cards, best match first
+        self.card_list.set_data(cards, positions)
+        self.reset_sort()
 
     def clear_filters(self):
         """Clear all filters and show all cards"""
@@ -445,18 +445,35 @@ class CardManagerWindow(BaseWindow):
         self.search_entry.delete(0, tk.END)
         self.load_cards()  # Reload all cards
 
-    def sort_column(self, col):
-        """Sort treeview by column"""
-        items = [(self.tree.set(item, col), item) for item in self.tree.get_children()]
-        items.sort()
+    def reset_sort(self):
+        """Forget the sorted column once the list shows new data"""
+        self.sort_state = None
+        for heading in self.card_list.columns:
+            self.tree.heading(heading, text=heading)
 
-        for index, (_, item) in enumerate(items):
-            self.tree.move(item, "", index)
+    def sort_column(self, col):
+        """Sort treeview by column, clicking the same column again reverses the order"""
+        descending = self.sort_state == (col, False)
+        self.sort_state = (col, descending)
+
+        # Precomputed order of every card, restricted to the rows currently listed
+        repository = CardRepository()
+        order = repository.sorted_positions(self.card_list.columns[col])
+        cards = repository.get_cards()
+        positions = self.card_list.positions
+        if self.card_list.cards is cards and len(positions) < len(cards):
+            listed = set(positions)
+            order = [position for position in order if position in listed]
+        self.card_list.set_data(cards, order[::-1] if descending else order)
+
+        for heading in self.card_list.columns:
+            arrow = (" ▼" if descending else " ▲") if heading == col else ""
+            self.tree.heading(heading, text=heading + arrow)
 
     def edit_selected(self):
         """Edit selected card"""
-        selected = self.tree.selection()
-        if not selected:
+        index = self.card_list.selected_card_index()
+        if index is None:
             messagebox.showinfo("Info", "Please select a card to edit")
             return
 
@@ -468,8 +485,10 @@ class CardManagerWindow(BaseWindow):
         edit_window.grab_set()  # Make it modal
 
         # Get selected card data
-        item = self.tree.item(selected[0])
-        class_name, question, answer = item["values"]
+        card = self.card_list.cards[index]
+        class_name = card.get("class_name", "")
+        question = card.get("question", "")
+        answer = card.get("answer", "")
 
         # Create edit form
         ttk.Label(edit_window, text="Class:", font=("Arial", 11)).pack(pady=(20, 5))
@@ -520,15 +539,11 @@ class CardManagerWindow(BaseWindow):
                 return
 
             # Update card in file
-            cards = safe_json_load(FLASHCARD_FILE, [])
-            index = int(selected[0])
-            cards[index].update({
+            if CardRepository().update_cards({index: {
                 "class_name": new_class,
                 "question": new_question,
                 "answer": new_answer
-            })
-
-            if save_json(FLASHCARD_FILE, cards):
+            }}):
                 messagebox.showinfo("Success", "Card updated successfully!")
                 edit_window.destroy()  # Only destroy the edit window
                 self.load_cards()  # Refresh the card list
@@ -559,8 +574,8 @@ class CardManagerWindow(BaseWindow):
 
     def delete_selected(self):
         """Delete selected card"""
-        selected = self.tree.selection()
-        if not selected:
+        index = self.card_list.selected_card_index()
+        if index is None:
             messagebox.showinfo("Info", "Please select a card to delete")
             return
 
@@ -568,42 +583,11 @@ class CardManagerWindow(BaseWindow):
                 "Confirm Delete",
                 "Are you sure you want to delete this card?"
         ):
-            # Save current filter state
-            current_class = self.class_var.get()
-            current_search = self.search_entry.get()
-
             # Delete from file
-            cards = safe_json_load(FLASHCARD_FILE, [])
-            index = int(selected[0])
-            cards.pop(index)
-
-            if save_json(FLASHCARD_FILE, cards):
+            if CardRepository().delete_cards([index]):
                 messagebox.showinfo("Success", "Card deleted successfully!")
-                
-                # Clear and reload cards
-                for item in self.tree.get_children():
-                    self.tree.delete(item)
-                    
-                # Reload cards with new indices
-                for i, card in enumerate(cards):
-                    self.tree.insert(
-                        "",
-                        "end",
-                        values=(
-                            card.get("class_name", ""),
-                            card.get("question", ""),
-                            card.get("answer", "")
-                        ),
-                        iid=str(i)
-                    )
-                
-                # Restore filter state
-                self.class_var.set(current_class)
-                self.search_entry.insert(0, current_search)
-                
-                # Reapply filters if they were active
-                if current_class != "All Classes" or current_search:
-                    self.apply_filters()
+                # Rerun the current filters over the new card list
+                self.apply_filters()
             else:
                 messagebox.showerror("Error", "Failed to delete card")
 
@@ -676,16 +660,15 @@ class CardManagerWindow(BaseWindow):
                 return
 
             # Update all cards with this class name
-            cards = safe_json_load(FLASHCARD_FILE, [])
-            changes_made = False
-
-            for card in cards:
-                if card.get("class_name") == old_name:
-                    card["class_name"] = new_name
-                    changes_made = True
-
-            if changes_made:
-                if save_json(FLASHCARD_FILE, cards):
+            repository = CardRepository()
+            changes = {
+                i: {"class_name": new_name}
+                for i, card in enumerate(repository.get_cards())
+                if card.get("class_name") == old_name
+            }
+
+            if changes:
+                if repository.update_cards(changes):
                     messagebox.showinfo("Success", f"Renamed class '{old_name}' to '{new_name}'")
                     manage_window.destroy()
                     self.load_cards()  # Refresh the card list
@@ -716,216 +699,9 @@ class CardManagerWindow(BaseWindow):
 
     def check_duplicates(self):
         """Check for duplicate or similar cards"""
-        cards = safe_json_load(FLASHCARD_FILE, [])
-        if not cards:
+        if not CardRepository().get_cards():
             messagebox.showinfo("Info", "No cards to check")
             return
 
-        # Create a window to show duplicates
-        dup_window = tk.Toplevel(self.window)
-        dup_window.title("Duplicate Cards")
-        dup_window.geometry("1000x700")
-        dup_window.transient(self.window)
-
-        # Create main frame with padding
-        main_frame = ttk.Frame(dup_window, padding=10)
-        main_frame.pack(fill="both", expand=True)
-
-        # Add header
-        ttk.Label(
-            main_frame,
-            text="🔍 Duplicate Cards Checker",
-            font=("Arial", 16, "bold")
-        ).pack(pady=(0, 10))
-
-        # Create scrolled text widget
-        text_frame = ttk.Frame(main_frame)
-        text_frame.pack(fill="both", expand=True)
-
-        # Add duplicate pairs list
-        duplicates_frame = ttk.Frame(text_frame)
-        duplicates_frame.pack(fill="both", expand=True, pady=10)
-
-        # Create canvas for scrolling
-        canvas = tk.Canvas(duplicates_frame)
-        scrollbar = ttk.Scrollbar(duplicates_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Check for duplicates
-        from ..services.ai_service import AICardGenerator
-        duplicates_found = []
-
-        # Group cards by class
-        class_cards = {}
-        for i, card in enumerate(cards):
-            class_name = card.get('class_name', 'Unknown')
-            if class_name not in class_cards:
-                class_cards[class_name] = []
-            class_cards[class_name].append((i, card))  # Store index with card
-
-        # Check duplicates within each class
-        for class_name, class_card_list in class_cards.items():
-            for i, (idx1, card1) in enumerate(class_card_list):
-                for idx2, card2 in class_card_list[i+1:]:
-                    q1 = card1['question'].lower().strip()
-                    q2 = card2['question'].lower().strip()
-                    a1 = card1['answer'].lower().strip()
-                    a2 = card2['answer'].lower().strip()
-                    
-                    question_similarity = AICardGenerator.check_similarity(q1, q2)
-                    answer_similarity = AICardGenerator.check_similarity(a1, a2)
-
-                    if question_similarity > 0.7 or answer_similarity > 0.7:
-                        duplicates_found.append({
-                            'class': class_name,
-                            'card1': {'index': idx1, 'card': card1},
-                            'card2': {'index': idx2, 'card': card2},
-                            'q_sim': question_similarity,
-                            'a_sim': answer_similarity
-                        })
-
-        if not duplicates_found:
-            ttk.Label(
-                scrollable_frame,
-                text="No duplicate cards found!",
-                font=("Arial", 12)
-            ).pack(pady=20)
-        else:
-            # Show each duplicate pair
-            for i, dup in enumerate(duplicates_found, 1):
-                pair_frame = ttk.LabelFrame(
-                    scrollable_frame,
-                    text=f"Potential Duplicate Pair {i} (Class: {dup['class']})",
-                    padding=10
-                )
-                pair_frame.pack(fill="x", pady=10, padx=5)
-
-                # Card 1
-                ttk.Label(
-                    pair_frame,
-                    text="Card 1:",
-                    font=("Arial", 11, "bold")
-                ).pack(anchor="w")
-                ttk.Label(
-                    pair_frame,
-                    text=f"Q: {dup['card1']['card']['question']}",
-                    wraplength=800
-                ).pack(anchor="w")
-                ttk.Label(
-                    pair_frame,
-                    text=f"A: {dup['card1']['card']['answer']}",
-                    wraplength=800
-                ).pack(anchor="w")
-
-                # Card 2
-                ttk.Label(
-                    pair_frame,
-                    text="Card 2:",
-                    font=("Arial", 11, "bold")
-                ).pack(anchor="w", pady=(10, 0))
-                ttk.Label(
-                    pair_frame,
-                    text=f"Q: {dup['card2']['card']['question']}",
-                    wraplength=800
-                ).pack(anchor="w")
-                ttk.Label(
-                    pair_frame,
-                    text=f"A: {dup['card2']['card']['answer']}",
-                    wraplength=800
-                ).pack(anchor="w")
-
-                # Similarity info
-                ttk.Label(
-                    pair_frame,
-                    text=f"Similarity - Question: {dup['q_sim']:.2f}, Answer: {dup['a_sim']:.2f}",
-                    font=("Arial", 10, "italic")
-                ).pack(pady=(5, 10))
-
-                # Action buttons
-                btn_frame = ttk.Frame(pair_frame)
-                btn_frame.pack(fill="x")
-
-                def create_keep_command(dup_info, keep_idx):
-                    def command():
-                        self.handle_duplicate(dup_info, keep_idx)
-                    return command
-
-                ttk.Button(
-                    btn_frame,
-                    text="Keep Card 1",
-                    command=create_keep_command(dup, 1),
-                    width=15
-                ).pack(side="left", padx=5)
-
-                ttk.Button(
-                    btn_frame,
-                    text="Keep Card 2",
-                    command=create_keep_command(dup, 2),
-                    width=15
-                ).pack(side="left", padx=5)
-
-                ttk.Button(
-                    btn_frame,
-                    text="Keep Both",
-                    command=create_keep_command(dup, 0),
-                    width=15
-                ).pack(side="left", padx=5)
-
-        # Pack canvas and scrollbar
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-
-        # Add close button at bottom
-        ttk.Button(
-            main_frame,
-            text="Close",
-            command=dup_window.destroy,
-            style="Action.TButton",
-            width=20
-        ).pack(pady=10)
-
-    def handle_duplicate(self, dup_info, keep_card):
-        """Handle duplicate card resolution"""
-        cards = safe_json_load(FLASHCARD_FILE, [])
-        
-        # Find the duplicate window
-        dup_window = None
-        for widget in self.window.winfo_children():
-            if isinstance(widget, tk.Toplevel) and widget.title() == "Duplicate Cards":
-                dup_window = widget
-                break
-
-        if not dup_window:
-            return
-
-        # Handle the action
-        if keep_card == 0:  # Keep both
-            if messagebox.askyesno("Confirm", "Keep both cards?"):
-                # No need to modify cards, but refresh displays
-                messagebox.showinfo("Info", "Keeping both cards")
-                # Destroy and recreate the duplicates window to refresh it
-                dup_window.destroy()
-                self.check_duplicates()
-        else:
-            # Determine which card to remove
-            remove_idx = dup_info['card2']['index'] if keep_card == 1 else dup_info['card1']['index']
-            
-            # Remove the card
-            if messagebox.askyesno("Confirm", "Are you sure you want to delete the selected card?"):
-                cards.pop(remove_idx)
-                if save_json(FLASHCARD_FILE, cards):
-                    messagebox.showinfo("Success", "Card deleted successfully!")
-                    self.load_cards()  # Refresh the main window display
-                    # Destroy and recreate the duplicates window to refresh it
-                    dup_window.destroy()
-                    self.check_duplicates()
-                else:
-                    messagebox.showerror("Error", "Failed to delete card")
+        from .duplicates import DuplicatesWindow
+        DuplicatesWindow(self)
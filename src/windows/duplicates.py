@@ -0,0 +1,430 @@
+import bisect
+import threading
+import tkinter as tk
+from tkinter import ttk
+from tkinter import messagebox
+from typing import Callable, Dict, List
+
+from ..config import DUPLICATES_WINDOW_SIZE, DUPLICATES_PER_PAGE
+from ..models import CardRepository
+from ..services.normalized_text import card_keys
+
+SORT_ORDERS = ("Order Found", "Most Similar", "Least Similar")
+KEEP_BOTH = 0
+DECISION_TEXT = {1: "Queued: keep card 1", 2: "Queued: keep card 2", KEEP_BOTH: "Queued: keep both"}
+
+
+def pair_similarity(dup: Dict) -> float:
+    """Highest similarity of a duplicate pair, used for sorting"""
+    return max(dup['q_sim'], dup['a_sim'], dup.get('semantic') or 0)
+
+
+class DuplicatePairView:
+    """Widgets showing one duplicate pair, reused for whichever pair is on its slot"""
+
+    def __init__(self, parent, on_keep):
+        self.dup = None
+        self.frame = ttk.LabelFrame(parent, padding=10)
+
+        # Card 1
+        ttk.Label(
+            self.frame,
+            text="Card 1:",
+            font=("Arial", 11, "bold")
+        ).pack(anchor="w")
+        self.question1 = ttk.Label(self.frame, wraplength=800)
+        self.question1.pack(anchor="w")
+        self.answer1 = ttk.Label(self.frame, wraplength=800)
+        self.answer1.pack(anchor="w")
+
+        # Card 2
+        ttk.Label(
+            self.frame,
+            text="Card 2:",
+            font=("Arial", 11, "bold")
+        ).pack(anchor="w", pady=(10, 0))
+        self.question2 = ttk.Label(self.frame, wraplength=800)
+        self.question2.pack(anchor="w")
+        self.answer2 = ttk.Label(self.frame, wraplength=800)
+        self.answer2.pack(anchor="w")
+
+        # Similarity info
+        self.similarity = ttk.Label(self.frame, font=("Arial", 10, "italic"))
+        self.similarity.pack(pady=(5, 10))
+
+        # Queued resolution of this pair
+        self.decision = ttk.Label(self.frame, font=("Arial", 10, "bold"))
+        self.decision.pack(anchor="w", pady=(0, 5))
+
+        # Action buttons
+        btn_frame = ttk.Frame(self.frame)
+        btn_frame.pack(fill="x")
+
+        for text, keep in (("Keep Card 1", 1), ("Keep Card 2", 2), ("Keep Both", 0)):
+            ttk.Button(
+                btn_frame,
+                text=text,
+                command=lambda keep=keep: on_keep(self.dup, keep),
+                width=15
+            ).pack(side="left", padx=5)
+
+    def show(self, dup: Dict, number: int, decision: str = "") -> None:
+        """Display a pair in this slot"""
+        self.dup = dup
+        self.frame.config(text=f"Potential Duplicate Pair {number} (Class: {dup['class']})")
+        self.question1.config(text=f"Q: {dup['card1']['card']['question']}")
+        self.answer1.config(text=f"A: {dup['card1']['card']['answer']}")
+        self.question2.config(text=f"Q: {dup['card2']['card']['question']}")
+        self.answer2.config(text=f"A: {dup['card2']['card']['answer']}")
+
+        similarity_text = f"Similarity - Question: {dup['q_sim']:.2f}, Answer: {dup['a_sim']:.2f}"
+        if dup.get('semantic') is not None:
+            similarity_text += f", Meaning: {dup['semantic']:.2f}"
+        self.similarity.config(text=similarity_text)
+        self.decision.config(text=decision)
+        self.frame.pack(fill="x", pady=10, padx=5)
+
+    def hide(self) -> None:
+        self.dup = None
+        self.frame.pack_forget()
+
+
+class DuplicatesWindow:
+    """Paginated duplicate review: only one page of pair widgets exists, whatever the pair count"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.cards = CardRepository().get_cards()
+
+        self.pairs = []  # Pairs in the current sort order
+        self.sort_keys = []  # Sort key of each pair, for inserting pairs as they arrive
+        self.found_count = 0
+        self.page = 0
+        self.sort_var = tk.StringVar(value=SORT_ORDERS[0])
+        self.scanned = threading.Event()  # Set once the duplicate index has scored every card write
+        self.resolutions = {}  # Pair number -> card to keep (1, 2 or KEEP_BOTH)
+
+        self.window = tk.Toplevel(manager.window)
+        self.window.title("Duplicate Cards")
+        self.window.geometry(DUPLICATES_WINDOW_SIZE)
+        self.window.transient(manager.window)
+
+        self.setup_ui()
+        self.start_scan()
+
+    def setup_ui(self):
+        """Set up the header, paging controls and the reusable pair slots"""
+        main_frame = ttk.Frame(self.window, padding=10)
+        main_frame.pack(fill="both", expand=True)
+
+        # Add header
+        ttk.Label(
+            main_frame,
+            text="🔍 Duplicate Cards Checker",
+            font=("Arial", 16, "bold")
+        ).pack(pady=(0, 10))
+
+        # Status shown while the background scan runs
+        self.status_label = ttk.Label(
+            main_frame,
+            text="⏳ Scanning for duplicates...",
+            font=("Arial", 11, "italic")
+        )
+        self.status_label.pack(pady=(0, 5))
+
+        # Sorting and paging controls
+        controls = ttk.Frame(main_frame)
+        controls.pack(fill="x", pady=5)
+
+        ttk.Label(controls, text="Sort by:").pack(side="left", padx=5)
+        sort_box = ttk.Combobox(
+            controls,
+            textvariable=self.sort_var,
+            values=SORT_ORDERS,
+            state="readonly",
+            width=15
+        )
+        sort_box.pack(side="left", padx=5)
+        sort_box.bind("<<ComboboxSelected>>", lambda e: self.resort())
+
+        self.next_button = ttk.Button(controls, text="Next ▶", command=lambda: self.go_to_page(self.page + 1))
+        self.next_button.pack(side="right", padx=5)
+        self.page_label = ttk.Label(controls, text="")
+        self.page_label.pack(side="right", padx=10)
+        self.prev_button = ttk.Button(controls, text="◀ Previous", command=lambda: self.go_to_page(self.page - 1))
+        self.prev_button.pack(side="right", padx=5)
+
+        # Scrollable page of pairs
+        duplicates_frame = ttk.Frame(main_frame)
+        duplicates_frame.pack(fill="both", expand=True, pady=10)
+
+        self.canvas = tk.Canvas(duplicates_frame)
+        scrollbar = ttk.Scrollbar(duplicates_frame, orient="vertical", command=self.canvas.yview)
+        page_frame = ttk.Frame(self.canvas)
+
+        page_frame.bind(
+            "<Configure>",
+            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        )
+
+        self.canvas.create_window((0, 0), window=page_frame, anchor="nw")
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+
+        self.empty_label = ttk.Label(page_frame, text="No duplicate cards found!", font=("Arial", 12))
+        self.views = [DuplicatePairView(page_frame, self.queue_resolution)
+                      for _ in range(DUPLICATES_PER_PAGE)]
+
+        self.canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        # Queued resolutions are applied together
+        action_frame = ttk.Frame(main_frame)
+        action_frame.pack(pady=10)
+
+        ttk.Button(
+            action_frame,
+            text="📏 Keep Longer Answers",
+            command=self.queue_longer_answers,
+            style="Action.TButton",
+            width=22
+        ).pack(side="left", padx=5)
+
+        self.apply_button = ttk.Button(
+            action_frame,
+            text="✅ Apply Resolutions",
+            command=self.apply_resolutions,
+            style="Action.TButton",
+            width=22,
+            state="disabled"
+        )
+        self.apply_button.pack(side="left", padx=5)
+
+        ttk.Button(
+            action_frame,
+            text="↩️ Clear Queue",
+            command=self.clear_resolutions,
+            style="Action.TButton",
+            width=16
+        ).pack(side="left", padx=5)
+
+        ttk.Button(
+            action_frame,
+            text="Close",
+            command=self.window.destroy,
+            style="Action.TButton",
+            width=16
+        ).pack(side="left", padx=5)
+
+        self.render_page()
+
+    def sort_key(self, dup: Dict):
+        order = self.sort_var.get()
+        if order == "Most Similar":
+            return -pair_similarity(dup), dup['number']
+        if order == "Least Similar":
+            return pair_similarity(dup), dup['number']
+        return dup['number']
+
+    def add_pairs(self, dups: List[Dict]) -> None:
+        """Insert pairs at their sorted position and refresh the visible page if it changed"""
+        if not dups:
+            return
+
+        first_position = len(self.pairs)
+        for dup in dups:
+            self.found_count += 1
+            dup['number'] = self.found_count
+            key = self.sort_key(dup)
+            position = bisect.bisect_right(self.sort_keys, key)
+            self.sort_keys.insert(position, key)
+            self.pairs.insert(position, dup)
+            first_position = min(first_position, position)
+
+        if first_position < (self.page + 1) * DUPLICATES_PER_PAGE:
+            self.render_page()
+        else:
+            self.update_page_label()
+
+    def resort(self) -> None:
+        """Apply the selected sort order and go back to the first page"""
+        self.pairs.sort(key=self.sort_key)
+        self.sort_keys = [self.sort_key(dup) for dup in self.pairs]
+        self.go_to_page(0)
+
+    def page_count(self) -> int:
+        return max(1, -(-len(self.pairs) // DUPLICATES_PER_PAGE))
+
+    def go_to_page(self, page: int) -> None:
+        self.page = min(max(page, 0), self.page_count() - 1)
+        self.render_page()
+        self.canvas.yview_moveto(0)
+
+    def render_page(self) -> None:
+        """Show the pairs of the current page in the fixed set of slots"""
+        start = self.page * DUPLICATES_PER_PAGE
+        page_pairs = self.pairs[start:start + DUPLICATES_PER_PAGE]
+        for view in self.views:
+            view.hide()
+        for view, dup in zip(self.views, page_pairs):
+            decision = self.resolutions.get(dup['number'])
+            view.show(dup, dup['number'], DECISION_TEXT.get(decision, ""))
+        self.update_page_label()
+
+    def update_page_label(self) -> None:
+        self.page_label.config(text=f"Page {self.page + 1} of {self.page_count()}")
+        self.prev_button.config(state="normal" if self.page > 0 else "disabled")
+        self.next_button.config(state="normal" if self.page < self.page_count() - 1 else "disabled")
+
+        # Resolutions are applied once the index has scored every card
+        can_apply = bool(self.resolutions) and self.scanned.is_set()
+        self.apply_button.config(
+            text=f"✅ Apply {len(self.resolutions)} Resolutions",
+            state="normal" if can_apply else "disabled"
+        )
+
+    def queue_resolution(self, dup: Dict, keep: int) -> None:
+        """Queue the resolution of a pair, choosing the queued option again removes it"""
+        if dup is None:
+            return
+        if self.resolutions.get(dup['number']) == keep:
+            del self.resolutions[dup['number']]
+        else:
+            self.resolutions[dup['number']] = keep
+        self.render_page()
+
+    def queue_longer_answers(self) -> None:
+        """Queue keeping the card with the longer answer for every pair not yet resolved"""
+        for dup in self.pairs:
+            if dup['number'] not in self.resolutions:
+                answer1 = dup['card1']['card']['answer'].strip()
+                answer2 = dup['card2']['card']['answer'].strip()
+                self.resolutions[dup['number']] = 2 if len(answer2) > len(answer1) else 1
+        self.render_page()
+
+    def clear_resolutions(self) -> None:
+        self.resolutions.clear()
+        self.render_page()
+
+    def apply_resolutions(self) -> None:
+        """Apply every queued resolution with a single write, then update the list in place"""
+        if not self.resolutions:
+            return
+        if not messagebox.askyesno(
+                "Confirm",
+                f"Apply {len(self.resolutions)} resolutions?",
+                parent=self.window
+        ):
+            return
+
+        from ..services.duplicate_index import get_duplicate_index
+        index = get_duplicate_index()
+
+        # Cards are found by key in the deck as it is now: it may have changed since the
+        # scan, and a pair whose card was edited or deleted meanwhile is left out
+        positions = {key: i for i, key in enumerate(card_keys(CardRepository().get_cards()))}
+
+        # Pairs are resolved in list order; a pair whose kept card was already
+        # removed by an earlier resolution is skipped, so no cluster loses every card
+        removed = set()
+        stale = 0
+        for dup in self.pairs:
+            keep = self.resolutions.get(dup['number'])
+            if keep is None:
+                continue
+            key1, key2 = dup['card1']['key'], dup['card2']['key']
+            if key1 not in positions or key2 not in positions:
+                stale += 1
+                continue
+            if keep == KEEP_BOTH:
+                index.dismiss(key1, key2)
+                continue
+
+            kept, dropped = (key1, key2) if keep == 1 else (key2, key1)
+            if kept not in removed:
+                removed.add(dropped)
+
+        if removed:
+            # The repository write also queues an update of the duplicate index
+            if not CardRepository().delete_cards(positions[key] for key in removed):
+                messagebox.showerror("Error", "Failed to delete cards", parent=self.window)
+                return
+        else:
+            # Dismissed pairs are saved in the background with the next index save
+            index.worker.touch()
+
+        message = f"Applied {len(self.resolutions) - stale} resolutions, {len(removed)} cards deleted"
+        if stale:
+            message += f"\n{stale} pairs were skipped: their cards changed since the scan"
+        self.remove_resolved_pairs()
+        self.manager.load_cards()  # Refresh the main window display
+        messagebox.showinfo("Success", message, parent=self.window)
+        self.resolutions.clear()
+        self.render_page()
+
+    def remove_resolved_pairs(self) -> None:
+        """Drop resolved pairs and pairs of cards no longer in the deck, updating the positions of the others"""
+        self.sync_pairs(lambda dup: dup['number'] in self.resolutions)
+        self.page = min(self.page, self.page_count() - 1)
+        self.status_label.config(text=f"✅ {len(self.pairs)} potential duplicate pairs left")
+        if not self.pairs:
+            self.empty_label.pack(pady=20)
+
+    def sync_pairs(self, drop: Callable[[Dict], bool]) -> None:
+        """Follow the current deck: drop pairs of cards no longer in it and those matching drop,
+        give the others their current positions"""
+        self.cards = CardRepository().get_cards()
+        positions = {key: i for i, key in enumerate(card_keys(self.cards))}
+        kept_pairs = []
+        for dup in self.pairs:
+            if drop(dup) or dup['card1']['key'] not in positions or dup['card2']['key'] not in positions:
+                self.resolutions.pop(dup['number'], None)
+                continue
+            for card in (dup['card1'], dup['card2']):
+                card['index'] = positions[card['key']]
+            kept_pairs.append(dup)
+
+        self.pairs = kept_pairs
+        self.sort_keys = [self.sort_key(dup) for dup in self.pairs]
+
+    def start_scan(self) -> None:
+        """Show the pairs already known to the index, then those of the writes it is still scoring
+
+        The shared index is only synced by its worker, which follows every card write:
+        the window waits for it rather than scanning its own copy of the deck.
+        """
+        from ..services.duplicate_index import get_duplicate_index
+        index = get_duplicate_index()
+        self.add_pairs(index.pending(self.cards))
+
+        def wait():
+            index.worker.wait()
+            self.scanned.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        self.poll_scan()
+
+    def poll_scan(self) -> None:
+        if not self.window.winfo_exists():
+            return
+
+        if not self.scanned.is_set():
+            self.status_label.config(text=f"⏳ Scanning for duplicates... {len(self.pairs)} found so far")
+            self.window.after(100, self.poll_scan)
+            return
+
+        # Pairs the worker recorded meanwhile, for the deck as it is now
+        from ..services.duplicate_index import get_duplicate_index, pair_key
+        shown = {pair_key(dup['card1']['key'], dup['card2']['key']) for dup in self.pairs}
+        self.sync_pairs(lambda dup: False)
+        self.add_pairs([
+            dup for dup in get_duplicate_index().pending(self.cards)
+            if pair_key(dup['card1']['key'], dup['card2']['key']) not in shown
+        ])
+        self.page = min(self.page, self.page_count() - 1)
+
+        if not self.pairs:
+            self.status_label.config(text="")
+            self.empty_label.pack(pady=20)
+        else:
+            self.status_label.config(text=f"✅ Scan complete: {len(self.pairs)} potential duplicate pairs")
+        self.render_page()
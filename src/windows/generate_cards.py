@@ -1,9 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from .base import BaseWindow
-from ..config import SETTINGS_WINDOW_SIZE
-from ..services.ai_service import AICardGenerator
-from ..utils import save_json, safe_json_load, FLASHCARD_FILE, get_available_classes
+from ..config import SETTINGS_WINDOW_SIZE, AI_BATCH_SIZE, MAX_GENERATED_CARDS
+from ..models import CardRepository
+from ..services.ai_service import GenerationJob
+from ..services.card_similarity import get_deck_similarity_index
+from ..utils import get_available_classes
 
 class LoadingAnimation:
     def __init__(self, window):
@@ -46,6 +48,10 @@ class LoadingAnimation:
 class GenerateCardsWindow(BaseWindow):
     def __init__(self, parent):
         super().__init__(parent, "Generate Cards", SETTINGS_WINDOW_SIZE)
+        self.job = None  # Generation running in the background
+        self.loading = None
+        self.generated_cards = []
+        self.generated_class = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -143,7 +149,7 @@ class GenerateCardsWindow(BaseWindow):
         ttk.Scale(
             num_frame,
             from_=1,
-            to=20,
+            to=MAX_GENERATED_CARDS,
             orient="horizontal",
             variable=self.num_cards,
             command=lambda _: self.update_num_label()
@@ -165,14 +171,51 @@ class GenerateCardsWindow(BaseWindow):
                 value=diff
             ).pack(side="left", padx=10)
 
-        # Generate button
-        ttk.Button(
+        # Identical requests replay the cached response unless this is checked
+        self.force_refresh = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
             main_frame,
+            text="🔄 Ignore cached responses",
+            variable=self.force_refresh
+        ).pack(anchor="w", padx=20)
+
+        # Cards shown as they stream in
+        preview_frame = ttk.LabelFrame(main_frame, text="Generated Cards", padding=10)
+        preview_frame.pack(fill="both", expand=True, padx=20, pady=10)
+
+        preview_scroll = ttk.Scrollbar(preview_frame)
+        preview_scroll.pack(side="right", fill="y")
+        self.preview_list = tk.Listbox(
+            preview_frame,
+            height=6,
+            yscrollcommand=preview_scroll.set,
+            font=("Arial", 11)
+        )
+        self.preview_list.pack(fill="both", expand=True)
+        preview_scroll.config(command=self.preview_list.yview)
+
+        # Generate and cancel buttons
+        generate_frame = ttk.Frame(main_frame)
+        generate_frame.pack(pady=20)
+
+        self.generate_button = ttk.Button(
+            generate_frame,
             text="🔮 Generate Cards",
             command=self.generate_cards,
             style="Action.TButton",
             width=25
-        ).pack(pady=20)
+        )
+        self.generate_button.pack(side="left", padx=5)
+
+        self.cancel_button = ttk.Button(
+            generate_frame,
+            text="⏹️ Cancel",
+            command=self.cancel_job,
+            style="Action.TButton",
+            width=15,
+            state="disabled"
+        )
+        self.cancel_button.pack(side="left", padx=5)
 
         # Return button
         ttk.Button(
@@ -192,7 +235,17 @@ class GenerateCardsWindow(BaseWindow):
             self.new_class_entry.config(state="normal")
 
     def update_num_label(self):
-        self.num_label.config(text=f"{self.num_cards.get()} cards")
+        num_cards = self.num_cards.get()
+        requests = -(-num_cards // AI_BATCH_SIZE)
+        batches = f" ({requests} requests run together)" if requests > 1 else ""
+        self.num_label.config(text=f"{num_cards} cards{batches}")
+
+    def show_generated(self, cards):
+        """Add cards to the preview as soon as they are generated"""
+        for card in cards:
+            self.preview_list.insert("end", f"❓ {card['question']}")
+        self.preview_list.see("end")
+        self.preview_list.master.config(text=f"Generated Cards ({self.preview_list.size()})")
 
     def update_char_count(self, event=None):
         """Update character count label and enforce limit"""
@@ -206,7 +259,7 @@ class GenerateCardsWindow(BaseWindow):
             self.topic_text.insert("1.0", content[:2000])
 
     def generate_cards(self):
-        """Modified to handle duplicate detection with animation"""
+        """Start generating cards in the background, with duplicate detection and animation"""
         topic = self.topic_text.get("1.0", "end-1c").strip()
         if not topic:
             messagebox.showwarning("Input Error", "Please enter a topic!")
@@ -228,55 +281,98 @@ class GenerateCardsWindow(BaseWindow):
                 messagebox.showwarning("Input Error", "Please enter a new class name!")
                 return
 
+        if self.job is not None and not self.job.is_done():
+            return
+
+        # Generate in the background, cards are shown as they arrive
+        self.job = GenerationJob(
+            topic,
+            self.num_cards.get(),
+            self.difficulty.get(),
+            get_deck_similarity_index(),
+            class_name,
+            force_refresh=self.force_refresh.get()
+        )
+        self.generated_cards = []
+        self.generated_class = class_name
+        self.preview_list.delete(0, "end")
+
         # Show loading animation
         self.window.config(cursor="wait")
-        loading = LoadingAnimation(self.window)
-        loading.start()
-        self.window.update()
-
-        try:
-            # Load existing cards
-            existing_cards = safe_json_load(FLASHCARD_FILE, [])
-
-            # Generate cards and check for duplicates
-            new_cards, duplicate_count = AICardGenerator.generate_unique_cards(
-                topic,
-                self.num_cards.get(),
-                self.difficulty.get(),
-                existing_cards
-            )
-
-            if not new_cards:
-                raise Exception("Failed to generate cards")
-
-            # Add new cards
-            for card in new_cards:
-                card_dict = {
-                    "question": card["question"],
-                    "answer": card["answer"],
-                    "class_name": class_name,
-                    "difficulty": self.difficulty.get()
-                }
-                existing_cards.append(card_dict)
-
-            # Save cards
-            if save_json(FLASHCARD_FILE, existing_cards):
-                message = f"✨ Generated {len(new_cards)} new flashcards for '{class_name}'!"
-                if duplicate_count > 0:
-                    message += f"\n\n{duplicate_count} similar cards were filtered out."
-                
-                messagebox.showinfo("Success", message)
-                self.return_to_main()
-            else:
-                raise Exception("Failed to save cards")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate cards: {str(e)}")
-
-        finally:
-            # Stop animation
-            loading.stop()
-            self.window.config(cursor="")
+        self.loading = LoadingAnimation(self.window)
+        self.loading.start()
+        self.generate_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+
+        # Leaving the window cancels the job
+        self.preview_list.bind("<Destroy>", lambda e: self.job.cancel())
+        self.job.start()
+        self.poll_job()
+
+    def poll_job(self):
+        """Show the cards generated so far, then the outcome once the job ends"""
+        if not self.preview_list.winfo_exists():
+            return
+
+        cards = self.job.drain()
+        if cards:
+            self.generated_cards.extend(cards)
+            self.show_generated(cards)
+
+        if not self.job.is_done():
+            self.window.after(100, self.poll_job)
+            return
+
+        # Stop animation
+        self.loading.stop()
+        self.window.config(cursor="")
+        self.generate_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+
+        new_cards = self.generated_cards
+        if self.job.cancelled.is_set():
+            if new_cards and messagebox.askyesno(
+                    "Generation Cancelled",
+                    f"Keep the {len(new_cards)} cards generated before cancelling?"):
+                self.save_cards(new_cards, 0)
+        elif self.job.error:
+            messagebox.showerror("Error", f"Failed to generate cards: {self.job.error}")
+        elif not new_cards:
+            messagebox.showerror("Error", "Failed to generate cards: no valid cards were returned")
+        else:
+            self.save_cards(new_cards, self.job.duplicate_count)
+
+    def cancel_job(self):
+        """Abort the generation in progress"""
+        if self.job is not None and not self.job.is_done():
+            self.cancel_button.config(state="disabled")
+            self.job.cancel()
+
+    def save_cards(self, new_cards, duplicate_count):
+        """Add generated cards to the deck and return to the menu"""
+        class_name = self.generated_class
+        card_dicts = [
+            {
+                "question": card["question"],
+                "answer": card["answer"],
+                "class_name": class_name,
+                "difficulty": self.difficulty.get()
+            }
+            for card in new_cards
+        ]
+
+        if not CardRepository().add_cards(card_dicts):
+            messagebox.showerror("Error", "Failed to generate cards: Failed to save cards")
+            return
+
+        message = f"✨ Generated {len(new_cards)} new flashcards for '{class_name}'!"
+        if duplicate_count > 0:
+            message += f"\n\n{duplicate_count} similar cards were filtered out."
+        if self.job is not None:
+            message += f"\n\n📊 {self.job.stats.summary()}"
+
+        messagebox.showinfo("Success", message)
+        self.return_to_main()
 
     def return_to_main(self):
         """Return to main menu"""
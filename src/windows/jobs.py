@@ -0,0 +1,197 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from ..config import QUEUE_WINDOW_SIZE, QUEUE_POLL_MS, MAX_GENERATED_CARDS
+from ..services.generation_queue import FINISHED, RETRYABLE, get_generation_queue
+
+STATUS_TEXT = {
+    "queued": "⏳ Queued",
+    "running": "🤖 Generating",
+    "done": "✅ Done",
+    "partial": "⚠️ Partial",
+    "failed": "❌ Failed",
+    "cancelled": "⏹️ Cancelled",
+}
+
+
+class GenerationQueueWindow:
+    """Queue generation jobs for many topics and follow them while they run in the background"""
+
+    def __init__(self, parent):
+        self.queue = get_generation_queue()
+        self.queue.attach(parent)
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Generation Queue")
+        self.window.geometry(QUEUE_WINDOW_SIZE)
+        self.window.transient(parent)
+
+        self.num_cards = tk.IntVar(value=50)
+        self.difficulty = tk.StringVar(value="mixed")
+
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        main_frame = ttk.Frame(self.window, padding=10)
+        main_frame.pack(fill="both", expand=True)
+
+        ttk.Label(
+            main_frame,
+            text="📋 Generation Queue",
+            font=("Arial", 16, "bold")
+        ).pack(pady=(0, 10))
+
+        # New jobs: one topic per line, "Class | instructions" to set the class
+        add_frame = ttk.LabelFrame(main_frame, text="Queue Topics (one per line, optionally Class | topic)", padding=10)
+        add_frame.pack(fill="x", pady=5)
+
+        self.topics_text = tk.Text(add_frame, height=5, wrap="word", font=("Arial", 11))
+        self.topics_text.pack(fill="x", pady=5)
+
+        options = ttk.Frame(add_frame)
+        options.pack(fill="x")
+
+        ttk.Label(options, text="Cards per topic:").pack(side="left", padx=5)
+        ttk.Spinbox(
+            options,
+            from_=1,
+            to=MAX_GENERATED_CARDS,
+            textvariable=self.num_cards,
+            width=6
+        ).pack(side="left", padx=5)
+
+        ttk.Label(options, text="Difficulty:").pack(side="left", padx=5)
+        ttk.Combobox(
+            options,
+            textvariable=self.difficulty,
+            values=["easy", "medium", "hard", "mixed"],
+            state="readonly",
+            width=10
+        ).pack(side="left", padx=5)
+
+        ttk.Button(
+            options,
+            text="➕ Add to Queue",
+            command=self.add_jobs,
+            style="Action.TButton",
+            width=18
+        ).pack(side="right", padx=5)
+
+        # Jobs
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(fill="both", expand=True, pady=10)
+
+        self.tree = ttk.Treeview(
+            list_frame,
+            columns=("Class", "Topic", "Cards", "Status"),
+            show="headings",
+            selectmode="extended"
+        )
+        for heading, width in (("Class", 150), ("Topic", 330), ("Cards", 90), ("Status", 200)):
+            self.tree.heading(heading, text=heading)
+            self.tree.column(heading, width=width, minwidth=60)
+
+        vsb = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        list_frame.grid_rowconfigure(0, weight=1)
+        list_frame.grid_columnconfigure(0, weight=1)
+
+        self.summary_label = ttk.Label(main_frame, text="", font=("Arial", 11, "italic"))
+        self.summary_label.pack(pady=5)
+
+        # Actions
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=5)
+
+        for text, command in (
+            ("⏹️ Cancel Selected", self.cancel_selected),
+            ("🔄 Retry Selected", self.retry_selected),
+            ("🧹 Clear Finished", self.clear_finished),
+            ("↩️ Close", self.window.destroy),
+        ):
+            ttk.Button(
+                button_frame,
+                text=text,
+                command=command,
+                style="Action.TButton",
+                width=18
+            ).pack(side="left", padx=5)
+
+    def add_jobs(self):
+        """Queue a job for each line of the topics box"""
+        topics = []
+        for line in self.topics_text.get("1.0", "end-1c").splitlines():
+            class_name, separator, topic = line.partition("|")
+            if not separator:
+                class_name, topic = line, line
+            if topic.strip() and class_name.strip():
+                topics.append({'topic': topic.strip(), 'class_name': class_name.strip()})
+
+        if not topics:
+            messagebox.showwarning("Input Error", "Please enter at least one topic!", parent=self.window)
+            return
+        try:
+            num_cards = min(max(int(self.num_cards.get()), 1), MAX_GENERATED_CARDS)
+        except (tk.TclError, ValueError):
+            messagebox.showwarning("Input Error", "Please enter a number of cards!", parent=self.window)
+            return
+
+        self.queue.add(topics, num_cards, self.difficulty.get())
+        self.topics_text.delete("1.0", "end")
+        self.refresh(reschedule=False)
+
+    def selected_ids(self):
+        return list(self.tree.selection())
+
+    def cancel_selected(self):
+        for job_id in self.selected_ids():
+            self.queue.cancel(job_id)
+        self.refresh(reschedule=False)
+
+    def retry_selected(self):
+        for job_id in self.selected_ids():
+            self.queue.retry(job_id)
+        self.refresh(reschedule=False)
+
+    def clear_finished(self):
+        self.queue.clear_finished()
+        self.refresh(reschedule=False)
+
+    def refresh(self, reschedule: bool = True):
+        """Show the jobs' progress, the Treeview items are keyed by job id and updated in place"""
+        if not self.window.winfo_exists():
+            return
+
+        jobs = self.queue.snapshot()
+        pending = {}
+        for job_id, _ in list(self.queue.pending_cards):
+            pending[job_id] = pending.get(job_id, 0) + 1
+
+        current = set()
+        for job in jobs:
+            current.add(job['id'])
+            status = STATUS_TEXT.get(job['status'], job['status'])
+            if job['status'] in RETRYABLE and job.get('error'):
+                status += f": {job['error']}"
+            saved = job['saved'] + pending.get(job['id'], 0)
+            values = (job['class_name'], job['topic'], f"{saved}/{job['num_cards']}", status)
+            if self.tree.exists(job['id']):
+                self.tree.item(job['id'], values=values)
+            else:
+                self.tree.insert("", "end", iid=job['id'], values=values)
+        for item in self.tree.get_children():
+            if item not in current:
+                self.tree.delete(item)
+
+        active = sum(job['status'] not in FINISHED for job in jobs)
+        generated = sum(job['saved'] for job in jobs) + sum(pending.values())
+        self.summary_label.config(
+            text=f"{active} jobs waiting or running, {generated} cards generated, "
+                 f"{sum(pending.values())} waiting to be saved"
+        )
+
+        if reschedule:
+            self.window.after(QUEUE_POLL_MS, self.refresh)
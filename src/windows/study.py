@@ -1,7 +1,9 @@
+import math
 import random  # Make sure this is imported at the top
+import tkinter.font as tkfont
 import tkinter.messagebox as messagebox
 from tkinter import ttk
-from typing import Optional
+from typing import Dict, Optional
 
 from .base import BaseWindow
 from ..config import STUDY_WINDOW_SIZE, CLASS_SELECTION_SIZE, ENABLE_ANIMATIONS, \
@@ -9,6 +11,11 @@ from ..config import STUDY_WINDOW_SIZE, CLASS_SELECTION_SIZE, ENABLE_ANIMATIONS,
 from ..models import StudyStats, Settings
 from ..utils import load_cards_for_class, get_available_classes, safe_json_load, save_json, FLASHCARD_FILE
 
+CARD_SEPARATOR = "━━━━━━━━━━━━━━━━━━━━━━"
+CARD_WRAP_LENGTH = 900
+CARD_FONT_SIZES = (16, 14, 12)  # Largest first, long cards step down
+DEFAULT_CARD_TEXT_HEIGHT = 450  # Used before the card frame has been laid out
+
 
 def get_grade_info(accuracy):
     """Get grade information based on accuracy"""
@@ -50,6 +57,10 @@ class StudyWindow(BaseWindow):
         self.show_answer_btn = None
         self.button_frame = None
         self.content_label = None
+        self.staged_label = None
+        self.staged_index = None
+        self.prepared_cards = {}
+        self.card_fonts = []
         self.card_frame = None
         self.progress_label = None
         self.class_name = class_name
@@ -124,17 +135,13 @@ class StudyWindow(BaseWindow):
         )
         self.card_frame.pack(fill="both", expand=True, padx=40, pady=20)
 
-        # Question/Answer text
-        self.content_label = ttk.Label(
-            self.card_frame,
-            text="",
-            wraplength=900,
-            justify="center",
-            anchor="center",
-            font=("Arial", 16),
-            style="Content.TLabel"
-        )
+        # Fonts used to measure and display card text
+        self.card_fonts = [tkfont.Font(family="Arial", size=size) for size in CARD_FONT_SIZES]
+
+        # Question/Answer text, plus a hidden label holding the pre-rendered next card
+        self.content_label = self.create_content_label()
         self.content_label.pack(fill="both", expand=True, padx=30, pady=30)
+        self.staged_label = self.create_content_label()
 
         # Buttons frame
         self.button_frame = ttk.Frame(main_frame)  # Store reference
@@ -175,43 +182,125 @@ class StudyWindow(BaseWindow):
         # Add hover effects
         self.add_button_hover_effects()
 
+    def create_content_label(self) -> ttk.Label:
+        """Create a label for displaying card content"""
+        return ttk.Label(
+            self.card_frame,
+            text="",
+            wraplength=CARD_WRAP_LENGTH,
+            justify="center",
+            anchor="center",
+            font=self.card_fonts[0],
+            style="Content.TLabel"
+        )
+
+    def prepare_card(self, index: int) -> Dict:
+        """Build and measure the question and answer views of a card (cached)"""
+        if index in self.prepared_cards:
+            return self.prepared_cards[index]
+
+        card = self.cards[index]
+        progress = f"📝 Card {index + 1} of {len(self.cards)}"
+        difficulty_text = get_difficulty_emoji(card.get('difficulty', 'medium'))
+
+        question_view = (
+            f"{progress} - {difficulty_text}\n\n"
+            f"{CARD_SEPARATOR}\n\n"
+            f"Question:\n{card['question']}"
+        )
+        answer_view = (
+            f"{question_view}\n\n"
+            f"{CARD_SEPARATOR}\n\n"
+            f"Answer:\n{card['answer']}"
+        )
+
+        prepared = {
+            'question': question_view,
+            'answer': answer_view,
+            # Measure the longest view so flipping never changes the font
+            'font': self.fit_font(answer_view)
+        }
+        self.prepared_cards[index] = prepared
+        return prepared
+
+    def fit_font(self, text: str) -> tkfont.Font:
+        """Pick the largest card font whose wrapped text fits in the card frame"""
+        available_height = self.card_frame.winfo_height() - 120  # Frame and label padding
+        if available_height <= 0:
+            available_height = DEFAULT_CARD_TEXT_HEIGHT
+
+        for font in self.card_fonts:
+            line_count = sum(
+                max(1, math.ceil(font.measure(line) / CARD_WRAP_LENGTH))
+                for line in text.split("\n")
+            )
+            if line_count * font.metrics("linespace") <= available_height:
+                return font
+        return self.card_fonts[-1]
+
+    def stage_card(self, index: int) -> None:
+        """Render a card's question view into the hidden label"""
+        prepared = self.prepare_card(index)
+        self.staged_label.configure(text=prepared['question'], font=prepared['font'])
+        self.staged_index = index
+
+    def prefetch_next_card(self) -> None:
+        """Prepare the next card while the current one is being read"""
+        if not self.staged_label.winfo_exists():
+            return  # Study screen was closed
+        next_index = self.current_index + 1
+        if next_index < len(self.cards) and self.staged_index != next_index:
+            self.stage_card(next_index)
+
+    def update_progress(self) -> None:
+        """Update the progress label"""
+        progress_pct = (self.total_attempted / len(self.cards)) * 100
+        self.progress_label.configure(
+            text=f"📊 Progress: {progress_pct:.1f}% ({self.total_attempted}/{len(self.cards)})"
+        )
+
     def show_current_card(self):
         """Show the current card"""
         if self.current_index >= len(self.cards):
             self.show_completion_screen()
             return
 
-        card = self.cards[self.current_index]
-        progress = f"📝 Card {self.current_index + 1} of {len(self.cards)}"
-        difficulty = card.get('difficulty', 'medium')
-        difficulty_text = get_difficulty_emoji(difficulty)
+        prepared = self.prepare_card(self.current_index)
 
         if self.answer_showing:
-            content = (
-                f"{progress} - {difficulty_text}\n\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
-                f"Question:\n{card['question']}\n\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
-                f"Answer:\n{card['answer']}"
-            )
+            content = prepared['answer']
             self.show_answer_btn.configure(text="🔒 Hide Answer (Space)")
             self.answer_frame.pack()
         else:
-            content = (
-                f"{progress} - {difficulty_text}\n\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
-                f"Question:\n{card['question']}"
-            )
+            content = prepared['question']
             self.show_answer_btn.configure(text="🔍 Show Answer (Space)")
             self.answer_frame.pack_forget()
 
-        self.content_label.configure(text=content)
+        self.content_label.configure(text=content, font=prepared['font'])
 
         # Update progress with emoji
-        progress_pct = (self.total_attempted / len(self.cards)) * 100
-        self.progress_label.configure(
-            text=f"📊 Progress: {progress_pct:.1f}% ({self.total_attempted}/{len(self.cards)})"
-        )
+        self.update_progress()
+        self.window.after_idle(self.prefetch_next_card)
+
+    def advance_card(self):
+        """Move to the next card by swapping in its pre-rendered label"""
+        if self.current_index >= len(self.cards):
+            self.show_completion_screen()
+            return
+
+        if self.staged_index != self.current_index:
+            self.stage_card(self.current_index)
+
+        self.content_label.pack_forget()
+        self.content_label, self.staged_label = self.staged_label, self.content_label
+        self.content_label.pack(fill="both", expand=True, padx=30, pady=30)
+        self.staged_index = None
+
+        self.show_answer_btn.configure(text="🔍 Show Answer (Space)")
+        self.answer_frame.pack_forget()
+
+        self.update_progress()
+        self.window.after_idle(self.prefetch_next_card)
 
     def toggle_answer(self):
         """Toggle answer visibility with animation"""
@@ -299,7 +388,7 @@ class StudyWindow(BaseWindow):
                     self.button_frame.pack(**button_frame_info)  # Restore button frame
 
                     # Show next card
-                    self.show_current_card()
+                    self.advance_card()
 
             # Animation parameters
             current_x = self.card_frame.winfo_x()
@@ -317,7 +406,7 @@ class StudyWindow(BaseWindow):
             self.total_attempted += 1
             self.current_index += 1
             self.answer_showing = False
-            self.show_current_card()
+            self.advance_card()
 
     def mark_correct(self):
         """Mark current card as correct with animation"""
@@ -0,0 +1,151 @@
+from tkinter import ttk
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_ROW_HEIGHT = 20
+HEADING_HEIGHT = 25
+
+
+class VirtualCardList:
+    """Treeview that only holds the rows visible at the current scroll position
+
+    The list shows cards[position] for each position of a sequence of positions.
+    A fixed set of Treeview items is reused: scrolling, filtering and sorting only
+    change the values of those items, whatever the number of cards.
+    """
+
+    def __init__(self, parent, columns: Dict[str, str], on_heading: Optional[Callable[[str], None]] = None):
+        self.columns = columns  # Heading -> card field
+        self.cards = []
+        self.positions = []
+        self.offset = 0
+        self.visible_rows = 1
+        self.items = []  # Reused Treeview items, one per visible row
+        self.selected_position = None
+
+        self.tree = ttk.Treeview(
+            parent,
+            columns=tuple(columns),
+            show="headings",
+            selectmode="browse"
+        )
+
+        # The vertical scrollbar follows the whole list, not the Treeview's few rows
+        self.vsb = ttk.Scrollbar(parent, orient="vertical", command=self.on_scrollbar)
+        self.hsb = ttk.Scrollbar(parent, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hsb.set)
+
+        for heading in columns:
+            self.tree.heading(
+                heading,
+                text=heading,
+                command=(lambda h=heading: on_heading(h)) if on_heading else ""
+            )
+
+        style_height = ttk.Style().lookup("Treeview", "rowheight")
+        self.row_height = int(style_height) if style_height else DEFAULT_ROW_HEIGHT
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+
+    def set_data(self, cards: List[Dict], positions: Sequence[int], keep_offset: bool = False) -> None:
+        """Show cards[position] for each position, in order"""
+        if cards is not self.cards:
+            self.selected_position = None  # Positions refer to the previous card list
+        self.cards = cards
+        self.positions = positions
+        if not keep_offset:
+            self.offset = 0
+        self.render()
+
+    def on_resize(self, event) -> None:
+        rows = max(1, (event.height - HEADING_HEIGHT) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+    def max_offset(self) -> int:
+        return max(0, len(self.positions) - self.visible_rows)
+
+    def render(self) -> None:
+        """Fill the reused items with the rows at the current offset"""
+        self.offset = min(max(self.offset, 0), self.max_offset())
+        rows = list(self.positions[self.offset:self.offset + self.visible_rows])
+
+        # Items are only created when the visible row count grows
+        while len(self.items) < len(rows):
+            self.items.append(self.tree.insert("", "end", values=()))
+
+        selected_item = None
+        for row, (item, position) in enumerate(zip(self.items, rows)):
+            card = self.cards[position]
+            self.tree.item(item, values=tuple(card.get(field, "") for field in self.columns.values()))
+            self.tree.move(item, "", row)  # Reattaches items detached by a shorter list
+            if position == self.selected_position:
+                selected_item = item
+
+        # Unused items are detached, not deleted
+        for item in self.items[len(rows):]:
+            if self.tree.exists(item):
+                self.tree.detach(item)
+
+        current = self.tree.selection()
+        if selected_item is None and current:
+            self.tree.selection_remove(current)
+        elif selected_item is not None and current != (selected_item,):
+            self.tree.selection_set(selected_item)
+
+        total = len(self.positions)
+        if total:
+            self.vsb.set(self.offset / total, min(1.0, (self.offset + len(rows)) / total))
+        else:
+            self.vsb.set(0, 1)
+
+    def on_scrollbar(self, action, amount, unit=None) -> None:
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.positions))
+            self.render()
+        else:
+            self.scroll(int(amount), unit)
+
+    def scroll(self, amount: int, unit: str = "units") -> str:
+        step = self.visible_rows if unit == "pages" else 1
+        self.offset += amount * step
+        self.render()
+        return "break"
+
+    def move_selection(self, direction: int) -> str:
+        """Move the selection with the keyboard, scrolling at the edges of the visible rows"""
+        rows = self.positions
+        if not len(rows):
+            return "break"
+        try:
+            index = rows.index(self.selected_position)
+        except ValueError:
+            index = self.offset - direction
+
+        index = min(max(index + direction, 0), len(rows) - 1)
+        self.selected_position = rows[index]
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible_rows:
+            self.offset = index - self.visible_rows + 1
+        self.render()
+        return "break"
+
+    def on_select(self, event) -> None:
+        selection = self.tree.selection()
+        if selection and selection[0] in self.items:
+            row = self.items.index(selection[0])
+            if self.offset + row < len(self.positions):
+                self.selected_position = self.positions[self.offset + row]
+
+    def selected_card_index(self) -> Optional[int]:
+        """Position in cards of the selected row, None if no row is selected"""
+        return self.selected_position if self.tree.selection() else None
@@ -0,0 +1,14 @@
+import pytest
+
+from src import models
+from src.utils import save_json
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    """A fresh CardRepository over an empty deck file in tmp_path"""
+    path = str(tmp_path / "flashcards.json")
+    save_json(path, [])
+    monkeypatch.setattr(models, "FLASHCARD_FILE", path)
+    monkeypatch.setattr(models.CardRepository, "_instance", None)
+    return models.CardRepository()
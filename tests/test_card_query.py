@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services.card_query import QueryEngine, QueryError, parse_query
+from src.services.search_index import SearchIndex
+
+NOW = datetime(2025, 1, 15, 10, 30)
+TODAY = datetime(2025, 1, 15)
+
+
+def clauses(query: str):
+    return [(clause.field, clause.op, clause.value) for clause in parse_query(query, NOW).clauses]
+
+
+def test_parse_fields_words_and_phrases():
+    query = parse_query('class:"Advanced databases" difficulty:hard level<2 due:today "normal form" key', NOW)
+    assert [(clause.field, clause.op, clause.value) for clause in query.clauses] == [
+        ('class_name', '=', 'advanced databases'),
+        ('difficulty', '=', 'hard'),
+        ('level', '<', 2),
+        ('due', '<', (TODAY + timedelta(days=1)).timestamp()),
+    ]
+    assert query.words == ['key']
+    assert query.phrases == [['normal', 'form']]
+    assert query.text() == "key normal form"
+    assert not query.is_plain_text()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("level:3", [('level', '=', 3)]),
+    ("level>=1", [('level', '>=', 1)]),
+    ("LEVEL<=0", [('level', '<=', 0)]),
+    ("diff:Easy", [('difficulty', '=', 'easy')]),
+    ("class_name=Biology", [('class_name', '=', 'biology')]),
+    ("due:overdue", [('due', '<', TODAY.timestamp())]),
+    ("due:week", [('due', '<', (TODAY + timedelta(days=7)).timestamp())]),
+    ("due:2025-01-31", [('due', '<', datetime(2025, 2, 1).timestamp())]),
+])
+def test_parse_clauses(query, expected):
+    assert clauses(query) == expected
+
+
+def test_unknown_fields_and_plain_text():
+    query = parse_query("note: http://example.com what", NOW)
+    assert query.clauses == []
+    assert query.words == ['note:', 'http://example.com', 'what']
+    assert query.is_plain_text()
+
+
+def test_phrases_split_at_punctuation():
+    query = parse_query('"Boyce-Codd normal" "unterminated phrase', NOW)
+    assert query.phrases == [['boyce', 'codd', 'normal'], ['unterminated', 'phrase']]
+    assert parse_query('"" "!?"', NOW).phrases == []
+
+
+@pytest.mark.parametrize("query, message", [
+    ("class:", "Missing value after class:"),
+    ('class:""', "Missing value after class:"),
+    ("level:abc", "Level must be a whole number, not 'abc'"),
+    ("difficulty<hard", "difficulty can only be compared with ':'"),
+    ("due>today", "due can only be compared with ':'"),
+    ("due:tomorrowish", "due must be one of overdue, today, week or a date, not 'tomorrowish'"),
+])
+def test_parse_errors(query, message):
+    with pytest.raises(QueryError, match=message):
+        parse_query(query, NOW)
+
+
+CARDS = [
+    {'question': 'What is Boyce-Codd normal form?', 'answer': 'BCNF', 'class_name': 'Databases',
+     'difficulty': 'hard', 'level': 1},
+    {'question': 'What is third normal form?', 'answer': '3NF', 'class_name': 'Databases',
+     'difficulty': 'medium', 'level': 3},
+    {'question': 'Who proposed the relational model?', 'answer': 'Edgar Codd', 'class_name': 'History',
+     'level': 0},
+    {'question': 'Normal distribution', 'answer': 'Bell curve', 'class_name': 'Statistics',
+     'difficulty': 'easy'},
+]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("class:databases", [0, 1]),
+    ("class:databases level>=2", [1]),
+    ("difficulty:medium", [1, 2]),
+    ('"normal form"', [0, 1]),
+    ('"boyce-codd normal"', [0]),
+    ("class:databases codd", [0]),
+    ("level<1 codd", [2]),
+    ("class:nothing", []),
+])
+def test_search(query, expected):
+    engine = QueryEngine(SearchIndex())
+    assert sorted(engine.search(query, CARDS)) == expected
+
+
+def test_search_within_class():
+    engine = QueryEngine(SearchIndex())
+    assert sorted(engine.search("normal", CARDS, class_name="Databases")) == [0, 1]
+    assert engine.search("normal", CARDS, limit=1, class_name="Statistics") == [3]
@@ -0,0 +1,89 @@
+import random
+from itertools import combinations
+
+from src.services.duplicate_index import (DUPLICATE_THRESHOLD, DuplicateIndex, MinHashLSH, candidate_pairs,
+                                          pair_payload, score_pairs)
+
+WORDS = [f"word{i}" for i in range(40)]
+
+
+def variant(rng: random.Random, text: str) -> str:
+    """text with a few words replaced, dropped or added"""
+    words = text.split()
+    for _ in range(rng.randint(0, 3)):
+        edit = rng.randrange(3)
+        if edit == 0:
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+        elif edit == 1 and len(words) > 2:
+            del words[rng.randrange(len(words))]
+        else:
+            words.insert(rng.randint(0, len(words)), rng.choice(WORDS))
+    return " ".join(words)
+
+
+def make_deck(seed: int, groups: int = 40, per_group: int = 5):
+    """Groups of near-duplicate cards, so many pairs land around the threshold"""
+    rng = random.Random(seed)
+    cards = []
+    for group in range(groups):
+        question = " ".join(rng.choices(WORDS, k=rng.randint(3, 10)))
+        answer = " ".join(rng.choices(WORDS, k=rng.randint(3, 10)))
+        for _ in range(per_group):
+            cards.append({'question': variant(rng, question), 'answer': variant(rng, answer),
+                          'class_name': f"Class {group % 3}"})
+    return cards
+
+
+def duplicates_by_full_scan(cards, threshold=DUPLICATE_THRESHOLD):
+    pairs = [(i, j, None) for i, j in combinations(range(len(cards)), 2)
+             if cards[i]['class_name'] == cards[j]['class_name']]
+    payload = [pair_payload(cards, *pair) for pair in pairs]
+    return {(found[0], found[1]) for found in score_pairs(payload, threshold)}
+
+
+def test_lsh_candidates_recall_every_duplicate():
+    for seed in range(3):
+        cards = make_deck(seed)
+        expected = duplicates_by_full_scan(cards)
+        candidates = {(idx1, idx2) for idx1, idx2, _ in candidate_pairs(cards)}
+        assert len(expected) > 100
+        assert expected <= candidates
+
+
+def test_lsh_band_collision_rate_at_threshold():
+    """Word sets with Jaccard 0.4, the lowest a duplicate at 0.7 can have, share a bucket ~99.6% of the time"""
+    lsh = MinHashLSH()
+    collisions = 0
+    trials = 500
+    for trial in range(trials):
+        shared = {f"s{trial}_{i}" for i in range(4)}
+        words1 = shared | {f"a{trial}_{i}" for i in range(3)}
+        words2 = shared | {f"b{trial}_{i}" for i in range(3)}  # Jaccard 4 / 10
+        keys1 = set(lsh.band_keys(lsh.signature(words1)))
+        keys2 = set(lsh.band_keys(lsh.signature(words2)))
+        collisions += bool(keys1 & keys2)
+    assert collisions / trials >= 0.98
+
+
+def test_empty_signatures_are_never_candidates():
+    lsh = MinHashLSH()
+    assert lsh.signature([]) == ()
+    lsh.insert("a", ())
+    lsh.insert("b", ())
+    lsh.insert("c", lsh.signature({"x"}))
+    lsh.insert("d", lsh.signature({"x"}))
+    assert lsh.candidate_pairs() == {("c", "d")}
+
+
+def test_incremental_index_finds_the_full_scan_duplicates():
+    cards = make_deck(5, groups=20)
+    index = DuplicateIndex(path=None)
+    for end in range(10, len(cards) + 10, 10):
+        index.update(cards[:end])
+    found = {(dup['card1']['index'], dup['card2']['index']) for dup in index.pending(cards)}
+    assert duplicates_by_full_scan(cards) <= found
+
+    # Removed cards take their pairs with them
+    index.update(cards[10:])
+    for dup in index.pending(cards[10:]):
+        assert dup['card1']['key'] in index.signatures and dup['card2']['key'] in index.signatures
@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.ai_service import AICardGenerator
+from src.services.generation_queue import CANCELLED, DONE, FAILED, PARTIAL, QUEUED, RUNNING, GenerationQueue
+from src.utils import save_json
+
+
+class FakeGenerator:
+    """Stands in for AICardGenerator.generate_batches, with a scripted number of cards per topic"""
+
+    def __init__(self):
+        self.yields = {}  # Topic -> cards generated, default all that were asked for
+        self.blocked = set()  # Topics that run until cancelled
+        self.requested = []  # (topic, num_cards) per call
+        self.running = set()
+        self.together = []  # Topics running at once, as each call starts
+
+    async def __call__(self, topic, num_cards, difficulty, existing=None, concurrency=None,
+                       on_cards=None, force_refresh=False, stats=None, async_client=None):
+        self.requested.append((topic, num_cards))
+        self.running.add(topic)
+        self.together.append(set(self.running))
+        try:
+            await asyncio.sleep(0.01)
+            while topic in self.blocked:
+                await asyncio.sleep(0.01)
+            count = min(num_cards, self.yields.get(topic, num_cards))
+            cards = [
+                {'question': f"{topic} {len(self.requested)}.{i}?", 'answer': "a", 'class_name': topic,
+                 'difficulty': difficulty}
+                for i in range(count)
+            ]
+            if cards:
+                on_cards(cards)
+            stats.accepted += count
+            return cards, 0
+        finally:
+            self.running.discard(topic)
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    fake = FakeGenerator()
+    monkeypatch.setattr(AICardGenerator, "generate_batches", fake)
+    return fake
+
+
+@pytest.fixture
+def queue(tmp_path, repository, generator):
+    return GenerationQueue(str(tmp_path / "queue.json"), workers=2)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Generation queue did not get there in time")
+        time.sleep(0.01)
+
+
+def wait_idle(queue):
+    """Flush as attach() would, until no job is running or buffered"""
+    def idle():
+        queue.flush()
+        return queue.thread is None and not queue.pending_cards
+    wait_for(idle)
+
+
+def statuses(queue):
+    return {job['topic']: (job['status'], job['saved'], job['error']) for job in queue.snapshot()}
+
+
+def test_jobs_end_done_partial_or_failed(queue, generator, repository):
+    generator.yields = {'Short': 2, 'Empty': 0}
+    queue.add([{'topic': 'Full'}, {'topic': 'Short'}, {'topic': 'Empty'}], 4)
+    wait_idle(queue)
+
+    assert statuses(queue) == {
+        'Full': (DONE, 4, None),
+        'Short': (PARTIAL, 2, "2 cards short"),
+        'Empty': (FAILED, 0, "No cards were generated"),
+    }
+    assert len(repository.get_cards()) == 6
+
+
+def test_retry_asks_only_for_missing_cards(queue, generator):
+    generator.yields = {'Short': 1}
+    job, = queue.add([{'topic': 'Short'}], 3)
+    wait_idle(queue)
+
+    generator.yields = {}
+    queue.retry(job['id'])
+    wait_idle(queue)
+    assert generator.requested == [('Short', 3), ('Short', 2)]
+    assert statuses(queue) == {'Short': (DONE, 3, None)}
+
+    queue.retry(job['id'])  # Done jobs are not retried
+    assert queue.thread is None and len(generator.requested) == 2
+
+
+def test_one_job_per_class_at_a_time(queue, generator, repository):
+    queue.add([{'topic': 'Cells', 'class_name': 'Biology'}, {'topic': 'Plants', 'class_name': 'Biology'},
+               {'topic': 'Rome'}], 2)
+    wait_idle(queue)
+
+    assert all(status == DONE for status, _, _ in statuses(queue).values())
+    assert {'Cells', 'Rome'} in generator.together
+    assert not any({'Cells', 'Plants'} <= running for running in generator.together)
+    assert sorted(card['class_name'] for card in repository.get_cards()) == ['Biology'] * 4 + ['Rome'] * 2
+
+
+def test_cancelled_job_is_kept_until_its_task_ends(queue, generator):
+    generator.blocked = {'Slow'}
+    job, = queue.add([{'topic': 'Slow'}], 2)
+    wait_for(lambda: 'Slow' in generator.running)
+
+    # Held so the task cannot end between the two calls
+    with queue.lock:
+        queue.cancel(job['id'])
+        queue.clear_finished()
+        assert [job['status'] for job in queue.snapshot()] == [CANCELLED]
+    wait_idle(queue)
+
+    queue.clear_finished()
+    assert queue.snapshot() == []
+
+
+def test_interrupted_jobs_resume_after_a_restart(tmp_path, repository, generator):
+    path = str(tmp_path / "queue.json")
+    save_json(path, {'jobs': [
+        {'id': "1", 'topic': 'SQL', 'class_name': 'Databases', 'num_cards': 5, 'difficulty': 'mixed',
+         'status': RUNNING, 'saved': 3, 'duplicates': 0, 'error': None, 'created': 0, 'updated': 0},
+        {'id': "2", 'topic': 'Rome', 'class_name': 'Rome', 'num_cards': 2, 'difficulty': 'mixed',
+         'status': DONE, 'saved': 2, 'duplicates': 0, 'error': None, 'created': 0, 'updated': 0},
+    ]})
+
+    queue = GenerationQueue(path)
+    assert [job['status'] for job in queue.snapshot()] == [QUEUED, DONE]
+
+    queue.start()
+    wait_idle(queue)
+    assert generator.requested == [('SQL', 2)]
+    assert [card['class_name'] for card in repository.get_cards()] == ['Databases'] * 2
+
+    reloaded = GenerationQueue(path)
+    assert [(job['status'], job['saved']) for job in reloaded.snapshot()] == [(DONE, 5), (DONE, 2)]
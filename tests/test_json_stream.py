@@ -0,0 +1,64 @@
+import json
+import random
+
+import pytest
+
+from src.services.json_stream import JsonArrayStream
+
+CARDS = [
+    {'question': 'What does "{" open?', 'answer': 'An object, closed by "}"', 'class_name': 'JSON'},
+    {'question': 'Escapes: \\" and \\\\', 'answer': 'Brackets [ ] in a string', 'class_name': 'JSON'},
+    {'question': 'Nested?', 'answer': 'Yes', 'meta': {'tags': ['a', {'b': 'c}'}]}},
+    {'question': 'Unicode', 'answer': 'café — \U0001F600'},
+]
+
+
+def feed_in_chunks(text: str, sizes) -> tuple:
+    stream = JsonArrayStream()
+    objects = []
+    position = 0
+    for size in sizes:
+        objects.extend(stream.feed(text[position:position + size]))
+        position += size
+    objects.extend(stream.feed(text[position:]))
+    return objects, stream
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_objects_split_across_chunks(seed):
+    rng = random.Random(seed)
+    text = "```json\n" + json.dumps(CARDS, indent=rng.choice([None, 2])) + "\n```"
+    sizes = [rng.randint(1, 7) for _ in range(len(text))]
+    objects, stream = feed_in_chunks(text, sizes)
+    assert objects == CARDS
+    assert stream.errors == 0
+    assert stream.finished
+
+
+def test_every_character_in_its_own_chunk():
+    text = json.dumps(CARDS, ensure_ascii=False)
+    objects, _ = feed_in_chunks(text, [1] * len(text))
+    assert objects == CARDS
+
+
+def test_malformed_objects_are_counted_and_skipped():
+    text = '[{"question": "ok", "answer": "a"}, {"question": broken}, {"question": "also ok", "answer": "b"}]'
+    objects, stream = feed_in_chunks(text, [5] * 40)
+    assert [card['question'] for card in objects] == ["ok", "also ok"]
+    assert stream.errors == 1
+
+
+def test_text_outside_the_array_is_ignored():
+    stream = JsonArrayStream()
+    assert stream.feed('Here are your cards: {"not": "this"} ') == []
+    assert not stream.started
+    assert stream.feed('[{"a": 1}] and {"b": 2}') == [{'a': 1}]
+    assert stream.finished
+    assert stream.feed('{"c": 3}') == []
+
+
+def test_unfinished_stream_keeps_the_open_object():
+    stream = JsonArrayStream()
+    assert stream.feed('[{"a": 1}, {"b": "tru') == [{'a': 1}]
+    assert not stream.finished
+    assert stream.feed('ncated"}') == [{'b': 'truncated'}]
@@ -0,0 +1,60 @@
+import random
+
+from src.models import ColumnSortIndex, natural_sort_key
+
+
+def test_natural_sort_key_orders_numbers_by_value():
+    names = ["Lecture 10", "lecture 2", "Lecture 1b", "Lecture", "lecture 1a", "Lab 3", "", "10", "9"]
+    assert sorted(names, key=natural_sort_key) == [
+        "", "9", "10", "Lab 3", "Lecture", "lecture 1a", "Lecture 1b", "lecture 2", "Lecture 10"
+    ]
+    assert natural_sort_key("Week 2") == natural_sort_key("WEEK 2")
+    assert natural_sort_key(3) == natural_sort_key("3")
+
+
+def full_order(cards, field):
+    return sorted(range(len(cards)), key=lambda i: (natural_sort_key(cards[i].get(field, "")), i))
+
+
+def test_column_sort_index_follows_edits():
+    rng = random.Random(0)
+
+    def random_card():
+        return {'class_name': f"Topic {rng.randint(0, 30)}"} if rng.random() < 0.9 else {}
+
+    cards = [random_card() for _ in range(50)]
+    index = ColumnSortIndex('class_name', cards)
+    assert index.order == full_order(cards, 'class_name')
+
+    for _ in range(200):
+        action = rng.randrange(3)
+        if action == 0:
+            start = len(cards)
+            cards = cards + [random_card() for _ in range(rng.randint(1, 3))]
+            index.add_cards(cards, start)
+        elif action == 1 and cards:
+            positions = rng.sample(range(len(cards)), min(3, len(cards)))
+            cards = list(cards)
+            for position in positions:
+                cards[position] = random_card()
+            index.update_cards(cards, positions)
+        elif cards:
+            removed = set(rng.sample(range(len(cards)), min(2, len(cards))))
+            cards = [card for i, card in enumerate(cards) if i not in removed]
+            index.delete_cards(removed)
+        assert index.order == full_order(cards, 'class_name')
+
+
+def test_repository_sorted_positions_follow_writes(repository):
+    repository.add_cards([{'question': f"Question {n}", 'answer': 'a', 'class_name': 'C'} for n in (10, 2, 1)])
+    assert repository.sorted_positions('question') == [2, 1, 0]
+
+    repository.add_cards([{'question': "Question 3", 'answer': 'a', 'class_name': 'C'}])
+    assert repository.sorted_positions('question') == [2, 1, 3, 0]
+
+    repository.update_cards({0: {'question': "Question 0"}})
+    assert repository.sorted_positions('question') == [0, 2, 1, 3]
+
+    repository.delete_cards([2])
+    assert [card['question'] for card in repository.get_cards()] == ["Question 0", "Question 2", "Question 3"]
+    assert repository.sorted_positions('question') == [0, 1, 2]
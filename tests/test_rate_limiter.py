@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from src.services.ai_service import RateLimiter, Reservation, retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(**options):
+    clock = FakeClock()
+    options = {'requests_per_minute': 60, 'tokens_per_minute': 6000, 'max_in_flight': 10, **options}
+    return RateLimiter(clock=clock, **options), clock
+
+
+def test_burst_then_refill():
+    limiter, clock = make_limiter(requests_per_minute=2)
+    for _ in range(2):
+        assert limiter.try_reserve(limiter.enqueue(), 10) == 0.0
+    ticket = limiter.enqueue()
+    assert limiter.try_reserve(ticket, 10) == pytest.approx(30.0)  # One request every 30 s
+    clock.now += 30
+    assert limiter.try_reserve(ticket, 10) == 0.0
+
+
+def test_callers_are_served_in_arrival_order():
+    limiter, clock = make_limiter(tokens_per_minute=1000)
+    assert limiter.try_reserve(limiter.enqueue(), 900) == 0.0
+
+    large, small = limiter.enqueue(), limiter.enqueue()
+    assert limiter.try_reserve(large, 900) > 0
+    # Enough tokens for the small request, but it is not its turn
+    assert limiter.try_reserve(small, 50) > 0
+    clock.now += 60
+    assert limiter.try_reserve(large, 900) == 0.0
+    assert limiter.try_reserve(small, 50) == 0.0
+
+
+def test_leaving_the_queue_lets_the_next_caller_through():
+    limiter, _ = make_limiter()
+    first, second = limiter.enqueue(), limiter.enqueue()
+    limiter.leave(first)
+    assert limiter.try_reserve(second, 10) == 0.0
+
+
+def test_oversized_requests_wait_for_a_full_bucket():
+    limiter, _ = make_limiter(tokens_per_minute=100)
+    assert limiter.try_reserve(limiter.enqueue(), 500) == 0.0
+    assert limiter.token_level == 0
+
+
+def test_release_returns_unused_tokens_and_charges_overruns():
+    limiter, _ = make_limiter(tokens_per_minute=1000)
+    reservation = Reservation(400)
+    assert limiter.try_reserve(limiter.enqueue(), 400) == 0.0
+    limiter.release(reservation, 100)
+    assert limiter.token_level == pytest.approx(900)
+    assert limiter.in_flight == 0
+    limiter.release(reservation, 0)  # Released once only
+    assert limiter.token_level == pytest.approx(900)
+
+    assert limiter.try_reserve(limiter.enqueue(), 100) == 0.0
+    limiter.release(Reservation(100), 600)
+    assert limiter.token_level == pytest.approx(300)
+
+
+def test_pause_holds_every_caller():
+    limiter, clock = make_limiter()
+    limiter.pause(5)
+    assert limiter.request_level <= 0  # No burst once the pause ends
+    ticket = limiter.enqueue()
+    assert limiter.try_reserve(ticket, 10) == pytest.approx(5)
+    clock.now += 3
+    limiter.pause(1)  # A shorter pause does not cut the first one short
+    assert limiter.try_reserve(ticket, 10) == pytest.approx(2)
+    clock.now += 2
+    assert limiter.try_reserve(ticket, 10) == 0.0
+
+
+def test_in_flight_limit():
+    limiter, _ = make_limiter(max_in_flight=1)
+    assert limiter.try_reserve(limiter.enqueue(), 10) == 0.0
+    ticket = limiter.enqueue()
+    assert limiter.try_reserve(ticket, 10) > 0
+    limiter.release(Reservation(10))
+    assert limiter.try_reserve(ticket, 10) == 0.0
+
+
+def test_acquire_async_grants_in_arrival_order():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=10 ** 6, max_in_flight=1)
+    granted = []
+
+    async def request(name: str) -> None:
+        reservation = await limiter.acquire_async(10)
+        granted.append(name)
+        await asyncio.sleep(0.01)
+        limiter.release(reservation)
+
+    async def main():
+        tasks = [asyncio.ensure_future(request(name)) for name in "abcd"]
+        await asyncio.sleep(0)
+        tasks[2].cancel()  # A cancelled caller leaves the queue
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    assert granted == ["a", "b", "d"]
+    assert not limiter.waiting and limiter.in_flight == 0
+
+
+def test_retry_after_header():
+    class Response:
+        headers = {'retry-after': '2.5'}
+
+    class Error(Exception):
+        response = Response()
+
+    assert retry_after(Error()) == 2.5
+    assert retry_after(Exception()) is None
@@ -0,0 +1,57 @@
+import json
+import os
+import time
+
+from src.services.response_cache import ResponseCache, request_key
+
+MESSAGES = [{'role': 'system', 'content': 'You make cards.'}, {'role': 'user', 'content': 'Ten cards\n  on  SQL'}]
+
+
+def test_request_key_ignores_whitespace_only():
+    reformatted = [{'role': 'system', 'content': '  You make   cards. '}, {'role': 'user', 'content': 'Ten cards on SQL'}]
+    key = request_key('model', 0.7, MESSAGES)
+    assert request_key('model', 0.7, reformatted) == key
+    assert request_key('other', 0.7, MESSAGES) != key
+    assert request_key('model', 0.2, MESSAGES) != key
+    assert request_key('model', 0.7, [MESSAGES[0], {'role': 'user', 'content': 'Ten cards on NoSQL'}]) != key
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    assert cache.get("missing") is None
+    cache.put("key", '[{"question": "q"}]')
+    assert cache.get("key") == '[{"question": "q"}]'
+    assert not [name for name in os.listdir(tmp_path / "cache") if name.endswith('.tmp')]
+
+    cache.clear()
+    assert cache.get("key") is None
+
+
+def test_expired_and_corrupt_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    with open(cache.path("old"), 'w', encoding='utf-8') as f:
+        json.dump({'created': time.time() - 120, 'content': 'stale'}, f)
+    with open(cache.path("broken"), 'w', encoding='utf-8') as f:
+        f.write('{"created": ')
+
+    assert cache.get("old") is None
+    assert cache.get("broken") is None
+    assert not os.path.exists(cache.path("old"))
+    assert not os.path.exists(cache.path("broken"))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    content = "x" * 1000
+    cache = ResponseCache(str(tmp_path), max_bytes=10 ** 6)
+    now = time.time()
+    for age, key in enumerate(("a", "b", "c")):
+        cache.put(key, content)
+        os.utime(cache.path(key), (now - 100 + age, now - 100 + age))  # "a" is the oldest
+
+    assert cache.get("a") == content  # Now the most recently used
+    entry_size = os.path.getsize(cache.path("a"))
+    cache.max_bytes = 3 * entry_size + entry_size // 2  # Timestamps vary the size by a few bytes
+    cache.put("d", content)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == [content] * 3
@@ -0,0 +1,81 @@
+import random
+import string
+
+from src.services.search_index import MIN_FUZZY_LENGTH, SearchIndex, max_edits, search_terms, search_words
+from src.services.similarity_index import edit_distance
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(MIN_FUZZY_LENGTH, 12)))
+
+
+def typo(rng: random.Random, word: str) -> str:
+    """word with one substitution, deletion, insertion or transposition"""
+    i = rng.randrange(len(word) - 1)
+    edit = rng.randrange(4)
+    if edit == 0:
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    if edit == 1:
+        return word[:i] + word[i + 1:]
+    if edit == 2:
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def test_terms_and_words_split_at_punctuation():
+    assert search_words("Boyce-Codd normal form (BCNF)") == ['boyce', 'codd', 'normal', 'form', 'bcnf']
+    assert search_terms("Boyce-Codd normal form (BCNF)") == ['boyce', 'codd', 'boycecodd', 'normal', 'form', 'bcnf']
+    assert search_terms("don't stop") == ['don', 't', 'dont', 'stop']
+    assert search_terms("...") == []
+
+
+def test_fuzzy_expand_recalls_terms_one_typo_away():
+    rng = random.Random(0)
+    vocabulary = sorted({random_word(rng) for _ in range(3000)})
+    index = SearchIndex()
+    for start in range(0, len(vocabulary), 10):
+        index.add({'question': " ".join(vocabulary[start:start + 10])})
+
+    for term in rng.sample(vocabulary, 300):
+        word = typo(rng, term)
+        if len(word) < MIN_FUZZY_LENGTH:
+            continue
+        matches = dict(index.fuzzy_expand(word))
+        assert term in matches
+        assert all(weight > 0 for weight in matches.values())
+
+
+def test_fuzzy_expand_ignores_short_and_distant_words():
+    index = SearchIndex()
+    index.add({'question': "normalization transaction"})
+    assert index.fuzzy_expand("nor") == []
+    assert index.fuzzy_expand("xylophone") == []
+    assert [term for term, _ in index.fuzzy_expand("normalisation")] == ['normalization']
+
+
+def test_search_ranks_and_follows_the_card_list():
+    cards = [
+        {'question': 'What is normalization?', 'answer': 'Removing redundancy', 'class_name': 'Databases'},
+        {'question': 'Define a transaction', 'answer': 'A unit of work with normalization', 'class_name': 'Databases'},
+        {'question': 'Boyce-Codd normal form', 'answer': 'BCNF', 'class_name': 'Databases'},
+    ]
+    index = SearchIndex()
+    assert index.search("normalization", cards) == [0, 1]  # Question matches rank first
+    assert index.search("normalizaton", cards) == [0, 1]  # Typo
+    assert index.search("codd", cards) == [2]
+    assert index.search("boycecodd", cards) == [2]
+    assert index.search("", cards) == [0, 1, 2]
+
+    # Removed and added cards, with positions in the new list
+    cards = cards[1:] + [{'question': 'Normalization again', 'answer': '', 'class_name': 'Databases'}]
+    assert index.search("normaliz", cards) == [2, 0]
+    assert 'redundancy' not in index.postings
+    assert all(index.trigram_terms.values())
+
+
+def test_edit_distance_counts_transpositions_and_stops_at_the_limit():
+    assert edit_distance("form", "from", 2) == 1
+    assert edit_distance("normal", "normla", 1) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 2) == 3
+    assert max_edits("short") == 1 and max_edits("longerword") == 2
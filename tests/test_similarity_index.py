@@ -0,0 +1,74 @@
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from src.services.similarity_index import TokenSimilarityIndex, combined_similarity, similarity_above, word_jaccard
+
+WORDS = ["normal", "form", "key", "table", "join", "index", "query", "tree", "node", "page", "lock", "log"]
+
+
+def random_text(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8)))
+
+
+def variant(rng: random.Random, text: str) -> str:
+    """text with a few words replaced, dropped or added"""
+    words = text.split()
+    for _ in range(rng.randint(0, 2)):
+        edit = rng.randrange(3)
+        if edit == 0 and words:
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+        elif edit == 1 and len(words) > 1:
+            del words[rng.randrange(len(words))]
+        else:
+            words.insert(rng.randint(0, len(words)), rng.choice(WORDS))
+    return " ".join(words)
+
+
+def full_similarity(text1: str, text2: str) -> float:
+    words1, words2 = set(text1.split()), set(text2.split())
+    jaccard = len(words1 & words2) / len(words1 | words2) if words1 or words2 else 0
+    return jaccard * 0.5 + SequenceMatcher(None, text1, text2).ratio() * 0.5
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.8, 0.9])
+def test_similarity_above_matches_full_comparison(threshold):
+    rng = random.Random(threshold)
+    texts = [random_text(rng) for _ in range(60)]
+    texts += [variant(rng, text) for text in texts]
+
+    for _ in range(3000):
+        text1, text2 = rng.choice(texts), rng.choice(texts)
+        words1, words2 = set(text1.split()), set(text2.split())
+        expected = full_similarity(text1, text2)
+
+        result = similarity_above(text1, text2, words1, words2, threshold)
+        if expected > threshold:
+            assert result == pytest.approx(expected)
+        else:
+            assert result is None
+        assert combined_similarity(text1, text2, words1, words2) == pytest.approx(expected)
+
+
+def test_similarity_above_empty_texts():
+    assert similarity_above("", "", set(), set(), 0.4) == pytest.approx(0.5)
+    assert similarity_above("", "", set(), set(), 0.5) is None
+    assert similarity_above("key", "", {"key"}, set(), 0.0) is None
+
+
+def test_index_candidates_cover_every_similar_set():
+    rng = random.Random(1)
+    min_jaccard = 0.5
+    sets = [frozenset(random_text(rng).split()) for _ in range(300)]
+    index = TokenSimilarityIndex(sets[:100], min_jaccard)
+    for tokens in sets[100:]:
+        index.add(tokens)
+    removed = set(rng.sample(range(len(sets)), 50))
+    for i in removed:
+        index.remove(i)
+
+    for query in sets[:40]:
+        expected = {i for i, tokens in enumerate(sets)
+                    if i not in removed and word_jaccard(query, tokens) > min_jaccard}
+        assert expected <= set(index.candidates(query))